@@ -0,0 +1,355 @@
+import os
+import io
+import json
+import time
+import zlib
+import argparse
+import platform
+import contextlib
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+import common
+import indicator_panel
+from rate_limiter import TokenBucket
+
+# 벤치마크 시나리오: (심볼 수, interval, 심볼당 캔들 수)
+BENCHMARK_SCENARIOS = {
+    'quick': [(1, '1d', 1000), (10, '1h', 5000)],
+    'standard': [(1, '1d', 3000), (50, '1d', 1000), (10, '1h', 20000), (1, '1m', 200000)],
+    'full': [(1, '1d', 3000), (500, '1d', 1000), (50, '1h', 20000), (1, '1m', 2000000)],
+}
+BENCHMARK_START_MS = 1483228800000 # 2017-01-01 00:00:00 UTC
+BENCHMARK_UPSERT_ROWS = 365 # 심볼당 저장 단계에 넣을 마지막 행 수 (날짜 문서 수)
+BENCHMARK_RESULTS_PATH = 'benchmark_results.json'
+# 새 인터프리터에서 모듈 하나를 import하는 데 허용하는 시간 (초)
+IMPORT_TIME_BUDGET_SECONDS = float(os.getenv('IMPORT_TIME_BUDGET_SECONDS', 1.0))
+IMPORT_BUDGET_MODULES = ('common', 'market_series', 'market_reader', 'incremental_indicators', 'db_dummy')
+# import만으로는 불러오면 안 되는 무거운 의존성 (처음 사용할 때 불러옴)
+LAZY_IMPORT_DEPENDENCIES = ('openai', 'pandas_ta', 'requests', 'dotenv')
+
+class SyntheticKlineClient:
+    """
+    Binance Client.get_klines와 같은 형태의 캔들을 만들어 주는 가짜 클라이언트.
+    심볼 이름으로 시드를 정하므로 같은 (심볼, interval, 캔들 수)이면 항상 같은 데이터가 나옵니다.
+    가격은 심볼별로 한 번만 NumPy로 만들어 두고, 요청된 페이지만 Binance처럼 문자열 행으로 변환합니다.
+    """
+
+    def __init__(self, interval, candles_per_symbol, start_ms=BENCHMARK_START_MS):
+        self.interval = interval
+        self.interval_ms = common.interval_to_milliseconds(interval)
+        self.candles_per_symbol = candles_per_symbol
+        self.start_ms = start_ms
+        self.calls = 0
+        self.generate_seconds = 0.0 # 가짜 응답을 만드는 데 쓴 시간 (파싱 시간에서 뺄 때 사용)
+        self.response = None
+        self._series = {}
+
+    @property
+    def end_ms(self):
+        return self.start_ms + self.candles_per_symbol * self.interval_ms - 1
+
+    def _symbol_series(self, symbol):
+        series = self._series.get(symbol)
+        if series is None:
+            n = self.candles_per_symbol
+            rng = np.random.default_rng(zlib.crc32(f"{symbol}-{self.interval}".encode()))
+            close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+            open_ = np.r_[close[0], close[:-1]]
+            high = np.maximum(open_, close) * (1 + rng.random(n) * 0.005)
+            low = np.minimum(open_, close) * (1 - rng.random(n) * 0.005)
+            volume = rng.random(n) * 1000
+            series = self._series[symbol] = (open_, high, low, close, volume)
+        return series
+
+    def get_klines(self, symbol, interval, startTime, endTime=None, limit=500):
+        started = time.perf_counter()
+        self.calls += 1
+        open_, high, low, close, volume = self._symbol_series(symbol)
+        first = max(0, -(-(startTime - self.start_ms) // self.interval_ms))
+        last = self.candles_per_symbol - 1 if endTime is None else min(self.candles_per_symbol - 1, (endTime - self.start_ms) // self.interval_ms)
+        rows = []
+        for i in range(first, min(last + 1, first + limit)):
+            open_time = self.start_ms + i * self.interval_ms
+            rows.append([
+                open_time, f"{open_[i]:.8f}", f"{high[i]:.8f}", f"{low[i]:.8f}", f"{close[i]:.8f}", f"{volume[i]:.8f}",
+                open_time + self.interval_ms - 1, "0", 10, "0", "0", "0"
+            ])
+        self.generate_seconds += time.perf_counter() - started
+        return rows
+
+def symbol_names(count):
+    return [f"SYN{i:03d}USDT" for i in range(count)]
+
+def percentiles(samples):
+    if not samples:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    values = np.asarray(samples, dtype=np.float64)
+    return {
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "p99": float(np.percentile(values, 99)),
+        "max": float(values.max()),
+    }
+
+class StageTimer:
+    """단계 하나의 호출별 소요 시간과 (track_memory=True이면) tracemalloc 최대 메모리를 모읍니다."""
+
+    def __init__(self, name, track_memory=True):
+        self.name = name
+        self.track_memory = track_memory
+        self.samples = []
+        self.items = 0
+        self.peak_bytes = 0
+
+    def __enter__(self):
+        if self.track_memory:
+            tracemalloc.start()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.total_seconds = time.perf_counter() - self._started
+        if self.track_memory:
+            self.peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    @contextlib.contextmanager
+    def call(self, items=1):
+        started = time.perf_counter()
+        yield
+        self.samples.append(time.perf_counter() - started)
+        self.items += items
+
+    def result(self, seconds=None, **extra):
+        seconds = self.total_seconds if seconds is None else seconds
+        result = {
+            "stage": self.name,
+            "seconds": seconds,
+            "items": self.items,
+            "items_per_second": self.items / seconds if seconds > 0 else None,
+            "latency_seconds": percentiles(self.samples),
+            "peak_memory_mb": self.peak_bytes / (1024 * 1024) if self.track_memory else None,
+        }
+        result.update(extra)
+        return result
+
+# 시나리오 하나 실행: 캔들 가져오기/파싱 → 지표 계산 → 문서 변환 → daily_market 일괄 저장
+def run_scenario(symbol_count, interval, candles_per_symbol, track_memory=True, upsert_rows=BENCHMARK_UPSERT_ROWS):
+    try:
+        import mongomock
+    except ImportError:
+        raise SystemExit("벤치마크에는 mongomock이 필요합니다: pip install mongomock")
+
+    symbols = symbol_names(symbol_count)
+    client = SyntheticKlineClient(interval, candles_per_symbol)
+    start_str = datetime.fromtimestamp(client.start_ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    results = []
+
+    # 실제 API 제한/캐시/DB 대신 벤치마크 전용 객체를 사용 (common 모듈 전역을 잠시 교체)
+    saved = (common.kline_cache, common.binance_weight_limiter, vars(common).get('daily_market_collection'))
+    common.kline_cache = None
+    common.binance_weight_limiter = TokenBucket(1e12, 1e12)
+    common.daily_market_collection = mongomock.MongoClient().benchmark.daily_market
+    quiet = contextlib.redirect_stdout(io.StringIO())
+    try:
+        with quiet:
+            frames = {}
+            with StageTimer("fetch_parse", track_memory) as timer:
+                for symbol in symbols:
+                    generated_before = client.generate_seconds
+                    with timer.call(candles_per_symbol):
+                        # 종료 시각 없이 요청하면 합성 데이터 끝에서 빈 페이지를 받고 멈춤
+                        frames[symbol] = common.fetch_historical_klines(client, symbol, interval, start_str)
+                    timer.samples[-1] -= client.generate_seconds - generated_before
+            results.append(timer.result(
+                seconds=timer.total_seconds - client.generate_seconds,
+                api_calls=client.calls, synthetic_generate_seconds=client.generate_seconds
+            ))
+
+            if symbol_count > 1:
+                # 같은 캔들로 (시간 × 심볼) 패널 계산을 먼저 측정 (심볼별 계산 결과와 같음)
+                with StageTimer("indicators_panel", track_memory) as timer:
+                    with timer.call(sum(len(df) for df in frames.values())):
+                        indicator_panel.calculate_indicators_panel(frames)
+                results.append(timer.result())
+
+            with StageTimer("indicators", track_memory) as timer:
+                for symbol in symbols:
+                    with timer.call(len(frames[symbol])):
+                        frames[symbol] = common.calculate_all_indicators(frames[symbol])
+            results.append(timer.result())
+
+            documents = {}
+            with StageTimer("documents", track_memory) as timer:
+                for symbol in symbols:
+                    with timer.call(len(frames[symbol])):
+                        documents[symbol] = common.build_market_data_documents(frames[symbol])
+            results.append(timer.result())
+
+            with StageTimer("prepare_last_row", track_memory) as timer:
+                for symbol in symbols:
+                    with timer.call():
+                        common.prepare_market_data_documents_for_mongo(frames[symbol], symbol, interval)
+            results.append(timer.result())
+
+            # 마지막 upsert_rows개 행을 행 번호별 가상 날짜 문서로 묶어 저장
+            daily_documents = {}
+            for symbol in symbols:
+                for row_number, doc in enumerate(documents[symbol][-upsert_rows:]):
+                    date_key = f"row-{row_number:06d}"
+                    daily_documents.setdefault(date_key, {"date": date_key, "market_data": {}})["market_data"][symbol] = doc
+            with StageTimer("mongo_upsert", track_memory) as timer:
+                batch_size = common.DAILY_MARKET_BULK_BATCH_SIZE
+                daily_list = list(daily_documents.values())
+                for batch_start in range(0, len(daily_list), batch_size):
+                    batch = daily_list[batch_start:batch_start + batch_size]
+                    with timer.call(len(batch)):
+                        common.bulk_upsert_daily_market_documents(batch, batch_size)
+            results.append(timer.result(symbols_per_document=symbol_count))
+    finally:
+        common.kline_cache, common.binance_weight_limiter, daily_market_collection = saved
+        if daily_market_collection is None:
+            # 벤치마크 전에 만들어진 적이 없으면 다시 처음 사용할 때 만들도록 되돌림
+            del common.daily_market_collection
+        else:
+            common.daily_market_collection = daily_market_collection
+
+    for result in results:
+        result.update({"symbols": symbol_count, "interval": interval, "candles_per_symbol": candles_per_symbol})
+    return results
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def run_benchmarks(scenarios, track_memory=True):
+    results = []
+    for symbol_count, interval, candles_per_symbol in scenarios:
+        print(f"--- 벤치마크: 심볼 {symbol_count}개, {interval}, 심볼당 캔들 {candles_per_symbol}개 ---")
+        for result in run_scenario(symbol_count, interval, candles_per_symbol, track_memory):
+            results.append(result)
+            memory = f", 최대 메모리 {result['peak_memory_mb']:.1f}MB" if result['peak_memory_mb'] is not None else ""
+            print(f"[{result['stage']}] {result['seconds']:.3f}초, 초당 {result['items_per_second'] or 0:,.0f}건, "
+                  f"p95 {result['latency_seconds']['p95'] or 0:.4f}초{memory}")
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "track_memory": track_memory,
+        },
+        "results": results,
+    }
+
+# 새 프로세스에서 모듈을 import하는 시간과, import만으로 불러온 무거운 의존성/만들어진 MongoClient를 측정
+_IMPORT_PROBE = """
+import sys, time, json
+started = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - started
+eager = [name for name in {lazy!r} if name in sys.modules]
+from pymongo import MongoClient
+clients = sorted(f"{{name}}.{{attr}}" for name, mod in list(sys.modules.items()) if mod is not None
+                 for attr, value in list(vars(mod).items()) if isinstance(value, MongoClient))
+print(json.dumps({{"seconds": seconds, "eager_dependencies": eager, "mongo_clients": clients}}))
+"""
+
+# 빈 임시 디렉터리를 작업 디렉터리로 두고 실행해 import가 만든 파일(캐시 DB 등)도 확인
+def measure_import(module, repeats=3):
+    # 디스크 캐시 영향을 줄이도록 여러 번 실행해 가장 짧은 시간을 사용
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [repo_dir, os.environ.get('PYTHONPATH')])))
+    runs = []
+    for _ in range(repeats):
+        with tempfile.TemporaryDirectory() as cwd:
+            completed = subprocess.run(
+                [sys.executable, '-c', _IMPORT_PROBE.format(module=module, lazy=LAZY_IMPORT_DEPENDENCIES)],
+                capture_output=True, text=True, cwd=cwd, env=env
+            )
+            created = sorted(os.listdir(cwd))
+        if completed.returncode != 0:
+            raise RuntimeError(f"{module} import 실패:\n{completed.stderr}")
+        run = json.loads(completed.stdout.strip().splitlines()[-1])
+        run["created_files"] = created
+        runs.append(run)
+    result = min(runs, key=lambda run: run["seconds"])
+    result["module"] = module
+    return result
+
+# import 시간 예산 확인. 예산을 넘거나, 무거운 의존성을 바로 불러오거나, MongoClient나 파일을 만들면 실패
+# 반환값: (모두 통과 여부, 모듈별 결과)
+def check_import_budget(modules=IMPORT_BUDGET_MODULES, budget_seconds=IMPORT_TIME_BUDGET_SECONDS):
+    results = []
+    for module in modules:
+        result = measure_import(module)
+        result["ok"] = (result["seconds"] <= budget_seconds and not result["eager_dependencies"]
+                        and not result["mongo_clients"] and not result["created_files"])
+        results.append(result)
+        problems = [f"예산 {budget_seconds:.2f}초 초과"] if result["seconds"] > budget_seconds else []
+        if result["eager_dependencies"]:
+            problems.append(f"바로 불러온 의존성: {', '.join(result['eager_dependencies'])}")
+        if result["mongo_clients"]:
+            problems.append(f"import 시 만든 MongoClient: {', '.join(result['mongo_clients'])}")
+        if result["created_files"]:
+            problems.append(f"import 시 만든 파일: {', '.join(result['created_files'])}")
+        print(f"[import {module}] {result['seconds']:.3f}초" + (f"  <-- {'; '.join(problems)}" if problems else ""))
+    return all(result["ok"] for result in results), results
+
+def _result_key(result):
+    return (result["stage"], result["symbols"], result["interval"], result["candles_per_symbol"])
+
+# 두 결과 파일의 같은 (단계, 시나리오) 처리량 비교. ratio < 1이면 head가 느려진 것
+def compare_results(base, head, threshold=0.9):
+    base_by_key = {_result_key(result): result for result in base["results"]}
+    rows = []
+    for result in head["results"]:
+        previous = base_by_key.get(_result_key(result))
+        if previous is None or not previous["items_per_second"] or not result["items_per_second"]:
+            continue
+        ratio = result["items_per_second"] / previous["items_per_second"]
+        rows.append((_result_key(result), ratio))
+        flag = "  <-- 느려짐" if ratio < threshold else ""
+        stage, symbols, interval, candles = _result_key(result)
+        print(f"[{stage}] 심볼 {symbols}개 {interval} {candles}개: 처리량 x{ratio:.2f}{flag}")
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="시장 데이터 파이프라인 오프라인 벤치마크 (합성 캔들 + mongomock)")
+    parser.add_argument('--preset', choices=sorted(BENCHMARK_SCENARIOS), default='quick')
+    parser.add_argument('--symbols', type=int, nargs='*', help="프리셋 대신 사용할 심볼 수 목록")
+    parser.add_argument('--intervals', nargs='*', default=['1d'], help="--symbols와 함께 사용할 interval 목록")
+    parser.add_argument('--candles', type=int, default=1000, help="--symbols와 함께 사용할 심볼당 캔들 수")
+    parser.add_argument('--no-memory', action='store_true', help="tracemalloc 측정 끄기 (시간 측정 오차 감소)")
+    parser.add_argument('--output', default=BENCHMARK_RESULTS_PATH)
+    parser.add_argument('--compare', help="비교할 이전 결과 JSON 파일")
+    parser.add_argument('--check-imports', action='store_true', help="벤치마크 대신 모듈 import 시간 예산만 확인 (실패하면 종료 코드 1)")
+    args = parser.parse_args()
+
+    if args.check_imports:
+        ok, _ = check_import_budget()
+        raise SystemExit(0 if ok else 1)
+
+    if args.symbols:
+        scenarios = [(count, interval, args.candles) for interval in args.intervals for count in args.symbols]
+    else:
+        scenarios = BENCHMARK_SCENARIOS[args.preset]
+
+    report = run_benchmarks(scenarios, track_memory=not args.no_memory)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"벤치마크 결과 저장: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare_results(json.load(f), report)
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+from bson import Binary
+
+# trades_data / executions_data 같은 거래 로그를 필드별 배열 하나로 저장하는 컬럼형 인코딩
+# {"format": COLUMNAR_FORMAT, "length": 행 수, "fields": [필드 순서], "columns": {필드: 컬럼}}
+# 컬럼 종류:
+#   const    : 모든 행이 같은 값 (loop, episode 등)
+#   array    : 숫자/불리언 배열. 리틀 엔디언 바이트(Binary)로 저장
+#   datetime : datetime64 정수 배열 + 단위/시간대
+#   dict     : 문자열 사전 인코딩 (values 목록 + 가장 작은 정수형 codes, -1은 None)
+#   str      : 서로 다른 값이 많은 문자열 (order_id 등)은 목록 그대로
+#   object   : 그 밖의 값 (dict/list 등)은 목록 그대로
+COLUMNAR_FORMAT = "columnar-v1"
+# 서로 다른 문자열 수가 행 수의 이 비율 이하일 때만 사전 인코딩
+DICT_ENCODE_MAX_RATIO = 0.5
+
+def is_columnar(value):
+    return isinstance(value, dict) and value.get("format") == COLUMNAR_FORMAT
+
+def _little_endian(dtype):
+    return dtype.newbyteorder('<') if dtype.byteorder not in ('|', '<') else dtype
+
+def _binary(values):
+    return Binary(np.ascontiguousarray(values).tobytes())
+
+def _code_dtype(size):
+    # -1(None)을 포함해 값 개수를 담을 수 있는 가장 작은 정수형
+    for dtype in (np.int8, np.int16, np.int32):
+        if size < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+def _encode_column(series):
+    n = len(series)
+    dtype = series.dtype
+    if dtype.kind == 'M':
+        tz = getattr(dtype, 'tz', None)
+        if tz is not None:
+            series = series.dt.tz_convert('UTC').dt.tz_localize(None)
+        values = series.to_numpy()
+        return {"type": "datetime", "unit": np.datetime_data(values.dtype)[0], "tz": str(tz) if tz is not None else None,
+                "data": _binary(values.view(np.int64).astype('<i8', copy=False))}
+
+    if dtype.kind in 'biuf':
+        values = series.to_numpy()
+        if n > 1 and (values == values[0]).all():
+            return {"type": "const", "dtype": values.dtype.str, "value": values[0].item()}
+        values = values.astype(_little_endian(values.dtype), copy=False)
+        return {"type": "array", "dtype": values.dtype.str, "data": _binary(values)}
+
+    try:
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    except TypeError: # dict/list 등 해시할 수 없는 값
+        return {"type": "object", "values": series.tolist()}
+    uniques = list(uniques)
+    if not all(isinstance(u, str) for u in uniques):
+        return {"type": "object", "values": series.where(series.notna(), None).tolist()}
+    if n > 1 and len(uniques) == 1 and (codes >= 0).all():
+        return {"type": "const", "dtype": "object", "value": uniques[0]}
+    if len(uniques) > n * DICT_ENCODE_MAX_RATIO:
+        return {"type": "str", "values": series.where(series.notna(), None).tolist()}
+    code_dtype = _code_dtype(len(uniques))
+    return {"type": "dict", "values": uniques, "dtype": code_dtype.str,
+            "codes": _binary(codes.astype(_little_endian(code_dtype), copy=False))}
+
+# DataFrame 또는 레코드 목록(list of dict)을 컬럼형 문서로 인코딩
+def encode_columnar(data):
+    df = data if isinstance(data, pd.DataFrame) else pd.DataFrame.from_records(list(data))
+    fields = [str(name) for name in df.columns]
+    return {
+        "format": COLUMNAR_FORMAT,
+        "length": len(df),
+        "fields": fields,
+        "columns": {name: _encode_column(df[column]) for name, column in zip(fields, df.columns)},
+    }
+
+def _decode_column(column, n):
+    kind = column["type"]
+    if kind == "const":
+        return np.full(n, column["value"], dtype=np.dtype(column["dtype"]))
+    if kind == "array":
+        return np.frombuffer(column["data"], dtype=np.dtype(column["dtype"])).copy()
+    if kind == "datetime":
+        values = np.frombuffer(column["data"], dtype='<i8').astype(np.int64).view(f"datetime64[{column['unit']}]")
+        if column["tz"] is not None:
+            return pd.DatetimeIndex(values).tz_localize('UTC').tz_convert(column["tz"])
+        return values
+    if kind == "dict":
+        # codes -1은 values 뒤에 붙인 None을 가리킴
+        values = np.empty(len(column["values"]) + 1, dtype=object)
+        values[:-1] = column["values"]
+        return values[np.frombuffer(column["codes"], dtype=np.dtype(column["dtype"]))]
+    return column["values"]
+
+# 컬럼형 문서를 DataFrame으로 디코딩. 필드마다 배열 하나를 만들며 행 단위 반복은 없음
+def decode_columnar(document):
+    n = document["length"]
+    fields = document["fields"]
+    columns = document["columns"]
+    return pd.DataFrame({name: _decode_column(columns[name], n) for name in fields}, index=pd.RangeIndex(n), columns=fields)
+
+# trades_data / executions_data 값을 저장 방식과 무관하게 DataFrame으로 반환
+def trade_log_frame(value):
+    if is_columnar(value):
+        return decode_columnar(value)
+    return pd.DataFrame.from_records(list(value or []))
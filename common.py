@@ -1,32 +1,108 @@
 import os
 import time
+import threading
 import pandas as pd
 from datetime import datetime, timedelta
-from pymongo import MongoClient
-from dotenv import load_dotenv
 import numpy as np
-import pandas_ta as ta
-import requests
-import openai
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from kline_cache import KlineCache, KLINE_CACHE_DIR, KLINE_DTYPE
+from kline_decoder import KlineBuffer, decode_klines_page
+from indicator_registry import (
+    MA_LENGTHS, MACD_PARAMS, RSI_LENGTHS, STOCH_PARAMS, STOCH_SMOOTH_K, BBANDS_LENGTHS, BBANDS_STD,
+    ATR_LENGTHS, OBV_SMA_LENGTHS, ICHIMOKU_TENKAN, ICHIMOKU_KIJUN, ICHIMOKU_SENKOU,
+    SUPERTREND_LENGTHS, SUPERTREND_MULTIPLIER, MIN_INDICATOR_CANDLES, FIB_WINDOW, FIB_RATIOS,
+    calculate_fib_levels, append_indicator_columns
+)
+from rate_limiter import TokenBucket
+from summary_cache import SummaryCache, SUMMARY_CACHE_PATH
+from instrumentation import metrics
+from llm_client import AsyncLLMClient, OpenAIBackend, StubLLMBackend, LLM_MAX_CONCURRENCY
 
-# 환경 변수 로드
-load_dotenv()
+# import 시에는 파일/네트워크 I/O를 하지 않음
+# .env, MongoDB 연결, 캔들/요약 캐시는 처음 사용할 때 만들고, 모듈 속성(common.db, common.api_key,
+# common.kline_cache, common.summary_cache 등)으로 접근해도 같은 getter를 거침
+# 테스트/벤치마크에서 common.daily_market_collection = ... 처럼 바꿔 끼우면 그 객체를 사용
+_LAZY_ATTRIBUTES = {}
+_lazy_lock = threading.RLock()
 
-# Binance API 키와 시크릿
-api_key = os.getenv('BINANCE_API_KEY')
-api_secret = os.getenv('BINANCE_SECRET_KEY')
+def __getattr__(name):
+    factory = _LAZY_ATTRIBUTES.get(name)
+    if factory is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return factory()
 
-# OpenAI API 키
-openai_api_key = os.getenv('OPENAI_API_KEY')
+# 모듈 안에서 지연 생성 값을 읽을 때 사용 (전역 이름 조회는 __getattr__를 거치지 않음)
+def _lazy(name):
+    return _LAZY_ATTRIBUTES[name]()
+
+def _lazy_value(name, create):
+    # 이미 만들었거나 밖에서 넣어 둔 값(None 포함)이 있으면 그대로 사용
+    with _lazy_lock:
+        if name not in globals():
+            globals()[name] = create()
+        return globals()[name]
+
+# .env 파일을 한 번만 읽어 환경 변수에 반영 (이미 설정된 환경 변수는 덮어쓰지 않음)
+# 아래 튜닝 값(OPENAI_REQUESTS_PER_MINUTE 등)은 import 시 환경 변수에서 읽으므로 .env가 아니라 실행 환경에 지정
+_env_loaded = False
+
+def load_env():
+    global _env_loaded
+    with _lazy_lock:
+        if not _env_loaded:
+            from dotenv import load_dotenv
+            load_dotenv()
+            _env_loaded = True
+
+def _env_setting(name, env_name, default=None):
+    def create():
+        load_env()
+        return os.getenv(env_name, default)
+    _LAZY_ATTRIBUTES[name] = lambda: _lazy_value(name, create)
+
+# Binance API 키와 시크릿 (common.api_key, common.api_secret)
+_env_setting('api_key', 'BINANCE_API_KEY')
+_env_setting('api_secret', 'BINANCE_SECRET_KEY')
+# OpenAI API 키 (common.openai_api_key)
+_env_setting('openai_api_key', 'OPENAI_API_KEY')
+# MongoDB 주소 (common.mongo_uri)
+_env_setting('mongo_uri', 'MONGO_URI', "mongodb://localhost:27017/")
+
+# OpenAI 요청 속도 제한 (분당 요청 수)
+OPENAI_REQUESTS_PER_MINUTE = float(os.getenv('OPENAI_REQUESTS_PER_MINUTE', 20))
 
 # MongoDB 연결
-mongo_uri = os.getenv('MONGO_URI', "mongodb://localhost:27017/")
-client_mongo = MongoClient(mongo_uri)
-db = client_mongo['crypto_data'] # 데이터베이스 이름
+MONGO_DB_NAME = 'crypto_data' # 데이터베이스 이름
+
+def get_mongo_client():
+    def create():
+        from pymongo import MongoClient # pymongo import도 처음 연결할 때만
+        return MongoClient(_lazy('mongo_uri'))
+    return _lazy_value('client_mongo', create)
+
+def get_db():
+    return _lazy_value('db', lambda: get_mongo_client()[MONGO_DB_NAME])
 
 # 날짜별 통합 문서 컬렉션
-# 반드시 date 필드에 unique index를 생성할 것(db.daily_market.create_index('date', unique=True))
-daily_market_collection = db['daily_market']
+# date 필드 unique index는 db_indexes.ensure_market_indexes()가 생성 (파이프라인 시작 시 호출)
+def get_daily_market_collection():
+    return _lazy_value('daily_market_collection', lambda: get_db()['daily_market'])
+
+# 연결을 닫고 다음 사용 때 다시 만들도록 초기화
+def close_mongo_client():
+    with _lazy_lock:
+        client = globals().pop('client_mongo', None)
+        globals().pop('db', None)
+        globals().pop('daily_market_collection', None)
+    if client is not None:
+        client.close()
+
+_LAZY_ATTRIBUTES.update({
+    'client_mongo': get_mongo_client,
+    'db': get_db,
+    'daily_market_collection': get_daily_market_collection,
+})
 
 # --- 함수들 ---
 def interval_to_milliseconds(interval_str):
@@ -42,14 +118,133 @@ def interval_to_milliseconds(interval_str):
             pass
     return None
 
-# Binance API를 통해 캔들 데이터를 가져오는 함수
-def fetch_historical_klines(binance_client, symbol, interval, start_str, end_str=None):
-    print(f"{symbol} {interval} 캔들 데이터 가져오기 시작: {start_str} ~ {end_str if end_str else '현재'}")
+# Binance API 원본 캔들(list of lists)을 캐시 배열 형식으로 변환
+def klines_to_array(klines):
+    return decode_klines_page(klines)
+
+CHART_DATA_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# DataFrame의 OHLCV 컬럼 dtype ('float64' 기본, 메모리를 줄이려면 KLINE_FRAME_DTYPE=float32)
+KLINE_FRAME_DTYPE = np.dtype(os.getenv('KLINE_FRAME_DTYPE', 'float64'))
+
+# 캔들 배열을 open_time 인덱스의 DataFrame으로 변환
+# OHLCV는 (n, 5) 배열 하나로 모아 넘기므로 pandas가 컬럼별 object 변환 없이 블록 하나로 받음
+def klines_array_to_frame(arr, price_dtype=None):
+    price_dtype = KLINE_FRAME_DTYPE if price_dtype is None else np.dtype(price_dtype)
+    values = np.empty((len(arr), len(CHART_DATA_COLUMNS)), dtype=price_dtype)
+    for j, col in enumerate(CHART_DATA_COLUMNS):
+        values[:, j] = arr[col]
+    index = pd.DatetimeIndex(pd.to_datetime(arr['open_time'], unit='ms'), name='open_time')
+    df = pd.DataFrame(values, index=index, columns=CHART_DATA_COLUMNS, copy=False)
+    df.insert(0, 'close_time', pd.to_datetime(arr['close_time'], unit='ms'))
+    return df
+
+# Binance 요청 weight 제한 (1분당 6000, 여유분을 남기고 80%만 사용)
+BINANCE_WEIGHT_LIMIT_PER_MINUTE = 6000
+BINANCE_WEIGHT_BUDGET = int(os.getenv('BINANCE_WEIGHT_BUDGET', BINANCE_WEIGHT_LIMIT_PER_MINUTE * 0.8))
+KLINES_REQUEST_WEIGHT = 2 # GET /api/v3/klines 요청 1회의 weight
+KLINES_PAGE_LIMIT = 1000
+KLINE_BUFFER_MAX_PREALLOCATE = 1_000_000 # 순차 요청 시 미리 할당하는 최대 캔들 수 (넘으면 두 배씩 늘림)
+KLINE_FETCH_WORKERS = int(os.getenv('KLINE_FETCH_WORKERS', 8))
+
+# 모든 스레드/심볼이 함께 쓰는 Binance weight 제한기
+binance_weight_limiter = TokenBucket(BINANCE_WEIGHT_BUDGET, BINANCE_WEIGHT_BUDGET / 60)
+
+# 캔들 한 페이지 요청 (weight 제한기를 거침)
+# 반환값: API 원본 페이지(list of lists), 오류면 None
+def _request_klines_page(binance_client, symbol, interval, start_time_ms, end_time_ms):
+    metrics.count("binance_limiter_wait_seconds_total", binance_weight_limiter.acquire(KLINES_REQUEST_WEIGHT))
+    try:
+        with metrics.span("binance_klines_page", symbol=symbol, interval=interval):
+            klines = binance_client.get_klines(
+                symbol=symbol,
+                interval=interval,
+                startTime=start_time_ms,
+                endTime=end_time_ms,
+                limit=KLINES_PAGE_LIMIT
+            )
+    except Exception as e:
+        print(f"API 호출 중 오류 발생: {e}. 다음 시도로 넘어갑니다.")
+        metrics.count("binance_api_errors_total", symbol=symbol, status=getattr(e, 'status_code', None) or 'error')
+        if getattr(e, 'status_code', None) in (418, 429):
+            # weight 초과: 서버가 알려준 시간(없으면 60초)만큼 모든 요청을 멈춤
+            retry_after = getattr(getattr(e, 'response', None), 'headers', {}).get('Retry-After')
+            binance_weight_limiter.pause(float(retry_after) if retry_after else 60)
+        else:
+            time.sleep(5)
+        return None
+    metrics.count("binance_api_pages_total", symbol=symbol, interval=interval)
+    metrics.count("binance_candles_total", len(klines), symbol=symbol, interval=interval)
+    # 서버가 집계한 사용량을 제한기에 반영 (python-binance Client는 마지막 응답을 response에 보관)
+    response = getattr(binance_client, 'response', None)
+    used_weight = getattr(response, 'headers', {}).get('x-mbx-used-weight-1m')
+    if used_weight:
+        binance_weight_limiter.observe_usage(int(used_weight))
+    return klines
+
+# 캔들 한 페이지를 요청해 KLINE_DTYPE 배열로 변환 (동시 요청용: 원본 페이지는 바로 배열로 바꿔 파이썬 문자열이 페이지 단위로만 남음)
+# 반환값: (KLINE_DTYPE 캔들 배열, 성공 여부)
+def _get_klines_page(binance_client, symbol, interval, start_time_ms, end_time_ms):
+    klines = _request_klines_page(binance_client, symbol, interval, start_time_ms, end_time_ms)
+    if klines is None:
+        return decode_klines_page([]), False
+    return decode_klines_page(klines), True
+
+# 고정 길이 interval이면 [start, end] 구간을 페이지 단위 창으로 나눔 (창 하나에 캔들이 limit개 이하)
+def _split_kline_pages(interval, start_time_ms, end_time_ms):
+    interval_ms = interval_to_milliseconds(interval)
+    if not interval_ms or interval.endswith('M'):
+        return None # 월봉은 길이가 일정하지 않아 순차 요청
+    page_ms = KLINES_PAGE_LIMIT * interval_ms
+    return [(page_start, min(page_start + page_ms - 1, end_time_ms))
+            for page_start in range(start_time_ms, end_time_ms + 1, page_ms)]
+
+# 페이지 배열들을 크기에 맞게 한 번만 할당한 배열로 이어 붙임
+def _join_kline_pages(page_results):
+    page_results = list(page_results)
+    buffer = KlineBuffer(sum(len(page) for page, _ in page_results))
+    complete = True
+    for page, ok in page_results:
+        buffer.extend(page)
+        complete = complete and ok
+    return buffer.array(), complete
+
+# [start_time_ms, end_time_ms] 구간을 페이지 단위로 순차 요청
+# 반환값: (KLINE_DTYPE 캔들 배열, 오류 없이 끝까지 받았는지 여부)
+def fetch_klines_from_api(binance_client, symbol, interval, start_time_ms, end_time_ms):
+    interval_ms = interval_to_milliseconds(interval)
+    # 고정 길이 interval이면 예상 캔들 수만큼 미리 할당 (월봉 등은 페이지 단위로 늘림)
+    expected = (end_time_ms - start_time_ms) // interval_ms + 1 if interval_ms else KLINES_PAGE_LIMIT
+    buffer = KlineBuffer(min(expected, KLINE_BUFFER_MAX_PREALLOCATE))
+    complete = True
+    current_start_time = start_time_ms
+    while current_start_time < end_time_ms:
+        klines = _request_klines_page(binance_client, symbol, interval, current_start_time, end_time_ms)
+        if klines is None:
+            complete = False
+            current_start_time += KLINES_PAGE_LIMIT * (interval_to_milliseconds(interval) if interval_to_milliseconds(interval) else 86400000)
+            continue
+        if not klines:
+            break
+        # 원본 페이지를 버퍼의 빈 자리에 바로 변환 (중간 배열/복사 없음)
+        buffer.append_page(klines)
+        current_start_time = buffer.last_open_time + 1
+    return buffer.array(), complete
+
+# 로컬 캔들 캐시 (KLINE_CACHE_ENABLED=0 이면 None). common.kline_cache로도 접근
+def get_kline_cache():
+    return _lazy_value('kline_cache', lambda: KlineCache(os.getenv('KLINE_CACHE_DIR', KLINE_CACHE_DIR))
+                       if os.getenv('KLINE_CACHE_ENABLED', '1') != '0' else None)
+
+_LAZY_ATTRIBUTES['kline_cache'] = get_kline_cache
+
+# 'YYYY-MM-DD' 또는 'YYYY-MM-DD HH:MM:SS' 문자열 구간을 [start_time_ms, end_time_ms]로 변환 (형식 오류 시 None)
+def _parse_kline_range(start_str, end_str=None):
     try:
         start_dt = datetime.strptime(start_str, '%Y-%m-%d %H:%M:%S') if ' ' in start_str else datetime.strptime(start_str, '%Y-%m-%d')
     except ValueError:
         print(f"오류: start_str '{start_str}' 형식이 올바르지 않습니다. 'YYYY-MM-DD' 또는 'YYYY-MM-DD HH:MM:SS' 형식을 사용하세요.")
-        return pd.DataFrame()
+        return None
     end_dt = datetime.utcnow()
     if end_str:
         try:
@@ -57,267 +252,453 @@ def fetch_historical_klines(binance_client, symbol, interval, start_str, end_str
             end_dt = end_dt + timedelta(days=1) # 해당 날짜까지 캔들 추출하기 위해 1일 더함
         except ValueError:
             print(f"오류: end_str '{end_str}' 형식이 올바르지 않습니다. 'YYYY-MM-DD' 또는 'YYYY-MM-DD HH:MM:SS' 형식을 사용하세요.")
-            return pd.DataFrame()
-    start_time_ms = int(start_dt.timestamp() * 1000)
-    end_time_ms = int(end_dt.timestamp() * 1000)
-    all_klines_data = []
-    limit = 1000
-    current_start_time = start_time_ms
-    while current_start_time < end_time_ms:
-        try:
-            klines = binance_client.get_klines(
-                symbol=symbol,
-                interval=interval,
-                startTime=current_start_time,
-                endTime=end_time_ms,
-                limit=limit
-            )
-            if not klines:
-                break
-            all_klines_data.extend(klines)
-            current_start_time = klines[-1][0] + 1
-            time.sleep(0.1)
-        except Exception as e:
-            print(f"API 호출 중 오류 발생: {e}. 다음 시도로 넘어갑니다.")
-            time.sleep(5)
-            current_start_time += limit * (interval_to_milliseconds(interval) if interval_to_milliseconds(interval) else 86400000)
-    if not all_klines_data:
+            return None
+    return int(start_dt.timestamp() * 1000), int(end_dt.timestamp() * 1000)
+
+# API로 받아와야 하는 구간 목록 [(start_ms, end_ms)] (end 포함). 캐시가 있으면 빠진 앞/뒤 구간만
+def _plan_kline_fetch(symbol, interval, start_time_ms, end_time_ms):
+    kline_cache = get_kline_cache()
+    if kline_cache is None:
+        return [(start_time_ms, end_time_ms)]
+    return [(range_start, range_end - 1)
+            for range_start, range_end in kline_cache.missing_ranges(symbol, interval, start_time_ms, end_time_ms + 1)]
+
+# 받아온 구간들을 캐시에 저장하고 요청 구간 전체의 캔들 배열을 만듦
+# fetched: [((range_start, range_end), KLINE_DTYPE 캔들 배열, 성공 여부)]
+def _assemble_klines(symbol, interval, start_time_ms, end_time_ms, fetched):
+    kline_cache = get_kline_cache()
+    if kline_cache is None:
+        return _join_kline_pages([(arr, complete) for _, arr, complete in fetched])[0]
+    now_ms = int(time.time() * 1000)
+    request_end = end_time_ms + 1 # 캐시 구간은 [from, to) 형태
+    uncached = []
+    for (range_start, range_end), arr, complete in fetched:
+        closed = arr['close_time'] < now_ms
+        if not complete:
+            # 중간에 오류가 난 구간은 빈 곳이 있을 수 있으므로 캐시에 확인 구간으로 남기지 않음
+            uncached.append(arr)
+            continue
+        # 진행 중인 캔들 이전까지, 그리고 아직 시작하지 않은 미래 구간 이전까지만 확인된 구간으로 기록
+        covered_to = min(range_end + 1, now_ms)
+        if not closed.all():
+            covered_to = min(covered_to, int(arr['open_time'][~closed].min()))
+        if not kline_cache.store(symbol, interval, arr[closed], range_start, covered_to):
+            uncached.append(arr[closed])
+        uncached.append(arr[~closed])
+    cached = kline_cache.read(symbol, interval, start_time_ms, request_end)
+    metrics.count("kline_cache_candles_total", len(cached), symbol=symbol, interval=interval)
+    if not fetched:
+        print(f"{symbol} {interval} 캐시에서 캔들 {len(cached)}개 사용 (API 요청 없음)")
+    arr = np.concatenate([cached] + uncached)
+    arr = arr[(arr['open_time'] >= start_time_ms) & (arr['open_time'] < request_end)]
+    order = np.argsort(arr['open_time'], kind='stable')
+    arr = arr[order]
+    keep = np.ones(len(arr), dtype=bool)
+    keep[:-1] = arr['open_time'][1:] != arr['open_time'][:-1]
+    return arr[keep]
+
+def _klines_result_frame(symbol, interval, arr):
+    if len(arr) == 0:
         print(f"{symbol} {interval} 데이터가 없습니다.")
         return pd.DataFrame()
-    df = pd.DataFrame(all_klines_data, columns=[
-        'open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time',
-        'quote_asset_volume', 'number_of_trades', 'taker_buy_base_asset_volume',
-        'taker_buy_quote_asset_volume', 'ignore'
-    ])
-    df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
-    df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
-    numeric_cols = ['open', 'high', 'low', 'close', 'volume',
-                    'quote_asset_volume', 'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume']
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col])
-    df = df.set_index('open_time')
-    df = df[['close_time', 'open', 'high', 'low', 'close', 'volume']].copy()
+    df = klines_array_to_frame(arr)
     print(f"{symbol} {interval} 캔들 데이터 {len(df)}개 로드 완료.")
     return df
 
-def calculate_all_indicators(df):
+# [start_time_ms, end_time_ms] 구간의 캔들을 KLINE_DTYPE 배열로 가져옴 (캐시에 없는 앞/뒤 구간만 API 요청)
+def fetch_klines_array(binance_client, symbol, interval, start_time_ms, end_time_ms):
+    fetched = []
+    for range_start, range_end in _plan_kline_fetch(symbol, interval, start_time_ms, end_time_ms):
+        arr, complete = fetch_klines_from_api(binance_client, symbol, interval, range_start, range_end)
+        fetched.append(((range_start, range_end), arr, complete))
+    return _assemble_klines(symbol, interval, start_time_ms, end_time_ms, fetched)
+
+# Binance API를 통해 캔들 데이터를 가져오는 함수
+def fetch_historical_klines(binance_client, symbol, interval, start_str, end_str=None):
+    print(f"{symbol} {interval} 캔들 데이터 가져오기 시작: {start_str} ~ {end_str if end_str else '현재'}")
+    time_range = _parse_kline_range(start_str, end_str)
+    if time_range is None:
+        return pd.DataFrame()
+    arr = fetch_klines_array(binance_client, symbol, interval, *time_range)
+    return _klines_result_frame(symbol, interval, arr)
+
+# 여러 심볼의 캔들을 한 번에 가져오는 함수
+# 모든 심볼/페이지 요청을 스레드 풀에서 동시에 보내고, 공유 weight 제한기로 요청 속도를 맞춤
+# 반환값: {symbol: fetch_historical_klines와 같은 형태의 DataFrame}
+def fetch_historical_klines_for_symbols(binance_client, symbols, interval, start_str, end_str=None, max_workers=KLINE_FETCH_WORKERS):
+    print(f"{len(symbols)}개 심볼 {interval} 캔들 데이터 동시 가져오기 시작: {start_str} ~ {end_str if end_str else '현재'}")
+    time_range = _parse_kline_range(start_str, end_str)
+    if time_range is None:
+        return {symbol: pd.DataFrame() for symbol in symbols}
+    start_time_ms, end_time_ms = time_range
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # 심볼별 빠진 구간을 페이지로 나눠 한꺼번에 제출
+        planned = {}
+        for symbol in symbols:
+            planned[symbol] = []
+            for range_start, range_end in _plan_kline_fetch(symbol, interval, start_time_ms, end_time_ms):
+                pages = _split_kline_pages(interval, range_start, range_end)
+                if pages is None:
+                    futures = [executor.submit(fetch_klines_from_api, binance_client, symbol, interval, range_start, range_end)]
+                else:
+                    futures = [executor.submit(_get_klines_page, binance_client, symbol, interval, page_start, page_end)
+                               for page_start, page_end in pages]
+                planned[symbol].append(((range_start, range_end), futures))
+
+        results = {}
+        for symbol in symbols:
+            fetched = []
+            for fetch_range, futures in planned[symbol]:
+                arr, complete = _join_kline_pages([future.result() for future in futures])
+                fetched.append((fetch_range, arr, complete))
+            arr = _assemble_klines(symbol, interval, start_time_ms, end_time_ms, fetched)
+            results[symbol] = _klines_result_frame(symbol, interval, arr)
+    return results
+
+def calculate_all_indicators(df, specs=None):
     # 지표 계산에 필요한 최소 데이터 개수 확인
     # MA 200, Ichimoku 52가 가장 긴 기간이므로, 최소 200개 이상의 캔들이 필요합니다.
-    if df.empty or len(df) < max(200, 52):
+    if df.empty or len(df) < MIN_INDICATOR_CANDLES:
         print("지표 계산에 필요한 데이터가 부족합니다.")
         return df # 원본 DataFrame 반환 (지표 열 없이)
 
     print("기술 지표 계산 시작...")
-
-    # 이동 평균 (MA) - 종가 기준
-    for p in [5, 10, 20, 50, 60, 100, 200]:
-        df.ta.sma(close=df["close"], length=p, append=True)
-        df.ta.ema(close=df["close"], length=p, append=True)
-    
-    # MACD - 종가 기준
-    for fast, slow, sig in [(12,26,9), (24,52,18), (19,39,9)]:
-        df.ta.macd(close=df["close"], fast=fast, slow=slow, signal=sig, append=True)
-
-    # RSI - 종가 기준
-    for L in [7,14,21]:
-        df.ta.rsi(close=df["close"], length=L, append=True)
-
-    # 스토캐스틱 오실레이터 - 고가, 저가, 종가 기준 (표준 계산 방식)
-    for k, d in [(5,3),(9,3),(14,3)]:
-        df.ta.stoch(high=df["high"], low=df["low"], close=df["close"], k=k, d=d, append=True)
-
-    # 볼린저 밴드 - 종가 기준
-    for L in [10,20,50]:
-        df.ta.bbands(close=df["close"], length=L, std=2, append=True)
-
-    # ATR - 고가, 저가, 종가 기준 (표준 계산 방식)
-    for L in [7,14,28]:
-        df.ta.atr(high=df["high"], low=df["low"], close=df["close"], length=L, append=True)
-
-    # OBV 및 OBV SMA - 종가 및 거래량 기준
-    df.ta.obv(close=df["close"], volume=df["volume"], append=True)
-
-    for L in [10,20,50]:
-        # OBV의 이동 평균 계산
-        df.ta.sma(close=df["OBV"], length=L, append=True, prefix="OBV_")
-
-    # Ichimoku Cloud - 고가, 저가, 종가 기준
-    df.ta.ichimoku(high=df["high"], low=df["low"], close=df["close"],
-                   tenkan=9, kijun=26, senkou_b=52,
-                   append=True)
-    
-    # Supertrend - 고가, 저가, 종가 기준
-    for L in [10,14,21]:
-        df.ta.supertrend(high=df["high"], low=df["low"], close=df["close"],
-                         length=L, multiplier=3, append=True)
-        
-    # 피보나치 되돌림 (open_time 인덱스 기준, 최근 1개월)
-    fib_levels = {}
-    recent_data_for_fib = df.tail(30)  # open_time 인덱스 기준 최근 30개 캔들
-    if not recent_data_for_fib.empty and len(recent_data_for_fib) > 1:
-        recent_high = recent_data_for_fib['high'].max()
-        recent_low = recent_data_for_fib['low'].min()
-        price_range = recent_high - recent_low
-        fib_ratios = [0, 0.236, 0.382, 0.5, 0.618, 0.786, 1, 1.272, 1.618]
-        rising = recent_data_for_fib['close'].iloc[-1] > recent_data_for_fib['close'].iloc[0]
-        for ratio in fib_ratios:
-            if rising:
-                level = recent_high - price_range * ratio
-            else:
-                level = recent_low  + price_range * ratio
-            key = f"FIB_{ratio}"
-            fib_levels[key] = level
-        for key, value in fib_levels.items():
-            df[key] = value
-        print(f"피보나치 되돌림 수준 (최근 1개월 고점 {recent_high:.2f}, 저점 {recent_low:.2f} 기준, open_time 기준) 계산 완료.")
-    else:
-        print("최근 1개월 데이터가 부족하여 피보나치 되돌림을 계산할 수 없습니다.")
+    # 계산할 지표는 indicator_registry의 선언 목록 (INDICATOR_GROUPS 환경 변수로 그룹 선택)
+    # 공유 중간값(SMA, EMA, True Range, 구간 고가/저가 등)은 프레임마다 한 번만 계산됨
+    df = append_indicator_columns(df, specs)
     print("기술 지표 계산 완료.")
     return df
 
-# MongoDB에 저장할 시장 데이터 계층 구조 준비
-def prepare_market_data_documents_for_mongo(df, symbol, interval):
-    doc = []
-    for idx, row in df.iterrows():
-        chart_data = {
-            "open": float(row['open']),
-            "high": float(row['high']),
-            "low": float(row['low']),
-            "close": float(row['close']),
-            "volume": float(row['volume'])
-        }
+# 지표 컬럼 이름 하나를 technical_indicators 안의 경로 (그룹, 하위 그룹 또는 None, 키)로 변환
+# 해당하지 않는 컬럼은 None
+def market_data_indicator_path(col):
+    if col in ['close_time', 'open', 'high', 'low', 'close', 'volume']:
+        return None
+
+    if col.startswith("EMA"):
+        period = col.split("_",1)[1]
+        return ("EMA", None, f"EMA-{period}")
+
+    elif col.startswith("SMA"):
+        period = col.split("_",1)[1]
+        return ("MA", None, f"MA-{period}")
+
+    elif col.startswith("MACD") or col.startswith("MACDh") or col.startswith("MACDs"):
+        kind, grp = col.split("_",1)
+        grp = grp.replace("_", "-")
+        return ("MACD", None, f"{kind}-{grp}")
+
+    elif col.startswith("RSI"):
+        period = col.split("_",1)[1]
+        return ("RSI", None, f"RSI-{period}")
+
+    elif col.startswith("STOCHk") or col.startswith("STOCHd"):
+        kind, grp = col.split("_",1)
+        grp = grp.replace("_", "-")
+        return ("STOCH", grp, "STOCHk" if kind == "STOCHk" else "STOCHd")
+
+    elif col.startswith(("BBL", "BBM", "BBU", "BBB", "BBP")):
+        prefix, grp = col.split("_",1)
+        grp = grp.replace("_", "-")
+        return ("BBANDS", grp, prefix)
+
+    elif col.startswith("ATR"):
+        period = col.split("_",1)[1]
+        return ("ATR", None, f"ATR-{period}")
+
+    elif col == "OBV":
+        return ("OBV", None, "OBV")
+    elif col.startswith("OBV_SMA_") or col.startswith("OBV_MA_") or col.startswith("OBV_"):
+        parts = col.split("_")[-1]
+        return ("OBV", None, f"OBV-MA-{parts}")
+
+    elif col.startswith(("ISA", "ISB", "ITS", "IKS", "ICS")):
+        return ("ICHIMOKU", None, col.replace("_", "-"))
+
+    elif col.startswith("SUPERT"):
+        kind = col.split("_")[0]
+        length = col.split("_")[1]
+        multiplier = col.split("_")[2]
+        return ("SUPERTREND", f"{length}-{multiplier}", kind)
+    elif col.startswith("FIB"):
+        ratio = col.split("_",1)[1]
+        return ("FIB", None, f"FIB-level-{ratio}")
+    return None
+
+# 컬럼 구성(schema)별로 한 번만 컬럼 → 문서 경로 매핑을 만들고 캐시
+@lru_cache(maxsize=64)
+def compile_market_data_schema(columns):
+    indicator_columns = []
+    indicator_paths = []
+    for col in columns:
+        path = market_data_indicator_path(col)
+        if path is not None:
+            indicator_columns.append(col)
+            indicator_paths.append(path)
+    return tuple(indicator_columns), tuple(indicator_paths)
+
+# DataFrame의 모든 행을 {chart_data, technical_indicators} 문서 리스트로 변환 (행 순서 유지)
+# 값은 NumPy 배열에서 한 번에 꺼내고 NaN은 행렬 마스크로 걸러냄
+def build_market_data_documents(df):
+    if df.empty:
+        return []
+    indicator_columns, indicator_paths = compile_market_data_schema(tuple(df.columns))
+    chart_rows = df[CHART_DATA_COLUMNS].to_numpy(dtype=np.float64).tolist()
+    values = df[list(indicator_columns)].to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+    value_rows = values.tolist()
+
+    docs = []
+    for chart_row, value_row, valid_idx in zip(chart_rows, value_rows, (np.flatnonzero(mask).tolist() for mask in valid)):
         ti = {}
-        for col, val in row.items():
-            if pd.isna(val):
-                continue
-            if col in ['close_time', 'open', 'high', 'low', 'close', 'volume']:
-                continue
-            
-            if col.startswith("EMA"):
-                period = col.split("_",1)[1]
-                ti.setdefault("EMA", {})[f"EMA-{period}"] = float(val)
-
-            elif col.startswith("SMA"):
-                period = col.split("_",1)[1]
-                ti.setdefault("MA", {})[f"MA-{period}"] = float(val)
-
-            elif col.startswith("MACD") or col.startswith("MACDh") or col.startswith("MACDs"):
-                kind, grp = col.split("_",1)
-                grp = grp.replace("_", "-")
-                key = f"{kind}-{grp}"
-                ti.setdefault("MACD", {})[key] = float(val)
-
-            elif col.startswith("RSI"):
-                period = col.split("_",1)[1]
-                ti.setdefault("RSI", {})[f"RSI-{period}"] = float(val)
-
-            elif col.startswith("STOCHk") or col.startswith("STOCHd"):
-                kind, grp = col.split("_",1)
-                grp = grp.replace("_", "-")
-                bucket = ti.setdefault("STOCH", {}).setdefault(grp, {})
-                if kind == "STOCHk":
-                    bucket["STOCHk"] = float(val)
-                else:
-                    bucket["STOCHd"] = float(val)
-
-            elif col.startswith(("BBL", "BBM", "BBU", "BBB", "BBP")):
-                prefix, grp = col.split("_",1)
-                grp = grp.replace("_", "-")
-                bb = ti.setdefault("BBANDS", {}).setdefault(grp, {})
-                bb[prefix] = float(val)
-
-            elif col.startswith("ATR"):
-                period = col.split("_",1)[1]
-                ti.setdefault("ATR", {})[f"ATR-{period}"] = float(val)
-
-            elif col == "OBV":
-                ti.setdefault("OBV", {})["OBV"] = float(val)
-            elif col.startswith("OBV_SMA_") or col.startswith("OBV_MA_") or col.startswith("OBV_"):
-                parts = col.split("_")[-1]
-                ti.setdefault("OBV", {})[f"OBV-MA-{parts}"] = float(val)
-
-            elif col.startswith("ISA"):
-                col = col.replace("_", "-")
-                ti.setdefault("ICHIMOKU", {})[col] = float(val)
-            elif col.startswith("ISB"):
-                col = col.replace("_", "-")
-                ti.setdefault("ICHIMOKU", {})[col] = float(val)
-            elif col.startswith("ITS"):
-                col = col.replace("_", "-")
-                ti.setdefault("ICHIMOKU", {})[col] = float(val)
-            elif col.startswith("IKS"):
-                col = col.replace("_", "-")
-                ti.setdefault("ICHIMOKU", {})[col] = float(val)
-            elif col.startswith("ICS"):
-                col = col.replace("_", "-")
-                ti.setdefault("ICHIMOKU", {})[col] = float(val)
-
-            elif col.startswith("SUPERT"):
-                kind = col.split("_")[0]
-                length = col.split("_")[1]
-                multiplier = col.split("_")[2]
-                bucket = ti.setdefault("SUPERTREND", {}).setdefault(f"{length}-{multiplier}", {})
-                bucket[kind] = float(val)
-            elif col.startswith("FIB"):
-                ratio = col.split("_",1)[1]
-                ti.setdefault("FIB", {})[f"FIB-level-{ratio}"] = float(val)
-        # docs.append(doc)
-    return {
-            # "symbol": symbol,
-            "chart_data": chart_data,
+        for j in valid_idx:
+            group, sub, key = indicator_paths[j]
+            bucket = ti.get(group)
+            if bucket is None:
+                bucket = ti[group] = {}
+            if sub is not None:
+                sub_bucket = bucket.get(sub)
+                if sub_bucket is None:
+                    sub_bucket = bucket[sub] = {}
+                bucket = sub_bucket
+            bucket[key] = value_row[j]
+        docs.append({
+            "chart_data": dict(zip(CHART_DATA_COLUMNS, chart_row)),
             "technical_indicators": ti
-        }
+        })
+    return docs
 
-def upsert_daily_market_document(date, market_data=None, community_summary=None, macro_summary=None):
+# MongoDB에 저장할 시장 데이터 계층 구조 준비 (마지막 행 기준)
+def prepare_market_data_documents_for_mongo(df, symbol, interval):
+    return build_market_data_documents(df.iloc[-1:])[0]
+
+DAILY_MARKET_BULK_BATCH_SIZE = 500
+
+# 날짜 문서에 $set 할 경로별 값 (market_data는 심볼 단위 경로로 나눠서 다른 심볼은 건드리지 않음)
+def daily_market_update_fields(market_data=None, community_summary=None, macro_summary=None):
     update_fields = {}
     if market_data is not None:
-        update_fields["market_data"] = market_data
+        for symbol, symbol_data in market_data.items():
+            update_fields[f"market_data.{symbol}"] = symbol_data
     if community_summary is not None:
         update_fields["community_summary"] = community_summary
     if macro_summary is not None:
         update_fields["macro_summary"] = macro_summary
+    return update_fields
+
+def _get_document_path(document, path):
+    value = document
+    for key in path.split('.'):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+def upsert_daily_market_document(date, market_data=None, community_summary=None, macro_summary=None):
+    update_fields = daily_market_update_fields(market_data, community_summary, macro_summary)
     if not update_fields:
         return
-    daily_market_collection.update_one(
+    metrics.count("mongo_round_trips_total", op="update_one")
+    get_daily_market_collection().update_one(
         {"date": date},
         {"$set": update_fields},
         upsert=True
     )
 
+# 여러 날짜 문서를 unordered bulk_write로 묶어서 저장
+# documents: [{"date": ..., "market_data": ..., "community_summary": ..., "macro_summary": ...}] (없는 필드는 건너뜀)
+# 저장된 값과 같은 경로는 $set에서 빼고, 바뀐 것이 없는 날짜는 요청하지 않음
+# 반환값: {"matched": n, "upserted": n, "modified": n, "unchanged": n}
+def bulk_upsert_daily_market_documents(documents, batch_size=DAILY_MARKET_BULK_BATCH_SIZE):
+    from pymongo import UpdateOne
+    stats = {"matched": 0, "upserted": 0, "modified": 0, "unchanged": 0}
+    documents = list(documents)
+    for batch_start in range(0, len(documents), batch_size):
+        batch = []
+        for document in documents[batch_start:batch_start + batch_size]:
+            update_fields = daily_market_update_fields(
+                document.get("market_data"), document.get("community_summary"), document.get("macro_summary")
+            )
+            if update_fields:
+                batch.append((document["date"], update_fields))
+        if not batch:
+            continue
+
+        # 이번 배치에서 쓸 경로만 projection으로 읽어와 기존 값과 비교
+        projection = {path: 1 for _, update_fields in batch for path in update_fields}
+        projection["date"] = 1
+        metrics.count("mongo_round_trips_total", op="find")
+        with metrics.span("mongo_find", collection="daily_market"):
+            existing = {
+                stored["date"]: stored
+                for stored in get_daily_market_collection().find({"date": {"$in": [date for date, _ in batch]}}, projection)
+            }
+
+        operations = []
+        for date, update_fields in batch:
+            stored = existing.get(date)
+            if stored is not None:
+                update_fields = {path: value for path, value in update_fields.items()
+                                 if _get_document_path(stored, path) != value}
+                if not update_fields:
+                    stats["unchanged"] += 1
+                    continue
+            operations.append(UpdateOne({"date": date}, {"$set": update_fields}, upsert=True))
+        if not operations:
+            continue
+        metrics.count("mongo_round_trips_total", op="bulk_write")
+        with metrics.span("mongo_bulk_write", collection="daily_market"):
+            result = get_daily_market_collection().bulk_write(operations, ordered=False)
+        stats["matched"] += result.matched_count
+        stats["upserted"] += result.upserted_count
+        stats["modified"] += result.modified_count
+    print(f"daily_market 일괄 저장 완료: matched {stats['matched']}, upserted {stats['upserted']}, "
+          f"modified {stats['modified']}, unchanged {stats['unchanged']}")
+    return stats
+
+# 저장된 요약이 실패 결과(오류 메시지, API 키 없음)인지 확인 (재실행 시 다시 요청해야 하는 값)
+COMMUNITY_SUMMARY_LABEL = "GPT 커뮤니티 요약"
+MACRO_SUMMARY_LABEL = "GPT 거시경제 요약"
+SUMMARY_ERROR_LABELS = (COMMUNITY_SUMMARY_LABEL, MACRO_SUMMARY_LABEL)
+SUMMARY_MISSING_VALUES = ("API 키 없음",)
+
+def is_missing_summary(value):
+    if not isinstance(value, str) or not value.strip():
+        return True
+    if value in SUMMARY_MISSING_VALUES:
+        return True
+    return value.startswith(tuple(f"{label} 오류:" for label in SUMMARY_ERROR_LABELS))
+
+# 이어서 실행(resume)할 때 남은 작업 목록
+# date 인덱스를 쓰는 projection 쿼리 한 번으로 날짜별 저장된 심볼/요약을 확인
+# 반환값: ({symbol: [빠진 date_str]}, [요약이 빠졌거나 오류인 date_str])
+def find_missing_daily_market_work(date_strs, symbols):
+    date_strs = list(date_strs)
+    projection = {"_id": 0, "date": 1, "community_summary": 1, "macro_summary": 1}
+    for symbol in symbols:
+        # 심볼 문서 전체 대신 존재 확인용 필드 하나만 읽음
+        projection[f"market_data.{symbol}.chart_data.close"] = 1
+    metrics.count("mongo_round_trips_total", op="find")
+    stored = {doc["date"]: doc for doc in get_daily_market_collection().find({"date": {"$in": date_strs}}, projection)}
+
+    missing_market = {symbol: [] for symbol in symbols}
+    missing_summary_dates = []
+    for date_str in date_strs:
+        doc = stored.get(date_str, {})
+        for symbol in symbols:
+            if _get_document_path(doc, f"market_data.{symbol}.chart_data") is None:
+                missing_market[symbol].append(date_str)
+        if is_missing_summary(doc.get("community_summary")) or is_missing_summary(doc.get("macro_summary")):
+            missing_summary_dates.append(date_str)
+    print(f"이어서 실행: {len(date_strs)}일 중 요약 필요 {len(missing_summary_dates)}일, "
+          + ", ".join(f"{symbol} {len(missing)}일" for symbol, missing in missing_market.items()))
+    return missing_market, missing_summary_dates
+
+# GPT 요청 전용 제한기 (Binance weight 제한기와 별도)
+openai_request_limiter = TokenBucket(1, OPENAI_REQUESTS_PER_MINUTE / 60)
+
+# GPT 요약 요청 파라미터 (캐시 키에 포함되므로 바꾸면 새로 호출됨)
+SUMMARY_MODEL = "gpt-4o"
+SUMMARY_TEMPERATURE = 0.7
+SUMMARY_MAX_TOKENS = 1024
+
+# GPT 요약 영구 캐시 (SUMMARY_CACHE_ENABLED=0 이면 None). SQLite 파일은 처음 사용할 때 열림. common.summary_cache로도 접근
+SUMMARY_CACHE_TTL_DAYS = float(os.getenv('SUMMARY_CACHE_TTL_DAYS', 90))
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv('SUMMARY_CACHE_MAX_ENTRIES', 20000))
+
+def get_summary_cache():
+    return _lazy_value('summary_cache', lambda: SummaryCache(
+        os.getenv('SUMMARY_CACHE_PATH', SUMMARY_CACHE_PATH),
+        ttl_seconds=SUMMARY_CACHE_TTL_DAYS * 24 * 60 * 60,
+        max_entries=SUMMARY_CACHE_MAX_ENTRIES
+    ) if os.getenv('SUMMARY_CACHE_ENABLED', '1') != '0' else None)
+
+_LAZY_ATTRIBUTES['summary_cache'] = get_summary_cache
+
+# 공용 비동기 LLM 클라이언트 설정
+# LLM_BACKEND: 'openai' (기본) 또는 'stub' (API 호출 없이 처리량 확인용, 결과를 캐시에 저장하지 않음)
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'openai')
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', LLM_MAX_CONCURRENCY))
+OPENAI_TOKENS_PER_MINUTE = float(os.getenv('OPENAI_TOKENS_PER_MINUTE', 30000))
+openai_token_limiter = TokenBucket(OPENAI_TOKENS_PER_MINUTE, OPENAI_TOKENS_PER_MINUTE / 60)
+
+# 클라이언트는 처음 사용할 때 한 번만 만들어 재사용 (연결 풀 공유)
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+def get_llm_client():
+    global _llm_client
+    with _llm_client_lock:
+        if _llm_client is None:
+            backend = StubLLMBackend() if LLM_BACKEND == 'stub' else OpenAIBackend(_lazy('openai_api_key'))
+            _llm_client = AsyncLLMClient(
+                backend,
+                max_concurrency=LLM_MAX_CONCURRENCY,
+                request_limiter=openai_request_limiter,
+                token_limiter=openai_token_limiter
+            )
+        return _llm_client
+
+# 여러 프롬프트를 동시에 요약 (캐시에 있는 프롬프트는 API 호출 없이 반환)
+# error_labels: 프롬프트별 오류 메시지 접두어. 오류 메시지는 캐시에 저장하지 않으므로 다음 실행에서 다시 시도함
+def summarize_prompts(prompts, error_labels):
+    if LLM_BACKEND != 'stub' and not _lazy('openai_api_key'):
+        print("OPENAI_API_KEY가 설정되지 않았습니다. GPT API 호출을 건너뜁니다.")
+        return ["API 키 없음"] * len(prompts)
+    cache = get_summary_cache() if LLM_BACKEND != 'stub' else None
+    results = [None] * len(prompts)
+    keys = [SummaryCache.make_key(SUMMARY_MODEL, prompt, SUMMARY_TEMPERATURE, SUMMARY_MAX_TOKENS) for prompt in prompts]
+    if cache is not None:
+        for i, key in enumerate(keys):
+            results[i] = cache.get(key)
+    missing = [i for i, result in enumerate(results) if result is None]
+    metrics.count("summary_cache_hits_total", len(prompts) - len(missing))
+    if not missing:
+        return results
+
+    responses = get_llm_client().complete_many(
+        [prompts[i] for i in missing], SUMMARY_MODEL, SUMMARY_TEMPERATURE, SUMMARY_MAX_TOKENS
+    )
+    for i, response in zip(missing, responses):
+        if isinstance(response, Exception):
+            print(f"{error_labels[i]} 오류: {response}")
+            results[i] = f"{error_labels[i]} 오류: {response}"
+            continue
+        results[i] = response
+        if response and cache is not None:
+            cache.put(keys[i], response, model=SUMMARY_MODEL)
+    return results
+
+# 프롬프트 하나를 GPT로 요약
+def call_gpt_summary(prompt, error_label):
+    return summarize_prompts([prompt], [error_label])[0]
+
+def community_summary_prompt(date_str):
+    return f"{date_str}에 작성된 암호화폐 관련 레딧, 트위터, 커뮤니티 게시글과 반응을 요약해줘. 주요 이슈, 투자심리, 논쟁거리, 시장 분위기를 한글로 10문장 이내로 정리해줘."
+
+def macro_summary_prompt(date_str):
+    return f"{date_str}에 발표된 암호화폐 및 거시경제 관련 주요 뉴스, 정책, 경제지표, 글로벌 이슈를 한글로 10문장 이내로 요약해줘. 암호화폐 시장에 영향을 줄 만한 거시경제 이벤트를 중심으로 정리해줘."
+
+# 여러 날짜의 커뮤니티/거시경제 요약을 모두 동시에 요청
+# 반환값: {date_str: {"community_summary": ..., "macro_summary": ...}}
+def summarize_dates(date_strs):
+    date_strs = list(date_strs)
+    prompts = []
+    labels = []
+    for date_str in date_strs:
+        prompts += [community_summary_prompt(date_str), macro_summary_prompt(date_str)]
+        labels += [COMMUNITY_SUMMARY_LABEL, MACRO_SUMMARY_LABEL]
+    results = summarize_prompts(prompts, labels)
+    return {
+        date_str: {"community_summary": results[2 * i], "macro_summary": results[2 * i + 1]}
+        for i, date_str in enumerate(date_strs)
+    }
+
 # GPT-4o를 활용한 커뮤니티 요약 생성
 def call_gpt_community_summary(date_str):
-    if not openai_api_key:
-        print("OPENAI_API_KEY가 설정되지 않았습니다. GPT API 호출을 건너뜁니다.")
-        return "API 키 없음"
-    prompt = f"{date_str}에 작성된 암호화폐 관련 레딧, 트위터, 커뮤니티 게시글과 반응을 요약해줘. 주요 이슈, 투자심리, 논쟁거리, 시장 분위기를 한글로 10문장 이내로 정리해줘."
-    try:
-        client = openai.OpenAI(api_key=openai_api_key)
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            max_tokens=1024
-        )
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        print(f"GPT 커뮤니티 요약 오류: {e}")
-        return f"GPT 커뮤니티 요약 오류: {e}"
+    return call_gpt_summary(community_summary_prompt(date_str), COMMUNITY_SUMMARY_LABEL)
 
 # GPT-4o를 활용한 거시경제 뉴스 요약 생성
 def call_gpt_macro_summary(date_str):
-    if not openai_api_key:
-        print("OPENAI_API_KEY가 설정되지 않았습니다. GPT API 호출을 건너뜁니다.")
-        return "API 키 없음"
-    prompt = f"{date_str}에 발표된 암호화폐 및 거시경제 관련 주요 뉴스, 정책, 경제지표, 글로벌 이슈를 한글로 10문장 이내로 요약해줘. 암호화폐 시장에 영향을 줄 만한 거시경제 이벤트를 중심으로 정리해줘."
-    try:
-        client = openai.OpenAI(api_key=openai_api_key)
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            max_tokens=1024
-        )
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        print(f"GPT 거시경제 요약 오류: {e}")
-        return f"GPT 거시경제 요약 오류: {e}"
\ No newline at end of file
+    return call_gpt_summary(macro_summary_prompt(date_str), MACRO_SUMMARY_LABEL)
@@ -1,52 +1,267 @@
 from binance.client import Client
-from common import api_key, api_secret, fetch_historical_klines, calculate_all_indicators, upsert_daily_market_document, call_gpt_community_summary, call_gpt_macro_summary, prepare_market_data_documents_for_mongo
+import common
+from common import fetch_historical_klines, fetch_historical_klines_for_symbols, calculate_all_indicators, upsert_daily_market_document, summarize_dates, find_missing_daily_market_work, prepare_market_data_documents_for_mongo, build_market_data_documents, calculate_fib_levels, MIN_INDICATOR_CANDLES, FIB_WINDOW
 from datetime import datetime, timedelta
+import pandas as pd
+import numpy as np
 import time
+from pipeline_stages import StagedPipeline
+from indicator_panel import calculate_indicators_panel
+from db_indexes import ensure_market_indexes
+from market_series import write_market_documents, bulk_upsert_market_series_documents, find_missing_market_series, MARKET_STORAGE_LAYOUT
+from instrumentation import metrics, serve_metrics_from_env
+
+LOOKBACK_DAYS = 250 # 지표 계산을 위해 START_DATE 기준으로 불러올 과거 일수
+LOOKAHEAD_INDICATOR_PREFIXES = ("ICS",) # 미래 종가를 당겨오는 지표 (Ichimoku 후행스팬)
+PANEL_INDICATORS = True # range 모드에서 모든 심볼의 지표를 (시간 × 심볼) 패널로 한 번에 계산
+
+def iter_dates(start_date, end_date):
+    return (start_date + timedelta(days=n) for n in range((end_date - start_date).days + 1))
+
+# 날짜 하나에 대해 심볼마다 lookback 구간을 새로 받아 지표를 계산 (기존 방식)
+def build_market_data_for_date(binance_client, symbols, interval, current_date, lookback_days=LOOKBACK_DAYS):
+    date_str = current_date.strftime('%Y-%m-%d')
+    market_data_dict = {}
+    for symbol in symbols:
+        lookback_start = (current_date - timedelta(days=lookback_days)).strftime('%Y-%m-%d')
+        df = fetch_historical_klines(binance_client, symbol, interval, lookback_start, date_str) # 가격 데이터 가져오기
+        if df.empty:
+            continue
+
+        df = calculate_all_indicators(df) # 가격 데이터로 기술 지표 계산해 추가
+
+        # open_time의 date만 비교해서 해당 날짜의 모든 캔들 추출
+        daily_row = df[df.index.date == current_date]
+        if daily_row.empty:
+            print(f"{symbol} {date_str}에 해당하는 open_time 데이터 없음")
+            continue
+        market_data_dict[symbol] = prepare_market_data_documents_for_mongo(daily_row, symbol, interval) # 시장 데이터 문서 준비
+    return market_data_dict
+
+# 범위 전체를 한 번에 계산한 DataFrame에서 해당 날짜의 캔들을 잘라냄
+# 날짜별 방식과 같은 문서가 나오도록, 그 날짜 기준 lookback 구간만 보고 계산되는 값을 다시 맞춤
+def slice_daily_row(df, current_date, lookback_days=LOOKBACK_DAYS):
+    day_start = pd.Timestamp(current_date)
+    lo = df.index.searchsorted(day_start)
+    hi = df.index.searchsorted(day_start + pd.Timedelta(days=1))
+    if lo == hi:
+        return None
+    # 날짜별 방식의 조회 구간: [날짜 - lookback, 날짜 + 1일] (endTime 캔들 포함)
+    window_lo = df.index.searchsorted(day_start - pd.Timedelta(days=lookback_days))
+    window_hi = df.index.searchsorted(day_start + pd.Timedelta(days=1), side='right')
+
+    daily_row = df.iloc[lo:hi].copy()
+    if window_hi - window_lo < MIN_INDICATOR_CANDLES:
+        # 날짜별 방식에서는 지표 없이 캔들 데이터만 저장되는 구간
+        return daily_row[['close_time', 'open', 'high', 'low', 'close', 'volume']]
+
+    # 후행스팬은 미래 종가이므로 그 날짜 시점에는 존재하지 않음
+    lookahead_cols = [col for col in daily_row.columns if col.startswith(LOOKAHEAD_INDICATOR_PREFIXES)]
+    daily_row[lookahead_cols] = np.nan
+
+    # OBV는 누적값이므로 그 날짜의 lookback 시작 캔들(+거래량으로 시작)을 기준으로 다시 맞춤
+    if 'OBV' in df.columns:
+        obv_offset = df['OBV'].iloc[window_lo] - df['volume'].iloc[window_lo]
+        obv_cols = [col for col in daily_row.columns if col == 'OBV' or col.startswith('OBV_')]
+        daily_row[obv_cols] = daily_row[obv_cols] - obv_offset
+
+    # 피보나치 되돌림은 날짜별 조회 구간의 마지막 30개 캔들 기준
+    fib_levels = calculate_fib_levels(df.iloc[max(window_lo, window_hi - FIB_WINDOW):window_hi], verbose=False)
+    for key, value in fib_levels.items():
+        daily_row[key] = value
+    return daily_row
+
+# 범위 전체 지표가 계산된 심볼 DataFrame에서 날짜별 문서를 한 번에 만듦
+# 반환값: [(date_str, 문서)] (해당 날짜 캔들이 없으면 건너뜀)
+def build_symbol_documents_for_range(symbol, df, dates, lookback_days=LOOKBACK_DAYS):
+    # 날짜별 마지막 캔들 행을 모아 한 번에 문서로 변환
+    date_strs = []
+    daily_rows = []
+    for current_date in dates:
+        date_str = current_date.strftime('%Y-%m-%d')
+        with metrics.span("daily_row", symbol=symbol, date=date_str):
+            daily_row = slice_daily_row(df, current_date, lookback_days)
+        if daily_row is None:
+            print(f"{symbol} {date_str}에 해당하는 open_time 데이터 없음")
+            continue
+        date_strs.append(date_str)
+        daily_rows.append(daily_row.iloc[-1:])
+    if not daily_rows:
+        return []
+    return list(zip(date_strs, build_market_data_documents(pd.concat(daily_rows))))
+
+# 심볼마다 [START_DATE - lookback, END_DATE]를 한 번만 가져와 지표를 한 번 계산한 뒤 날짜별로 잘라냄
+def build_market_data_for_range(binance_client, symbols, interval, start_date, end_date, lookback_days=LOOKBACK_DAYS,
+                                panel_indicators=PANEL_INDICATORS):
+    dates = list(iter_dates(start_date, end_date))
+    market_data_by_date = {current_date.strftime('%Y-%m-%d'): {} for current_date in dates}
+    lookback_start = (start_date - timedelta(days=lookback_days)).strftime('%Y-%m-%d')
+    frames = fetch_historical_klines_for_symbols(binance_client, symbols, interval, lookback_start, end_date.strftime('%Y-%m-%d'))
+    if panel_indicators:
+        frames = calculate_indicators_panel(frames)
+    for symbol in symbols:
+        df = frames[symbol]
+        if df.empty:
+            continue
+
+        if not panel_indicators:
+            df = calculate_all_indicators(df)
+        for date_str, doc in build_symbol_documents_for_range(symbol, df, dates, lookback_days):
+            market_data_by_date[date_str][symbol] = doc
+    return market_data_by_date
+
+# 백필할 작업 목록: ([(심볼, 계산할 날짜 목록)], 요약을 만들 날짜 목록)
+# resume=True이면 daily_market에 이미 저장된 심볼/요약은 빼고 빠진 날짜만 (오류 메시지로 저장된 요약은 빠진 것으로 봄)
+# 시장 데이터를 market_series에만 저장하는 경우 심볼별 확인은 market_series에서 함
+def plan_backfill_work(symbols, start_date, end_date, resume=False, interval=None):
+    dates = list(iter_dates(start_date, end_date))
+    if not resume:
+        return [(symbol, dates) for symbol in symbols], dates
+    date_by_str = {current_date.strftime('%Y-%m-%d'): current_date for current_date in dates}
+    missing_market, missing_summary_dates = find_missing_daily_market_work(date_by_str, symbols)
+    if MARKET_STORAGE_LAYOUT == 'series' and interval is not None:
+        missing_market = find_missing_market_series(date_by_str, symbols, interval)
+    symbol_dates = [(symbol, [date_by_str[date_str] for date_str in missing]) for symbol, missing in missing_market.items() if missing]
+    return symbol_dates, [date_by_str[date_str] for date_str in missing_summary_dates]
+
+STAGE_QUEUE_SIZE = 64
+FETCH_WORKERS = 4
+INDICATOR_WORKERS = 2
+LLM_WORKERS = 2
+SUMMARY_DATES_PER_BATCH = 8 # summaries 단계에서 한 번에 동시 요청할 날짜 수 (날짜당 프롬프트 2개)
+WRITE_BATCH_SIZE = 100
+
+# 단계별 파이프라인 (시장 데이터: 캔들 → 지표 → 문서, LLM 요약: 날짜별) 두 흐름을 동시에 실행하고
+# 결과를 하나의 저장 단계에서 모아 일괄 저장. 외부 서비스마다 별도 제한기(Binance weight, OpenAI 요청 수)를 사용
+# resume=True이면 daily_market에 이미 저장된 심볼/요약은 건너뛰고 빠진 날짜만 계산
+# (오류 메시지로 저장된 요약은 빠진 것으로 보고 다시 요청)
+def run_staged_backfill(binance_client, symbols, interval, start_date, end_date, lookback_days=LOOKBACK_DAYS,
+                        with_summaries=True, write_batch_size=WRITE_BATCH_SIZE, resume=False):
+    symbol_dates, summary_dates = plan_backfill_work(symbols, start_date, end_date, resume, interval)
+
+    def fetch_stage(item):
+        # 해당 심볼에 필요한 날짜 구간(+ lookback)만 가져옴
+        symbol, target_dates = item
+        lookback_start = (target_dates[0] - timedelta(days=lookback_days)).strftime('%Y-%m-%d')
+        with metrics.span("fetch", symbol=symbol, interval=interval):
+            df = fetch_historical_klines(binance_client, symbol, interval, lookback_start, target_dates[-1].strftime('%Y-%m-%d'))
+        if not df.empty:
+            yield symbol, target_dates, df
+
+    def indicator_stage(item):
+        symbol, target_dates, df = item
+        with metrics.span("indicators", symbol=symbol, interval=interval):
+            df = calculate_all_indicators(df)
+        yield symbol, target_dates, df
+
+    def document_stage(item):
+        symbol, target_dates, df = item
+        with metrics.span("documents", symbol=symbol, interval=interval):
+            documents = build_symbol_documents_for_range(symbol, df, target_dates, lookback_days)
+        for date_str, doc in documents:
+            yield {"date": date_str, "market_data": {symbol: doc}}
+
+    def summary_stage(date_batch):
+        # 배치 안의 모든 날짜의 커뮤니티/거시경제 요약을 동시에 요청 (공용 LLM 클라이언트의 동시 요청 수/토큰 제한 적용)
+        with metrics.span("summaries"):
+            summaries_by_date = summarize_dates(d.strftime('%Y-%m-%d') for d in date_batch)
+        for date_str, summaries in summaries_by_date.items():
+            yield {"date": date_str, **summaries}
+
+    # 같은 날짜의 결과를 모아 두었다가 write_batch_size개 날짜마다 일괄 저장
+    pending = {}
+    def flush():
+        if pending:
+            with metrics.span("write"):
+                write_market_documents(list(pending.values()), interval)
+            pending.clear()
+
+    def write_stage(update):
+        metrics.count("pipeline_date_updates_total", kind="market_data" if "market_data" in update else "summaries")
+        merged = pending.setdefault(update["date"], {"date": update["date"]})
+        for key, value in update.items():
+            if key == "market_data":
+                merged.setdefault("market_data", {}).update(value)
+            elif key != "date":
+                merged[key] = value
+        if len(pending) >= write_batch_size:
+            flush()
+
+    pipeline = StagedPipeline()
+    pipeline.add_stage("fetch", fetch_stage, workers=FETCH_WORKERS, queue_size=STAGE_QUEUE_SIZE, downstream="indicators")
+    pipeline.add_stage("indicators", indicator_stage, workers=INDICATOR_WORKERS, queue_size=STAGE_QUEUE_SIZE, downstream="documents")
+    pipeline.add_stage("documents", document_stage, workers=1, queue_size=STAGE_QUEUE_SIZE, downstream="write")
+    sources = {"fetch": symbol_dates}
+    if with_summaries and summary_dates:
+        pipeline.add_stage("summaries", summary_stage, workers=LLM_WORKERS, queue_size=STAGE_QUEUE_SIZE, downstream="write")
+        sources["summaries"] = [summary_dates[i:i + SUMMARY_DATES_PER_BATCH] for i in range(0, len(summary_dates), SUMMARY_DATES_PER_BATCH)]
+    pipeline.add_stage("write", write_stage, workers=1, queue_size=STAGE_QUEUE_SIZE, on_finish=flush)
+    return pipeline.run(sources)
+
+# 기존 방식: 날짜를 하나씩 진행하며 시장 데이터와 LLM 요약을 저장하고 날짜마다 sleep_seconds만큼 쉼
+# range_backfill=True이면 시장 데이터는 범위 전체를 한 번에 계산해 먼저 일괄 저장
+def run_sequential_backfill(binance_client, symbols, interval, start_date, end_date, range_backfill=True, sleep_seconds=0):
+    market_data_by_date = None
+    if range_backfill:
+        market_data_by_date = build_market_data_for_range(binance_client, symbols, interval, start_date, end_date)
+        # 시장 데이터는 모든 날짜를 한 번에 일괄 저장 (바뀐 심볼 경로만 $set)
+        write_market_documents(
+            ({"date": date_str, "market_data": market_data_dict} for date_str, market_data_dict in market_data_by_date.items()),
+            interval
+        )
+
+    # 날짜 범위 내의 모든 날짜에 대해 반복
+    for current_date in iter_dates(start_date, end_date):
+        date_str = current_date.strftime('%Y-%m-%d')
+        with metrics.span("date", date=date_str):
+            if market_data_by_date is not None:
+                market_data_dict = market_data_by_date[date_str]
+            else:
+                market_data_dict = build_market_data_for_date(binance_client, symbols, interval, current_date)
+
+            summaries = summarize_dates([date_str])[date_str] # 커뮤니티/거시경제 요약을 동시에 생성
+
+            # MongoDB에 문서 삽입 또는 업데이트 (range 모드에서는 시장 데이터가 이미 저장되어 요약만 저장)
+            if market_data_by_date is None and MARKET_STORAGE_LAYOUT != 'daily':
+                bulk_upsert_market_series_documents([{"date": date_str, "market_data": market_data_dict}], interval)
+            upsert_daily_market_document(
+                date_str,
+                market_data=market_data_dict if market_data_by_date is None and MARKET_STORAGE_LAYOUT != 'series' else None,
+                community_summary=summaries["community_summary"],
+                macro_summary=summaries["macro_summary"]
+            )
+        print(f"{current_date} 저장 완료 (market_data count: {len(market_data_dict)})")
+
+        # 3분 간격으로 호출
+        if sleep_seconds and current_date < end_date:
+            print(f"--- {sleep_seconds // 60}분 휴식 ---\n")
+            time.sleep(sleep_seconds)
 
 if __name__ == "__main__":
     SYMBOLS = ['BTCUSDT', 'ETHUSDT'] # 여기에 원하는 심볼을 추가
     INTERVAL = Client.KLINE_INTERVAL_1DAY
     START_DATE_STR = '2023-01-01' # 시작 날짜
     END_DATE_STR = '2023-01-05' # 종료 날짜
-    PERPLEXITY_SLEEP_SECONDS = 3 * 60
+    PERPLEXITY_SLEEP_SECONDS = 3 * 60 # 'range'/'daily' 모드에서 날짜 사이 휴식 시간
+    # 'staged': 단계별 동시 실행 (LLM 요약은 OpenAI 제한기 속도로 진행)
+    # 'parallel': 심볼 × 날짜 구간 조각을 여러 프로세스에서 계산 (CPU 코어 수만큼)
+    # 'range': 심볼별로 전체 구간을 한 번만 가져와 계산, 'daily': 날짜마다 lookback 구간을 새로 가져옴
+    PIPELINE_MODE = 'staged'
+    RESUME = True # 'staged'/'parallel' 모드에서 이미 저장된 날짜/심볼/요약은 건너뜀 (중단 후 재실행용)
 
     start_date = datetime.strptime(START_DATE_STR, '%Y-%m-%d').date()
     end_date = datetime.strptime(END_DATE_STR, '%Y-%m-%d').date()
 
-    # 날짜 범위 내의 모든 날짜에 대해 반복
-    for current_date in (start_date + timedelta(days=n) for n in range((end_date - start_date).days + 1)):
-        date_str = current_date.strftime('%Y-%m-%d')
-        market_data_dict = {}
-        for symbol in SYMBOLS:
-            lookback_start = (current_date - timedelta(days=250)).strftime('%Y-%m-%d')
-            df = fetch_historical_klines(Client(api_key, api_secret), symbol, INTERVAL, lookback_start, date_str) # 가격 데이터 가져오기
-            if df.empty:
-                continue
-            
-            df = calculate_all_indicators(df) # 가격 데이터로 기술 지표 계산해 추가
-
-            # open_time의 date만 비교해서 해당 날짜의 모든 캔들 추출
-            daily_row = df[df.index.date == current_date]
-            if daily_row.empty:
-                print(f"{symbol} {date_str}에 해당하는 open_time 데이터 없음")
-                continue
-            market_data_dict[symbol] = prepare_market_data_documents_for_mongo(daily_row, symbol, INTERVAL) # 시장 데이터 문서 준비
-        
-        community_summary = call_gpt_community_summary(date_str) # 커뮤니티 요약 생성
-        macro_summary = call_gpt_macro_summary(date_str) # 거시경제 요약 생성
-
-        # MongoDB에 문서 삽입 또는 업데이트
-        upsert_daily_market_document(
-            date_str,
-            market_data=market_data_dict,
-            community_summary=community_summary,
-            macro_summary=macro_summary
-        )
-        print(f"{current_date} 저장 완료 (market_data count: {len(market_data_dict)})")
-
-        # 3분 간격으로 호출
-        if current_date < end_date:
-            print(f"--- {PERPLEXITY_SLEEP_SECONDS // 60}분 휴식 ---\n")
-            time.sleep(PERPLEXITY_SLEEP_SECONDS)
+    binance_client = Client(common.api_key, common.api_secret)
+    serve_metrics_from_env()
+    ensure_market_indexes()
+    if PIPELINE_MODE == 'staged':
+        run_staged_backfill(binance_client, SYMBOLS, INTERVAL, start_date, end_date, resume=RESUME)
+    elif PIPELINE_MODE == 'parallel':
+        from parallel_backfill import run_parallel_backfill
+        run_parallel_backfill(binance_client, SYMBOLS, INTERVAL, start_date, end_date, resume=RESUME)
+    else:
+        run_sequential_backfill(binance_client, SYMBOLS, INTERVAL, start_date, end_date,
+                                range_backfill=(PIPELINE_MODE == 'range'), sleep_seconds=PERPLEXITY_SLEEP_SECONDS)
 
-    print("통합 파이프라인 실행 완료.") 
\ No newline at end of file
+    print("통합 파이프라인 실행 완료.")
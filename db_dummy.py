@@ -3,14 +3,40 @@ import datetime
 import pandas as pd
 from pymongo import MongoClient
 import random
+from columnar_codec import encode_columnar
 
 # --- 1. 기본 설정 및 DB 연결 ---
-client = MongoClient('mongodb://localhost:27017/')
-db = client['crypto_agent_db']
-# 이전 실행 데이터를 초기화하여 항상 새로운 상태에서 시작
-for collection_name in db.list_collection_names():
-    db[collection_name].drop()
-print("Previous database data cleared.")
+# import 시에는 연결하지 않고 get_db()를 처음 호출할 때 만듭니다. (db_dummy.db, db_dummy.client 속성 접근도 같음)
+MONGO_URI = 'mongodb://localhost:27017/'
+DB_NAME = 'crypto_agent_db'
+
+def get_client():
+    """에이전트 DB용 MongoClient를 반환합니다. (처음 호출할 때 생성)"""
+    client = globals().get('client')
+    if client is None:
+        client = globals()['client'] = MongoClient(MONGO_URI)
+    return client
+
+def get_db():
+    """에이전트 DB(crypto_agent_db)를 반환합니다."""
+    database = globals().get('db')
+    if database is None:
+        database = globals()['db'] = get_client()[DB_NAME]
+    return database
+
+def close_client():
+    """연결을 닫고, 다음 get_db() 호출 때 다시 만들도록 초기화합니다."""
+    client = globals().pop('client', None)
+    globals().pop('db', None)
+    if client is not None:
+        client.close()
+
+def __getattr__(name):
+    if name == 'client':
+        return get_client()
+    if name == 'db':
+        return get_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # --- 파라미터 변수 ---
 # 기획서에 명시된 5개의 전문 부서
@@ -24,16 +50,31 @@ DEPARTMENTS = [
 TODAY_STR = datetime.date(2025, 6, 30).strftime("%Y-%m-%d")
 LOOP = 12
 EPISODE = 5
+# True이면 trades_data / executions_data를 레코드 목록 대신 컬럼형(columnar_codec)으로 저장
+COLUMNAR_TRADE_LOGS = False
 
 def get_utc_timestamp():
     """현재 UTC 타임스탬프를 ISO 형식으로 반환합니다."""
     return datetime.datetime.now(datetime.timezone.utc).isoformat()
 
+def clear_database(db):
+    """이전 실행 데이터를 모두 삭제합니다. (명시적으로 호출할 때만 실행)"""
+    for collection_name in db.list_collection_names():
+        db[collection_name].drop()
+    print("Previous database data cleared.")
+
+def department_profile(dept):
+    """부서 이름에 해당하는 기본 부서를 반환합니다. (예: 'Trend_Analyst_7' -> 'Trend_Analyst')"""
+    for base in DEPARTMENTS:
+        if dept == base or dept.startswith(f"{base}_"):
+            return base
+    raise ValueError(f"Unknown department: {dept}")
+
 # --- 2. 더미 데이터 생성 함수 (스키마 기반) ---
 # 이 함수들은 DB 스키마에 따라 Python 딕셔너리 또는 딕셔너리 리스트를 생성합니다.
 # 각 부서의 특성을 반영하기 위해 일부 값을 동적으로 생성합니다.
 
-def create_strategy_cases_checklist(dept):
+def create_strategy_cases_checklist(dept, date_str=TODAY_STR):
     """부서(dept) 특성에 맞는 전략 케이스와 체크리스트를 생성합니다."""
     # 부서별로 다른 전략 케이스 예시
     cases = {
@@ -75,10 +116,10 @@ def create_strategy_cases_checklist(dept):
         "position_side": "long",
         "preferred_action": "long"
     }
-    specific_case = {**cases[dept], **base_case} # 딕셔너리 언패킹 사용
+    specific_case = {**cases[department_profile(dept)], **base_case} # 딕셔너리 언패킹 사용
 
     return {
-        "version": f"{TODAY_STR}_1",
+        "version": f"{date_str}_1",
         "updated_at": get_utc_timestamp(),
         "cases": [specific_case],
         "checklists": [
@@ -92,7 +133,7 @@ def create_strategy_cases_checklist(dept):
         ]
     }
 
-def create_memory_guideline(dept):
+def create_memory_guideline(dept, date_str=TODAY_STR):
     """부서(dept) 특성에 맞는 기억 지침을 생성합니다."""
     # 부서별로 집중하는 메모리 규칙이 다를 수 있습니다.
     style_guide_map = {
@@ -103,23 +144,23 @@ def create_memory_guideline(dept):
         "News-Sentiment_Reader": "주요 뉴스와 커뮤니티 반응이 시장 가격에 미친 영향을 중심으로 기록한다.",
     }
     return {
-        "version": f"{TODAY_STR}_1",
+        "version": f"{date_str}_1",
         "updated_at": get_utc_timestamp(),
         "short_memory_rule": "최근 5일간의 주요 시장 이벤트와 PnL을 중심으로 요약한다.",
         "mid_memory_rule": "최근 20일간의 주요 전략 성공/실패 사례를 분석한다.",
         "long_memory_rule": "지난 60일 이상의 거시 경제 지표 변화와 장기 추세를 기록한다.",
         "length_limit_tokens": 350,
-        "style_guide": style_guide_map[dept]
+        "style_guide": style_guide_map[department_profile(dept)]
     }
 
-def create_market_snapshot():
+def create_market_snapshot(date_str=TODAY_STR, rng=random):
     """시장 스냅샷 데이터를 생성합니다."""
     return {
-        "date": TODAY_STR,
+        "date": date_str,
         "timestamp_utc": get_utc_timestamp(),
         "symbols": {
             "BTCUSDT": {
-                "p": 61234.5 + random.uniform(-100, 100),
+                "p": 61234.5 + rng.uniform(-100, 100),
                 "v": 34750.2,
                 "rsi14": 62.1,
                 "macd": -45.3
@@ -152,7 +193,7 @@ def create_portfolio_snapshot():
         "pending_orders": []
     }
 
-def create_decision(dept, strategy_id):
+def create_decision(dept, strategy_id, rng=random):
     """의사결정 데이터를 생성합니다."""
     return {
         "ts": get_utc_timestamp(),
@@ -160,7 +201,7 @@ def create_decision(dept, strategy_id):
         "market": "futures",
         "position_side": "long",
         "side": "buy",
-        "qty": round(random.uniform(0.05, 0.2), 2),
+        "qty": round(rng.uniform(0.05, 0.2), 2),
         "price": 60500.0,
         "leverage": 3,
         "order_type": "limit",
@@ -203,7 +244,7 @@ def create_trade_memory(period):
         "keywords": []
     }
 
-def create_episode_trades_data():
+def create_episode_trades_data(loop=LOOP, episode=EPISODE):
     """에피소드 거래 데이터를 JSON(딕셔너리 리스트) 형식으로 생성합니다."""
     df = pd.DataFrame(
         {
@@ -221,30 +262,30 @@ def create_episode_trades_data():
             'slippage_pct': [0.0],
             'strategy_case_id': ['test_case'],
             'decision_ts': [pd.Timestamp.now()],
-            'loop': LOOP,
-            'episode': EPISODE
+            'loop': loop,
+            'episode': episode
         }
     )
     return df.to_dict(orient='records')
 
-def create_metrics():
+def create_metrics(loop=LOOP, episode=EPISODE, rng=random):
     """성과 지표 데이터를 생성합니다."""
     return {
-        "episode_id": f"{LOOP}_{EPISODE}",
+        "episode_id": f"{loop}_{episode}",
         "start_ts": "2025-06-28T23:00:00Z",
         "end_ts": "2025-06-30T23:59:59Z",
-        "total_realized_pnl": round(random.uniform(-50, 200), 2),
-        "win_rate": round(random.uniform(0.4, 0.7), 2),
-        "sharpe_ratio": round(random.uniform(0.5, 2.0), 2)
+        "total_realized_pnl": round(rng.uniform(-50, 200), 2),
+        "win_rate": round(rng.uniform(0.4, 0.7), 2),
+        "sharpe_ratio": round(rng.uniform(0.5, 2.0), 2)
     }
 
-def create_feedback():
+def create_feedback(loop=LOOP, episode=EPISODE, rng=random):
     """피드백 데이터를 생성합니다."""
     return {
-        "episode_id": f"{LOOP}_{EPISODE}",
+        "episode_id": f"{loop}_{episode}",
         "generated_at": get_utc_timestamp(),
         "summary": {
-            "overall_grade": random.choice(["A", "B+", "B-", "C"]),
+            "overall_grade": rng.choice(["A", "B+", "B-", "C"]),
             "key_stat": "PnL +102.5, Sharpe 1.43"
         },
         "problem_recognition": [],
@@ -252,10 +293,10 @@ def create_feedback():
         "recommendations": {}
     }
 
-def create_strategy_update_agent_config():
+def create_strategy_update_agent_config(date_str=TODAY_STR):
     """전략 업데이트 에이전트의 설정 데이터를 생성합니다. (strategy_cases_checklist 스키마와 동일)"""
     return {
-        "version": f"{TODAY_STR}_strategy_update_agent_1",
+        "version": f"{date_str}_strategy_update_agent_1",
         "updated_at": get_utc_timestamp(),
         "cases": [
             {
@@ -288,10 +329,10 @@ def create_strategy_update_agent_config():
         ]
     }
 
-def create_memory_guideline_update_agent_config():
+def create_memory_guideline_update_agent_config(date_str=TODAY_STR):
     """기억 지침 업데이트 에이전트의 설정 데이터를 생성합니다. (memory_guideline 스키마와 동일)"""
     return {
-        "version": f"{TODAY_STR}_memory_guideline_update_agent_1",
+        "version": f"{date_str}_memory_guideline_update_agent_1",
         "updated_at": get_utc_timestamp(),
         "short_memory_rule": "최근 7일간의 피드백 분석 결과를 바탕으로 단기 기억 지침을 조정한다.",
         "mid_memory_rule": "지난 30일간의 에피소드 요약에서 반복되는 문제점을 식별하여 중기 기억 지침을 개선한다.",
@@ -337,10 +378,11 @@ def insert_daily_snapshots(db, dept, snapshot_meta, data_docs):
         )
     # print(f"   - Upserted daily_snapshots for '{dept}' on {snapshot_meta['date']}.")
 
-def insert_executions_into_snapshots(db, snapshot_meta, executions_list):
+def insert_executions_into_snapshots(db, snapshot_meta, executions_list, columnar=COLUMNAR_TRADE_LOGS):
     """
     [Collection: snapshots]
     체결 로그 데이터를 기존 'snapshots' 컬렉션 내에 'executions' 타입의 문서로 저장합니다.
+    columnar가 True이면 필드별 배열로 인코딩해 저장합니다. (columnar_codec.trade_log_frame으로 읽기)
     """
     collection = db['snapshots']
     # 'snapshots' 컬렉션에 새로운 타입의 문서로 체결 내역을 추가
@@ -354,7 +396,7 @@ def insert_executions_into_snapshots(db, snapshot_meta, executions_list):
             'loop': snapshot_meta['loop'],
             'episode': snapshot_meta['episode'],
             'type': 'executions', # 문서 타입 지정
-            'executions_data': executions_list, # 체결 내역 리스트
+            'executions_data': encode_columnar(executions_list) if columnar else executions_list, # 체결 내역
             'updated_at': get_utc_timestamp()
         }},
         upsert=True
@@ -376,10 +418,11 @@ def insert_episode_summary(db, dept, episode_meta, data_docs):
         )
     # print(f"   - Upserted episode_summary for '{dept}'.")
 
-def insert_episode_trades_into_episodes(db, episode_meta, episode_trades_list):
+def insert_episode_trades_into_episodes(db, episode_meta, episode_trades_list, columnar=COLUMNAR_TRADE_LOGS):
     """
     [Collection: episodes]
     에피소드 전체의 거래 데이터를 기존 'episodes' 컬렉션 내에 'trades_data' 타입의 문서로 저장합니다.
+    columnar가 True이면 필드별 배열로 인코딩해 저장합니다. (columnar_codec.trade_log_frame으로 읽기)
     """
     collection = db['episodes']
     # 'episodes' 컬렉션에 새로운 타입의 문서로 거래 내역을 추가
@@ -391,7 +434,7 @@ def insert_episode_trades_into_episodes(db, episode_meta, episode_trades_list):
             'loop': episode_meta['loop'],
             'episode': episode_meta['episode'],
             'type': 'trades_data', # 문서 타입 지정
-            'trades_data': episode_trades_list, # 거래 내역 리스트
+            'trades_data': encode_columnar(episode_trades_list) if columnar else episode_trades_list, # 거래 내역
             'updated_at': get_utc_timestamp()
         }},
         upsert=True
@@ -401,11 +444,17 @@ def insert_episode_trades_into_episodes(db, episode_meta, episode_trades_list):
 
 # --- 4. 메인 실행 함수 ---
 
-def seed_database_for_presentation():
+def seed_database_for_presentation(clear=True):
     """
     모든 부서에 대한 더미 데이터를 생성하고, 구조화된 삽입 함수를 호출하여
     데이터베이스의 전체 뼈대를 구축합니다.
+    clear가 True이면 이전 실행 데이터를 초기화하여 항상 새로운 상태에서 시작합니다.
     """
+    from db_indexes import ensure_agent_indexes
+    db = get_db()
+    if clear:
+        clear_database(db)
+    ensure_agent_indexes(db)
     print("="*50)
     print("Starting database seeding for all 5 departments...")
     print("="*50)
@@ -467,7 +516,7 @@ def seed_database_for_presentation():
     print("\n" + "="*50)
     print("Database seeding completed successfully for all departments.")
     print("="*50)
-    client.close()
+    close_client()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,156 @@
+import argparse
+from datetime import datetime, timedelta
+from pymongo import ASCENDING
+import common
+import market_series
+from market_series import MARKET_SERIES_INDEXES
+
+# ---- 인덱스 선언: 컬렉션마다 (인덱스 키, 옵션) 목록 ----
+
+# 날짜별 통합 문서는 date마다 하나 (upsert_daily_market_document, bulk_upsert_daily_market_documents 조회 조건)
+# 이름을 지정하지 않아 기존에 수동으로 만든 date_1 인덱스와 같은 인덱스로 인식됨
+DAILY_MARKET_INDEXES = [
+    ([("date", ASCENDING)], {"unique": True}),
+]
+
+# 에이전트 DB(db_dummy 스키마) 컬렉션. 키 순서는 insert_* 함수의 upsert 조건 순서와 같음
+AGENT_COLLECTION_INDEXES = {
+    # insert_central_memory는 (dept, type)마다 현재 문서 하나를 upsert로 덮어씀
+    "central_memory": [
+        ([("dept", ASCENDING), ("type", ASCENDING)], {"unique": True, "name": "dept_type"}),
+    ],
+    # insert_daily_snapshots, insert_executions_into_snapshots
+    "snapshots": [
+        ([("dept", ASCENDING), ("date", ASCENDING), ("loop", ASCENDING), ("episode", ASCENDING), ("type", ASCENDING)],
+         {"unique": True, "name": "dept_date_loop_episode_type"}),
+    ],
+    # insert_episode_summary, insert_episode_trades_into_episodes
+    "episodes": [
+        ([("dept", ASCENDING), ("loop", ASCENDING), ("episode", ASCENDING), ("type", ASCENDING)],
+         {"unique": True, "name": "dept_loop_episode_type"}),
+    ],
+}
+
+def _agent_db(db):
+    if db is not None:
+        return db
+    import db_dummy
+    return db_dummy.get_db()
+
+def market_index_declarations():
+    return [
+        (common.daily_market_collection, DAILY_MARKET_INDEXES),
+        (market_series.market_series_collection, MARKET_SERIES_INDEXES),
+    ]
+
+def agent_index_declarations(db=None):
+    db = _agent_db(db)
+    return [(db[name], indexes) for name, indexes in AGENT_COLLECTION_INDEXES.items()]
+
+# 선언된 인덱스를 생성 (이미 있으면 그대로). 기존 데이터가 unique 조건을 어기면 예외가 그대로 발생
+def ensure_indexes(declarations):
+    for collection, indexes in declarations:
+        for keys, options in indexes:
+            collection.create_index(keys, **options)
+        print(f"{collection.name} 인덱스 확인 완료 ({len(indexes)}개)")
+
+def ensure_market_indexes():
+    ensure_indexes(market_index_declarations())
+    market_series._indexes_ready = True
+
+def ensure_agent_indexes(db=None):
+    ensure_indexes(agent_index_declarations(db))
+
+# 파이프라인/에이전트 시작 시 호출
+def ensure_all_indexes(agent_db=None):
+    ensure_market_indexes()
+    ensure_agent_indexes(agent_db)
+
+# ---- 쿼리 계획 확인: 자주 쓰는 upsert/조회 조건이 인덱스를 타는지 explain으로 확인 ----
+
+def _market_query_plan_checks():
+    day = datetime(2025, 6, 30)
+    date_str = day.strftime('%Y-%m-%d')
+    week_ago = (day - timedelta(days=7)).strftime('%Y-%m-%d')
+    date_range = {"$gte": week_ago, "$lte": date_str}
+    # (이름, 컬렉션, 조건, 정렬, upsert 여부)
+    return [
+        ("daily_market upsert", common.daily_market_collection, {"date": date_str}, None, True),
+        ("daily_market 날짜 구간", common.daily_market_collection, {"date": date_range}, [("date", ASCENDING)], False),
+        ("daily_market 이어서 실행", common.daily_market_collection, {"date": {"$in": [week_ago, date_str]}}, None, False),
+        ("market_series upsert", market_series.market_series_collection,
+         {"symbol": "BTCUSDT", "interval": "1d", "open_time": day}, None, True),
+        ("market_series 심볼 구간", market_series.market_series_collection,
+         {"symbol": "BTCUSDT", "interval": "1d", "open_time": {"$gte": day - timedelta(days=7), "$lt": day}},
+         [("open_time", ASCENDING)], False),
+        ("market_series 날짜 구간", market_series.market_series_collection,
+         {"interval": "1d", "date": date_range, "symbol": {"$in": ["BTCUSDT", "ETHUSDT"]}},
+         [("date", ASCENDING), ("symbol", ASCENDING)], False),
+    ]
+
+def _agent_query_plan_checks(db):
+    meta = {"dept": "Trend_Analyst", "date": "2025-06-30", "loop": 12, "episode": 5}
+    return [
+        ("central_memory upsert", db["central_memory"], {"dept": meta["dept"], "type": "memory_guideline"}, None, True),
+        ("central_memory 부서 조회", db["central_memory"], {"dept": meta["dept"]}, None, False),
+        ("snapshots upsert", db["snapshots"], {**meta, "type": "market"}, None, True),
+        ("snapshots 날짜 조회", db["snapshots"], {"dept": meta["dept"], "date": meta["date"]}, None, False),
+        ("episodes upsert", db["episodes"], {"dept": meta["dept"], "loop": meta["loop"], "episode": meta["episode"], "type": "metrics"}, None, True),
+        ("episodes loop 조회", db["episodes"], {"dept": meta["dept"], "loop": meta["loop"]}, None, False),
+    ]
+
+# explain 결과의 실행 계획 트리에서 stage 이름을 모두 모음
+# (classic 엔진의 inputStage/inputStages, slot 엔진의 queryPlan 모두 dict/list를 따라가며 찾음)
+def plan_stages(plan):
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            if isinstance(value, (dict, list)):
+                stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(plan_stages(item))
+    return stages
+
+def explain_winning_plan(collection, query, sort=None, upsert=False):
+    if upsert:
+        # update_one(query, ..., upsert=True)와 같은 조건의 계획 (explain은 쓰기를 실행하지 않음)
+        result = collection.database.command(
+            "explain",
+            {"update": collection.name, "updates": [{"q": query, "u": {"$set": query}, "upsert": True}]},
+            verbosity="queryPlanner"
+        )
+    else:
+        cursor = collection.find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        result = cursor.explain()
+    return result["queryPlanner"]["winningPlan"]
+
+# 모든 확인 조건을 explain하고 COLLSCAN이 하나라도 있으면 RuntimeError
+# 반환값: {이름: [stage]}
+def check_query_plans(checks=None, agent_db=None):
+    if checks is None:
+        checks = _market_query_plan_checks() + _agent_query_plan_checks(_agent_db(agent_db))
+    results = {}
+    failures = []
+    for name, collection, query, sort, upsert in checks:
+        stages = plan_stages(explain_winning_plan(collection, query, sort, upsert))
+        results[name] = stages
+        if "COLLSCAN" in stages:
+            failures.append(f"{name} ({collection.name}: {query}) → {' > '.join(stages)}")
+        print(f"{name}: {' > '.join(stages)}")
+    if failures:
+        raise RuntimeError("인덱스를 사용하지 않는 쿼리가 있습니다 (COLLSCAN):\n" + "\n".join(failures))
+    print(f"쿼리 계획 확인 완료: {len(results)}개 모두 인덱스 사용")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="시장/에이전트 컬렉션 인덱스 생성 및 쿼리 계획(COLLSCAN) 확인")
+    parser.add_argument('--check-only', action='store_true', help="인덱스를 만들지 않고 쿼리 계획만 확인")
+    args = parser.parse_args()
+    if not args.check_only:
+        ensure_all_indexes()
+    check_query_plans()
@@ -0,0 +1,433 @@
+import math
+import sys
+from collections import deque
+import pandas as pd
+from common import (
+    MA_LENGTHS, MACD_PARAMS, RSI_LENGTHS, STOCH_PARAMS, STOCH_SMOOTH_K, BBANDS_LENGTHS, BBANDS_STD,
+    ATR_LENGTHS, OBV_SMA_LENGTHS, ICHIMOKU_TENKAN, ICHIMOKU_KIJUN, ICHIMOKU_SENKOU,
+    SUPERTREND_LENGTHS, SUPERTREND_MULTIPLIER, FIB_WINDOW, FIB_RATIOS, MIN_INDICATOR_CANDLES
+)
+from indicator_registry import INDICATOR_GROUPS, select_indicator_specs
+
+# 캔들 하나씩 갱신하는 증분 기술 지표 엔진
+# calculate_all_indicators(indicator_registry, pandas_ta와 같은 계산)와 같은 컬럼 이름/계산 방식을 따르며, 상태는 JSON으로 저장할 수 있는 dict
+# (EMA/RMA 초기값처럼 시작 구간에 따라 달라지는 값은 허용 오차 안에서 일치)
+
+NAN = float('nan')
+EPSILON = sys.float_info.epsilon # pandas_ta non_zero_range와 같은 값
+RECOMPUTE_EVERY = 1024 # 누적 합의 부동소수점 오차를 주기적으로 윈도우에서 다시 계산
+
+def _is_nan(x):
+    return x != x
+
+def _non_zero(x):
+    return x if x != 0 else EPSILON
+
+def _div(a, b):
+    # pandas 나눗셈과 같이 0으로 나누면 NaN/inf
+    if b == 0:
+        return NAN if a == 0 or _is_nan(a) else math.copysign(math.inf, a)
+    return a / b
+
+class _Node:
+    """상태를 가진 지표 구성 요소. deque 필드는 list로 저장/복원합니다."""
+
+    def state(self):
+        return {key: (list(value) if isinstance(value, deque) else value) for key, value in vars(self).items()}
+
+    def load(self, state):
+        for key, value in state.items():
+            current = getattr(self, key)
+            if isinstance(current, deque):
+                setattr(self, key, deque((list(item) if isinstance(item, (list, tuple)) else item for item in value), maxlen=current.maxlen))
+            else:
+                setattr(self, key, value)
+
+class Sma(_Node):
+    """단순 이동 평균 (rolling mean). 앞쪽 NaN 입력은 건너뜁니다."""
+
+    def __init__(self, length):
+        self.length = length
+        self.window = deque()
+        self.total = 0.0
+        self.count = 0
+
+    def update(self, x):
+        if _is_nan(x):
+            return NAN
+        self.window.append(x)
+        self.total += x
+        if len(self.window) > self.length:
+            self.total -= self.window.popleft()
+        self.count += 1
+        if self.count % RECOMPUTE_EVERY == 0:
+            self.total = math.fsum(self.window)
+        return self.total / self.length if len(self.window) == self.length else NAN
+
+class Ema(_Node):
+    """
+    SMA로 시작하는 지수 이동 평균.
+    wilder=False: alpha = 2/(length+1) (pandas_ta ema), wilder=True: alpha = 1/length (pandas_ta rma)
+    """
+
+    def __init__(self, length, wilder=False):
+        self.length = length
+        self.alpha = 1.0 / length if wilder else 2.0 / (length + 1)
+        self.count = 0
+        self.seed_total = 0.0
+        self.value = NAN
+
+    def update(self, x):
+        if _is_nan(x):
+            return NAN
+        self.count += 1
+        if self.count < self.length:
+            self.seed_total += x
+            return NAN
+        if self.count == self.length:
+            self.value = (self.seed_total + x) / self.length
+        else:
+            self.value = self.alpha * x + (1 - self.alpha) * self.value
+        return self.value
+
+class RollingExtreme(_Node):
+    """단조 deque로 구하는 rolling 최댓값/최솟값 (캔들당 평균 O(1))."""
+
+    def __init__(self, length, is_max, min_periods=None):
+        self.length = length
+        self.is_max = is_max
+        self.min_periods = length if min_periods is None else min_periods
+        self.index = -1
+        self.candidates = deque() # [index, value]
+
+    def update(self, x):
+        self.index += 1
+        if self.is_max:
+            while self.candidates and self.candidates[-1][1] <= x:
+                self.candidates.pop()
+        else:
+            while self.candidates and self.candidates[-1][1] >= x:
+                self.candidates.pop()
+        self.candidates.append([self.index, x])
+        while self.candidates[0][0] <= self.index - self.length:
+            self.candidates.popleft()
+        if min(self.index + 1, self.length) < self.min_periods:
+            return NAN
+        return self.candidates[0][1]
+
+class RollingStd(_Node):
+    """모표준편차(ddof=0) rolling 값. 슬라이딩 Welford 방식으로 평균과 제곱합을 갱신합니다."""
+
+    def __init__(self, length):
+        self.length = length
+        self.window = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.count = 0
+
+    def update(self, x):
+        if _is_nan(x):
+            return NAN
+        self.count += 1
+        if len(self.window) < self.length:
+            self.window.append(x)
+            delta = x - self.mean
+            self.mean += delta / len(self.window)
+            self.m2 += delta * (x - self.mean)
+        else:
+            old = self.window.popleft()
+            self.window.append(x)
+            new_mean = self.mean + (x - old) / self.length
+            self.m2 += (x - old) * (x - new_mean + old - self.mean)
+            self.mean = new_mean
+        if self.count % RECOMPUTE_EVERY == 0:
+            self.mean = math.fsum(self.window) / len(self.window)
+            self.m2 = math.fsum((value - self.mean) ** 2 for value in self.window)
+        if len(self.window) < self.length:
+            return NAN
+        return math.sqrt(max(self.m2, 0.0) / self.length)
+
+class Delay(_Node):
+    """length 캔들 전의 값 (pandas shift(length))."""
+
+    def __init__(self, length):
+        self.values = deque(maxlen=length + 1)
+
+    def update(self, x):
+        self.values.append(x)
+        return self.values[0] if len(self.values) == self.values.maxlen else NAN
+
+class Supertrend(_Node):
+    """pandas_ta supertrend의 방향/밴드 갱신 루프를 캔들 하나씩 진행합니다."""
+
+    def __init__(self, multiplier):
+        self.multiplier = multiplier
+        self.count = 0
+        self.direction = 1.0
+        self.upper = NAN
+        self.lower = NAN
+
+    def update(self, close, hl2, atr):
+        upper = hl2 + self.multiplier * atr
+        lower = hl2 - self.multiplier * atr
+        self.count += 1
+        if self.count == 1:
+            self.upper, self.lower = upper, lower
+            return 0.0, 1.0, NAN, NAN
+        if close > self.upper:
+            self.direction = 1.0
+        elif close < self.lower:
+            self.direction = -1.0
+        else:
+            if self.direction > 0 and lower < self.lower:
+                lower = self.lower
+            if self.direction < 0 and upper > self.upper:
+                upper = self.upper
+        self.upper, self.lower = upper, lower
+        if self.direction > 0:
+            return lower, self.direction, lower, NAN
+        return upper, self.direction, NAN, upper
+
+class IncrementalIndicatorEngine:
+    """
+    심볼 하나의 기술 지표를 캔들 단위로 갱신하는 엔진.
+    seed(df)로 과거 캔들을 한 번 흘려 넣은 뒤 update(candle)로 새 캔들마다 지표를 구합니다.
+    to_state()/from_state()로 상태를 저장하고 복원할 수 있습니다.
+    groups는 select_indicator_specs와 같이 고르며(None이면 INDICATOR_GROUPS 환경 변수), 고른 그룹의 지표만 계산합니다.
+    """
+
+    def __init__(self, groups=None):
+        selected = {spec.group for spec in select_indicator_specs(groups)}
+        self.groups = [g for g in INDICATOR_GROUPS if g in selected]
+        self.count = 0
+        self.prev_close = NAN
+        self.obv = 0.0
+        self.last_candle = None
+        self.nodes = {}
+        self.last_values = {}
+        node = self._node
+        enabled = self.enabled
+        for L in MA_LENGTHS:
+            if enabled('MA'):
+                node(f"sma_{L}", Sma, L)
+            if enabled('EMA'):
+                node(f"ema_{L}", Ema, L)
+        if enabled('MACD'):
+            for fast, slow, sig in MACD_PARAMS:
+                node(f"macd_fast_{fast}_{slow}_{sig}", Ema, fast)
+                node(f"macd_slow_{fast}_{slow}_{sig}", Ema, slow)
+                node(f"macd_signal_{fast}_{slow}_{sig}", Ema, sig)
+        if enabled('RSI'):
+            for L in RSI_LENGTHS:
+                node(f"rsi_pos_{L}", Ema, L, wilder=True)
+                node(f"rsi_neg_{L}", Ema, L, wilder=True)
+        if enabled('STOCH'):
+            for k, d in STOCH_PARAMS:
+                node(f"stoch_hh_{k}", RollingExtreme, k, True)
+                node(f"stoch_ll_{k}", RollingExtreme, k, False)
+                node(f"stoch_k_{k}_{d}", Sma, STOCH_SMOOTH_K)
+                node(f"stoch_d_{k}_{d}", Sma, d)
+        if enabled('BBANDS'):
+            for L in BBANDS_LENGTHS:
+                node(f"bb_mid_{L}", Sma, L)
+                node(f"bb_std_{L}", RollingStd, L)
+        if enabled('ATR'):
+            for L in ATR_LENGTHS:
+                node(f"atr_{L}", Ema, L, wilder=True)
+        if enabled('OBV'):
+            for L in OBV_SMA_LENGTHS:
+                node(f"obv_sma_{L}", Sma, L)
+        if enabled('ICHIMOKU'):
+            for L in sorted({ICHIMOKU_TENKAN, ICHIMOKU_KIJUN, ICHIMOKU_SENKOU}):
+                node(f"ichimoku_hh_{L}", RollingExtreme, L, True)
+                node(f"ichimoku_ll_{L}", RollingExtreme, L, False)
+            node("ichimoku_span_a", Delay, ICHIMOKU_KIJUN)
+            node("ichimoku_span_b", Delay, ICHIMOKU_KIJUN)
+        if enabled('SUPERTREND'):
+            for L in SUPERTREND_LENGTHS:
+                node(f"supertrend_atr_{L}", Ema, L, wilder=True)
+                node(f"supertrend_{L}", Supertrend, SUPERTREND_MULTIPLIER)
+        if enabled('FIB'):
+            node("fib_high", RollingExtreme, FIB_WINDOW, True, min_periods=1)
+            node("fib_low", RollingExtreme, FIB_WINDOW, False, min_periods=1)
+            node("fib_close", Delay, FIB_WINDOW - 1)
+
+    def enabled(self, group):
+        return group in self.groups
+
+    def _node(self, name, cls, *args, **kwargs):
+        self.nodes[name] = cls(*args, **kwargs)
+
+    @property
+    def ready(self):
+        """calculate_all_indicators가 지표를 채우는 최소 캔들 수를 넘었는지 여부"""
+        return self.count >= MIN_INDICATOR_CANDLES
+
+    def seed(self, df):
+        """과거 캔들 DataFrame(open/high/low/close/volume, open_time 인덱스)으로 상태를 채웁니다."""
+        for open_time, o, h, l, c, v, close_time in zip(df.index, df['open'], df['high'], df['low'], df['close'], df['volume'], df['close_time']):
+            self.update({'open_time': open_time, 'close_time': close_time, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v})
+        return self
+
+    def update(self, candle):
+        """
+        마감된 캔들 하나(dict: open/high/low/close/volume, 선택적으로 open_time/close_time)를 반영하고
+        pandas_ta 컬럼 이름을 키로 하는 지표 값 dict를 반환합니다. 아직 계산되지 않은 값은 NaN.
+        """
+        o, h, l, c, v = (float(candle[key]) for key in ('open', 'high', 'low', 'close', 'volume'))
+        n = self.nodes
+        enabled = self.enabled
+        out = {}
+        prev_close = self.prev_close
+
+        # 이동 평균 (MA, EMA) - 종가 기준
+        for L in MA_LENGTHS:
+            if enabled('MA'):
+                out[f"SMA_{L}"] = n[f"sma_{L}"].update(c)
+            if enabled('EMA'):
+                out[f"EMA_{L}"] = n[f"ema_{L}"].update(c)
+
+        # MACD - 종가 기준
+        for fast, slow, sig in (MACD_PARAMS if enabled('MACD') else []):
+            key = f"{fast}_{slow}_{sig}"
+            macd = n[f"macd_fast_{key}"].update(c) - n[f"macd_slow_{key}"].update(c)
+            signal = n[f"macd_signal_{key}"].update(macd)
+            out[f"MACD_{key}"] = macd
+            out[f"MACDh_{key}"] = macd - signal
+            out[f"MACDs_{key}"] = signal
+
+        # RSI - 종가 기준 (Wilder 평균)
+        diff = c - prev_close
+        for L in (RSI_LENGTHS if enabled('RSI') else []):
+            positive_avg = n[f"rsi_pos_{L}"].update(max(diff, 0.0) if not _is_nan(diff) else NAN)
+            negative_avg = n[f"rsi_neg_{L}"].update(min(diff, 0.0) if not _is_nan(diff) else NAN)
+            out[f"RSI_{L}"] = _div(100 * positive_avg, positive_avg + abs(negative_avg))
+
+        # 스토캐스틱 오실레이터
+        for k, d in (STOCH_PARAMS if enabled('STOCH') else []):
+            highest_high = n[f"stoch_hh_{k}"].update(h)
+            lowest_low = n[f"stoch_ll_{k}"].update(l)
+            stoch = 100 * (c - lowest_low) / _non_zero(highest_high - lowest_low)
+            stoch_k = n[f"stoch_k_{k}_{d}"].update(stoch)
+            out[f"STOCHk_{k}_{d}_{STOCH_SMOOTH_K}"] = stoch_k
+            out[f"STOCHd_{k}_{d}_{STOCH_SMOOTH_K}"] = n[f"stoch_d_{k}_{d}"].update(stoch_k)
+
+        # 볼린저 밴드
+        std_label = float(BBANDS_STD)
+        for L in (BBANDS_LENGTHS if enabled('BBANDS') else []):
+            mid = n[f"bb_mid_{L}"].update(c)
+            deviations = BBANDS_STD * n[f"bb_std_{L}"].update(c)
+            lower, upper = mid - deviations, mid + deviations
+            band_range = _non_zero(upper - lower)
+            out[f"BBL_{L}_{std_label}"] = lower
+            out[f"BBM_{L}_{std_label}"] = mid
+            out[f"BBU_{L}_{std_label}"] = upper
+            out[f"BBB_{L}_{std_label}"] = _div(100 * band_range, mid)
+            out[f"BBP_{L}_{std_label}"] = _non_zero(c - lower) / band_range
+
+        # ATR (True Range의 Wilder 평균)
+        true_range = max(_non_zero(h - l), abs(h - prev_close), abs(prev_close - l)) if not _is_nan(prev_close) else NAN
+        for L in (ATR_LENGTHS if enabled('ATR') else []):
+            out[f"ATRr_{L}"] = n[f"atr_{L}"].update(true_range)
+
+        # OBV 및 OBV SMA (첫 캔들은 +거래량으로 시작)
+        if _is_nan(prev_close) or c > prev_close:
+            self.obv += v
+        elif c < prev_close:
+            self.obv -= v
+        if enabled('OBV'):
+            out["OBV"] = self.obv
+            for L in OBV_SMA_LENGTHS:
+                out[f"OBV__SMA_{L}"] = n[f"obv_sma_{L}"].update(self.obv)
+
+        # Ichimoku Cloud (선행스팬은 kijun만큼 밀려 있고, 후행스팬은 미래 종가라 실시간에는 없음)
+        if enabled('ICHIMOKU'):
+            midprices = {}
+            for L in sorted({ICHIMOKU_TENKAN, ICHIMOKU_KIJUN, ICHIMOKU_SENKOU}):
+                midprices[L] = 0.5 * (n[f"ichimoku_ll_{L}"].update(l) + n[f"ichimoku_hh_{L}"].update(h))
+            tenkan_sen, kijun_sen = midprices[ICHIMOKU_TENKAN], midprices[ICHIMOKU_KIJUN]
+            out[f"ISA_{ICHIMOKU_TENKAN}"] = n["ichimoku_span_a"].update(0.5 * (tenkan_sen + kijun_sen))
+            out[f"ISB_{ICHIMOKU_KIJUN}"] = n["ichimoku_span_b"].update(midprices[ICHIMOKU_SENKOU])
+            out[f"ITS_{ICHIMOKU_TENKAN}"] = tenkan_sen
+            out[f"IKS_{ICHIMOKU_KIJUN}"] = kijun_sen
+            out[f"ICS_{ICHIMOKU_KIJUN}"] = NAN
+
+        # Supertrend
+        hl2 = 0.5 * (h + l)
+        multiplier_label = float(SUPERTREND_MULTIPLIER)
+        for L in (SUPERTREND_LENGTHS if enabled('SUPERTREND') else []):
+            atr = n[f"supertrend_atr_{L}"].update(true_range)
+            trend, direction, long, short = n[f"supertrend_{L}"].update(c, hl2, atr)
+            out[f"SUPERT_{L}_{multiplier_label}"] = trend
+            out[f"SUPERTd_{L}_{multiplier_label}"] = direction
+            out[f"SUPERTl_{L}_{multiplier_label}"] = long
+            out[f"SUPERTs_{L}_{multiplier_label}"] = short
+
+        # 피보나치 되돌림 (이 캔들까지의 최근 30개 캔들 기준)
+        if enabled('FIB'):
+            recent_high = n["fib_high"].update(h)
+            recent_low = n["fib_low"].update(l)
+            n["fib_close"].update(c)
+            first_close = n["fib_close"].values[0]
+            if self.count >= 1:
+                price_range = recent_high - recent_low
+                rising = c > first_close
+                for ratio in FIB_RATIOS:
+                    out[f"FIB_{ratio}"] = recent_high - price_range * ratio if rising else recent_low + price_range * ratio
+            else:
+                for ratio in FIB_RATIOS:
+                    out[f"FIB_{ratio}"] = NAN
+
+        self.count += 1
+        self.prev_close = c
+        self.last_candle = {key: candle.get(key) for key in ('open_time', 'close_time')}
+        self.last_candle.update({'open': o, 'high': h, 'low': l, 'close': c, 'volume': v})
+        self.last_values = out
+        return out
+
+    def latest_frame(self):
+        """
+        마지막 캔들과 지표를 prepare_market_data_documents_for_mongo에 넘길 수 있는 1행 DataFrame으로 반환합니다.
+        최소 캔들 수에 못 미치면 calculate_all_indicators처럼 지표 없이 캔들 데이터만 담습니다.
+        """
+        candle = self.last_candle
+        row = {'close_time': candle.get('close_time'), 'open': candle['open'], 'high': candle['high'],
+               'low': candle['low'], 'close': candle['close'], 'volume': candle['volume']}
+        if self.ready:
+            row.update(self.last_values)
+        return pd.DataFrame([row], index=pd.Index([candle.get('open_time')], name='open_time'))
+
+    def to_state(self):
+        """JSON으로 저장할 수 있는 엔진 상태"""
+        last_candle = None
+        if self.last_candle is not None:
+            last_candle = {key: (str(value) if key in ('open_time', 'close_time') and value is not None else value)
+                           for key, value in self.last_candle.items()}
+        return {
+            'groups': self.groups,
+            'count': self.count,
+            'prev_close': self.prev_close,
+            'obv': self.obv,
+            'last_candle': last_candle,
+            'last_values': self.last_values,
+            'nodes': {name: node.state() for name, node in self.nodes.items()}
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        # groups가 없는 이전 상태는 모든 그룹의 노드를 담고 있음
+        engine = cls(groups=state.get('groups', INDICATOR_GROUPS))
+        engine.count = state['count']
+        engine.prev_close = state['prev_close']
+        engine.obv = state['obv']
+        engine.last_values = dict(state.get('last_values') or {})
+        last_candle = state.get('last_candle')
+        if last_candle is not None:
+            last_candle = dict(last_candle)
+            for key in ('open_time', 'close_time'):
+                if last_candle.get(key) is not None:
+                    last_candle[key] = pd.Timestamp(last_candle[key])
+        engine.last_candle = last_candle
+        for name, node_state in state['nodes'].items():
+            engine.nodes[name].load(node_state)
+        return engine
@@ -0,0 +1,69 @@
+import os
+import numpy as np
+import pandas as pd
+from indicator_registry import MIN_INDICATOR_CANDLES, compute_indicator_columns
+from common import calculate_all_indicators, CHART_DATA_COLUMNS
+from instrumentation import metrics
+
+# 패널 하나의 최대 (시간 × 심볼) 칸 수. 지표/중간값 배열이 모두 이 크기라 넘으면 심볼을 나눠 계산
+PANEL_MAX_CELLS = int(os.getenv('PANEL_MAX_CELLS', 200_000))
+
+# 심볼별 캔들 DataFrame들을 open_time 합집합 기준 (시간 × 심볼) 배열로 쌓음
+# 반환값: (open_time 인덱스, 패널 심볼 목록, {컬럼: 2-D 배열}, {심볼: (시작 행, 끝 행)})
+# 상장 전/상장 폐지 후 구간은 NaN. 캔들이 부족하거나 중간에 빠진 캔들이 있는 심볼은 패널에서 제외
+def stack_ohlcv_panel(frames):
+    eligible = {symbol: df for symbol, df in frames.items()
+                if len(df) >= MIN_INDICATOR_CANDLES and df.index.is_monotonic_increasing and df.index.is_unique}
+    if not eligible:
+        return pd.DatetimeIndex([]), [], {}, {}
+    index = pd.DatetimeIndex(np.unique(np.concatenate([df.index.values for df in eligible.values()])))
+    symbols = []
+    row_ranges = {}
+    for symbol, df in eligible.items():
+        lo = index.get_loc(df.index[0])
+        hi = lo + len(df)
+        # 다른 심볼에만 있는 시각이 사이에 끼면 심볼 단독 계산과 결과가 달라지므로 제외
+        if index[hi - 1] != df.index[-1]:
+            continue
+        symbols.append(symbol)
+        row_ranges[symbol] = (lo, hi)
+    columns = {name: np.full((len(index), len(symbols)), np.nan) for name in CHART_DATA_COLUMNS}
+    for col, symbol in enumerate(symbols):
+        lo, hi = row_ranges[symbol]
+        for name in CHART_DATA_COLUMNS:
+            columns[name][lo:hi, col] = eligible[symbol][name].to_numpy(dtype=np.float64)
+    return index, symbols, columns, row_ranges
+
+def _panel_chunks(frames):
+    # 심볼 수 × 전체 기간 행 수가 PANEL_MAX_CELLS 이하가 되도록 심볼을 나눔
+    rows = len(pd.DatetimeIndex(np.unique(np.concatenate([df.index.values for df in frames.values()])))) if frames else 0
+    chunk_size = max(1, PANEL_MAX_CELLS // max(rows, 1))
+    symbols = list(frames)
+    return [{symbol: frames[symbol] for symbol in symbols[i:i + chunk_size]} for i in range(0, len(symbols), chunk_size)]
+
+# 여러 심볼의 지표를 (시간 × 심볼) 패널에서 한 번에 계산해 심볼별 DataFrame으로 나눠 반환
+# 결과는 심볼마다 calculate_all_indicators를 호출한 것과 같음 (패널에서 제외된 심볼은 그 함수로 계산)
+def calculate_indicators_panel(frames, specs=None):
+    results = {}
+    for chunk in _panel_chunks({symbol: df for symbol, df in frames.items() if not df.empty}):
+        index, symbols, columns, row_ranges = stack_ohlcv_panel(chunk)
+        if symbols:
+            print(f"{len(symbols)}개 심볼 패널 기술 지표 계산 시작 ({len(index)}행)...")
+            with metrics.span("indicators_panel"):
+                indicators = compute_indicator_columns(columns, specs)[0]
+            names = list(indicators)
+            # (지표, 심볼, 시간) 순서로 옮겨 두면 심볼별 지표 열이 각각 연속된 메모리 조각이 됨
+            stacked = np.empty((len(names), len(symbols), len(index)))
+            for k, name in enumerate(names):
+                stacked[k] = indicators.pop(name).T
+            for col, symbol in enumerate(symbols):
+                lo, hi = row_ranges[symbol]
+                df = chunk[symbol]
+                block = stacked[:, col, lo:hi].T
+                results[symbol] = pd.concat([df.drop(columns=[c for c in names if c in df.columns]),
+                                             pd.DataFrame(block, index=df.index, columns=names)], axis=1)
+            print("패널 기술 지표 계산 완료.")
+        for symbol, df in chunk.items():
+            if symbol not in results:
+                results[symbol] = calculate_all_indicators(df, specs)
+    return {symbol: results.get(symbol, df) for symbol, df in frames.items()}
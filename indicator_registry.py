@@ -0,0 +1,524 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# 기술 지표 파라미터 (calculate_all_indicators와 incremental_indicators가 함께 사용)
+MA_LENGTHS = [5, 10, 20, 50, 60, 100, 200]
+MACD_PARAMS = [(12,26,9), (24,52,18), (19,39,9)]
+RSI_LENGTHS = [7,14,21]
+STOCH_PARAMS = [(5,3),(9,3),(14,3)]
+STOCH_SMOOTH_K = 3 # pandas_ta stoch 기본값
+BBANDS_LENGTHS = [10,20,50]
+BBANDS_STD = 2
+ATR_LENGTHS = [7,14,28]
+OBV_SMA_LENGTHS = [10,20,50]
+ICHIMOKU_TENKAN, ICHIMOKU_KIJUN, ICHIMOKU_SENKOU = 9, 26, 52
+SUPERTREND_LENGTHS = [10,14,21]
+SUPERTREND_MULTIPLIER = 3
+
+# MA 200, Ichimoku 52가 가장 긴 기간이므로, 최소 200개 이상의 캔들이 필요합니다.
+MIN_INDICATOR_CANDLES = max(200, 52)
+FIB_WINDOW = 30
+FIB_RATIOS = [0, 0.236, 0.382, 0.5, 0.618, 0.786, 1, 1.272, 1.618]
+# 'last': 모든 행에 마지막 FIB_WINDOW개 캔들 기준 수준 (기존 방식)
+# 'rolling': 행마다 그 캔들까지의 최근 FIB_WINDOW개 캔들 기준 수준 (incremental_indicators와 같은 값)
+FIB_MODES = ('last', 'rolling')
+FIB_MODE = os.getenv('FIB_MODE', 'last')
+
+# 지표 그룹 (technical_indicators 문서의 그룹 이름과 같음)
+INDICATOR_GROUPS = ('MA', 'EMA', 'MACD', 'RSI', 'STOCH', 'BBANDS', 'ATR', 'OBV', 'ICHIMOKU', 'SUPERTREND', 'FIB')
+# 배포별로 계산할 그룹 (쉼표 구분, 예: INDICATOR_GROUPS=MA,EMA,RSI). 비어 있으면 전체
+ENABLED_INDICATOR_GROUPS = [g.strip().upper() for g in os.getenv('INDICATOR_GROUPS', '').split(',') if g.strip()]
+
+# pandas_ta의 non_zero_range와 같이 0으로 나누지 않도록 정확히 0인 값을 엡실론으로 바꿀 때 사용
+EPSILON = sys.float_info.epsilon
+# 이동 창 계산에서 한 번에 펼칠 최대 칸 수 (행 × 열 × 창 크기, 넘으면 행을 나눠서 계산)
+ROLLING_WINDOW_CHUNK_CELLS = 4_000_000
+# 종목 열이 이 수 이상이면 EMA/Supertrend 반복문을 행 단위 NumPy 연산으로 모든 열에 한 번에 적용
+# (그보다 적으면 열마다 pandas/파이썬 반복문이 빠름)
+PANEL_VECTOR_MIN_COLUMNS = 32
+
+# 주어진 캔들 구간(최근 1개월)의 고점/저점으로 피보나치 되돌림 수준 계산
+def calculate_fib_levels(recent_data_for_fib, verbose=True):
+    fib_levels = {}
+    if recent_data_for_fib.empty or len(recent_data_for_fib) <= 1:
+        return fib_levels
+    recent_high = recent_data_for_fib['high'].max()
+    recent_low = recent_data_for_fib['low'].min()
+    price_range = recent_high - recent_low
+    rising = recent_data_for_fib['close'].iloc[-1] > recent_data_for_fib['close'].iloc[0]
+    for ratio in FIB_RATIOS:
+        if rising:
+            level = recent_high - price_range * ratio
+        else:
+            level = recent_low  + price_range * ratio
+        key = f"FIB_{ratio}"
+        fib_levels[key] = level
+    if verbose:
+        print(f"피보나치 되돌림 수준 (최근 1개월 고점 {recent_high:.2f}, 저점 {recent_low:.2f} 기준, open_time 기준) 계산 완료.")
+    return fib_levels
+
+# ---- 계산 커널 ----
+# 모든 커널은 행(시간) 축 0을 따라 계산하며 (n,) 배열과 (n, 종목 수) 배열을 모두 받습니다.
+
+def _as_2d(values):
+    values = np.asarray(values, dtype=np.float64)
+    return (values[:, None], True) if values.ndim == 1 else (values, False)
+
+def _restore(values, squeeze):
+    return values[:, 0] if squeeze else values
+
+def non_zero(values):
+    return np.where(values == 0, EPSILON, values)
+
+def shift(values, periods):
+    out = np.full(np.shape(values), np.nan)
+    if periods > 0:
+        out[periods:] = values[:-periods]
+    elif periods < 0:
+        out[:periods] = values[-periods:]
+    else:
+        out[:] = values
+    return out
+
+def _sliding_reduce(values, length, reduce):
+    # 창 안에 NaN이 하나라도 있으면 NaN (pandas rolling(min_periods=length)과 같음)
+    out = np.full(values.shape, np.nan)
+    n, width = values.shape
+    chunk_rows = max(1, ROLLING_WINDOW_CHUNK_CELLS // max(width * length, 1))
+    for start in range(0, max(n - length + 1, 0), chunk_rows):
+        stop = min(start + chunk_rows, n - length + 1)
+        windows = sliding_window_view(values[start:stop + length - 1], length, axis=0)
+        out[start + length - 1:stop + length - 1] = reduce(windows)
+    return out
+
+def _rolling(values, length, method):
+    values, squeeze = _as_2d(values)
+    if values.shape[1] == 1:
+        result = getattr(pd.Series(values[:, 0]).rolling(length, min_periods=length), method)().to_numpy()[:, None]
+    else:
+        # 여러 열은 pandas가 열마다 따로 돌므로 NumPy 창 연산으로 한 번에 계산
+        result = _sliding_reduce(values, length, lambda windows: getattr(windows, method)(axis=-1))
+    return _restore(result, squeeze)
+
+def rolling_mean(values, length):
+    return _rolling(values, length, 'mean')
+
+class RollingExtrema:
+    """
+    배열 하나의 구간 최댓값/최솟값을 여러 창 크기에 대해 계산하는 doubling 표.
+    levels[k][i]는 i에서 끝나는 2^k개 구간의 극값(시작 전 행은 잘라냄)이며, 창 크기 w는
+    k = floor(log2 w)인 두 구간 [i-w+1, i-w+2^k]와 [i-2^k+1, i]로 덮으므로 창마다 NumPy 연산 한 번으로 계산됩니다.
+    표는 요청된 가장 큰 창까지만 만들고 같은 입력의 모든 창(스토캐스틱, 일목균형표, 피보나치)이 공유합니다.
+    표 생성은 O(n log w)이지만 창이 여러 개(5~52)라 창마다 O(n)인 van Herk/Gil-Werman 블록 방식보다 실측이 빠릅니다
+    (창마다 블록 재배치/누적 패스가 여러 번 필요하고 표는 창끼리 공유되기 때문).
+    skip_nan=False이면 창 안에 NaN이 있으면 NaN, True이면 NaN을 건너뜁니다. 최댓값/최솟값이라 pandas rolling과 값이 정확히 같습니다.
+    """
+
+    def __init__(self, values, is_max, skip_nan=False):
+        self.values, self.squeeze = _as_2d(values)
+        if skip_nan:
+            self.reduce = np.fmax if is_max else np.fmin
+        else:
+            self.reduce = np.maximum if is_max else np.minimum
+        self.levels = [self.values]
+
+    def _level(self, k):
+        while len(self.levels) <= k:
+            prev = self.levels[-1]
+            half = 1 << (len(self.levels) - 1)
+            level = prev.copy()
+            level[half:] = self.reduce(prev[half:], prev[:-half])
+            self.levels.append(level)
+        return self.levels[k]
+
+    def window(self, length, min_periods=None):
+        """min_periods가 None이면 length개가 모두 있는 행부터, 아니면 앞쪽 행도 있는 캔들만으로 계산합니다."""
+        values = self.values
+        out = np.full(values.shape, np.nan)
+        if length <= len(values):
+            k = length.bit_length() - 1
+            level = self._level(k)
+            span = 1 << k
+            out[length - 1:] = self.reduce(level[length - 1:], level[span - 1:len(values) - length + span])
+        if min_periods is not None:
+            head = min(length - 1, len(values))
+            out[:head] = self.reduce.accumulate(values[:head], axis=0)
+            if min_periods > 1:
+                out[:min_periods - 1] = np.nan
+        return _restore(out, self.squeeze)
+
+def rolling_max(values, length):
+    return RollingExtrema(values, True).window(length)
+
+def rolling_min(values, length):
+    return RollingExtrema(values, False).window(length)
+
+def rolling_std(values, length):
+    # 모표준편차 (ddof=0, pandas_ta bbands와 같음)
+    values, squeeze = _as_2d(values)
+    return _restore(_sliding_reduce(values, length, lambda windows: np.sqrt(windows.var(axis=-1))), squeeze)
+
+def _ewm_rows(values, alpha):
+    # pandas ewm(adjust=False)과 같은 식을 행 단위로 모든 열에 적용
+    # 시작값 이전(NaN)은 NaN으로 두고, 열이 끝난 뒤(NaN)도 NaN (해당 행은 심볼별 결과에서 잘려 나감)
+    out = np.empty(values.shape)
+    out[0] = values[0]
+    old_weight, new_weight = 1.0 - alpha, alpha
+    total_weight = old_weight + new_weight
+    for i in range(1, len(values)):
+        prev, cur = out[i - 1], values[i]
+        mixed = old_weight * prev
+        mixed += new_weight * cur
+        mixed /= total_weight
+        out[i] = np.where(np.isnan(prev), cur, mixed)
+    return out
+
+def ewm_seeded(values, length, alpha):
+    # 열마다 첫 유효값부터 length개의 평균을 시작값으로 두고 그 이전은 NaN (pandas_ta ema/rma와 같음)
+    values, squeeze = _as_2d(values)
+    n, width = values.shape
+    valid = ~np.isnan(values)
+    first_valid = np.where(valid.any(axis=0), valid.argmax(axis=0), n)
+    seed_rows = first_valid + length - 1
+    cols = np.flatnonzero(seed_rows < n)
+    seeded = np.full(values.shape, np.nan)
+    if len(cols):
+        windows = values[first_valid[cols, None] + np.arange(length), cols[:, None]]
+        with np.errstate(invalid='ignore'):
+            seeded[seed_rows[cols], cols] = np.nanmean(windows, axis=1)
+        after_seed = np.arange(n)[:, None] > seed_rows
+        seeded[after_seed] = values[after_seed]
+    if width >= PANEL_VECTOR_MIN_COLUMNS:
+        result = _ewm_rows(seeded, alpha)
+    else:
+        result = pd.DataFrame(seeded).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    return _restore(result, squeeze)
+
+def true_range(high, low, close):
+    prev_close = shift(close, 1)
+    with np.errstate(invalid='ignore'):
+        ranges = np.fmax(np.fmax(np.abs(non_zero(high - low)), np.abs(high - prev_close)), np.abs(prev_close - low))
+    ranges[np.isnan(prev_close)] = np.nan # 이전 종가가 없는 첫 행은 NaN
+    return ranges
+
+def on_balance_volume(close, volume):
+    close, squeeze = _as_2d(close)
+    volume, _ = _as_2d(volume)
+    sign = np.sign(pd.DataFrame(close).diff().to_numpy())
+    valid = ~np.isnan(close)
+    first_valid = valid.argmax(axis=0)
+    has_valid = valid.any(axis=0)
+    sign[first_valid[has_valid], np.flatnonzero(has_valid)] = 1 # 첫 캔들의 거래량은 더함
+    result = pd.DataFrame(sign * volume).cumsum().to_numpy()
+    return _restore(result, squeeze)
+
+def _supertrend_column(close, upper, lower):
+    # pandas_ta supertrend 반복문 (파이썬 float 리스트로 돌면 NumPy 원소 접근보다 훨씬 빠름)
+    n = len(close)
+    direction, trend = [1.0] * n, [0.0] * n
+    long, short = [np.nan] * n, [np.nan] * n
+    for i in range(1, n):
+        if close[i] > upper[i - 1]:
+            direction[i] = 1.0
+        elif close[i] < lower[i - 1]:
+            direction[i] = -1.0
+        else:
+            direction[i] = direction[i - 1]
+            if direction[i] > 0 and lower[i] < lower[i - 1]:
+                lower[i] = lower[i - 1]
+            if direction[i] < 0 and upper[i] > upper[i - 1]:
+                upper[i] = upper[i - 1]
+        if direction[i] > 0:
+            trend[i] = long[i] = lower[i]
+        else:
+            trend[i] = short[i] = upper[i]
+    return trend, direction, long, short
+
+def supertrend_bands(close, upper, lower):
+    close, squeeze = _as_2d(close)
+    upper, _ = _as_2d(upper)
+    lower, _ = _as_2d(lower)
+    if close.shape[1] < PANEL_VECTOR_MIN_COLUMNS:
+        columns = [_supertrend_column(close[:, col].tolist(), upper[:, col].tolist(), lower[:, col].tolist())
+                   for col in range(close.shape[1])]
+        trend, direction, long, short = (np.array([column[part] for column in columns]).T for part in range(4))
+    else:
+        trend, direction, long, short = _supertrend_rows(close, upper, lower)
+    # 늦게 상장된 종목 열은 첫 캔들부터 반복문을 시작한 것과 같도록 첫 행 추세값을 0으로 맞춤
+    valid = ~np.isnan(close)
+    has_valid = valid.any(axis=0)
+    trend[valid.argmax(axis=0)[has_valid], np.flatnonzero(has_valid)] = 0.0
+    return tuple(_restore(values, squeeze) for values in (trend, direction, long, short))
+
+def _supertrend_rows(close, upper, lower):
+    # 종목 열이 많으면 같은 반복문을 행 단위로 모든 열에 한 번에 적용
+    upper, lower = upper.copy(), lower.copy()
+    direction = np.ones(close.shape)
+    trend = np.zeros(close.shape)
+    long = np.full(close.shape, np.nan)
+    short = np.full(close.shape, np.nan)
+    with np.errstate(invalid='ignore'):
+        for i in range(1, len(close)):
+            up = close[i] > upper[i - 1]
+            down = ~up & (close[i] < lower[i - 1])
+            keep = ~up & ~down
+            direction[i] = np.where(up, 1.0, np.where(down, -1.0, direction[i - 1]))
+            lower[i] = np.where(keep & (direction[i] > 0) & (lower[i] < lower[i - 1]), lower[i - 1], lower[i])
+            upper[i] = np.where(keep & (direction[i] < 0) & (upper[i] > upper[i - 1]), upper[i - 1], upper[i])
+            bullish = direction[i] > 0
+            trend[i] = np.where(bullish, lower[i], upper[i])
+            long[i] = np.where(bullish, lower[i], np.nan)
+            short[i] = np.where(bullish, np.nan, upper[i])
+    return trend, direction, long, short
+
+# ---- 공유 중간값 ----
+# 노드 키는 (종류, 입력 노드 또는 컬럼 이름, 파라미터...) 튜플. 같은 키는 프레임마다 한 번만 계산됨
+
+def _node_sma(ctx, source, length):
+    return rolling_mean(ctx.get(source), length)
+
+def _node_ema(ctx, source, length):
+    return ewm_seeded(ctx.get(source), length, 2.0 / (length + 1))
+
+def _node_rma(ctx, source, length):
+    return ewm_seeded(ctx.get(source), length, 1.0 / length)
+
+def _node_extrema(ctx, source, is_max, skip_nan=False):
+    return RollingExtrema(ctx.get(source), is_max, skip_nan)
+
+def _node_max(ctx, source, length):
+    return ctx.get(('extrema', source, True)).window(length)
+
+def _node_min(ctx, source, length):
+    return ctx.get(('extrema', source, False)).window(length)
+
+def _node_std(ctx, source, length):
+    return rolling_std(ctx.get(source), length)
+
+def _node_diff(ctx, source):
+    return ctx.get(source) - shift(ctx.get(source), 1)
+
+def _node_gain(ctx, source):
+    diff = ctx.get(('diff', source))
+    return np.where(diff > 0, diff, np.where(np.isnan(diff), np.nan, 0.0))
+
+def _node_loss(ctx, source):
+    diff = ctx.get(('diff', source))
+    return np.where(diff < 0, diff, np.where(np.isnan(diff), np.nan, 0.0))
+
+def _node_tr(ctx):
+    return true_range(ctx.get('high'), ctx.get('low'), ctx.get('close'))
+
+def _node_hl2(ctx):
+    return 0.5 * (ctx.get('high') + ctx.get('low'))
+
+def _node_midprice(ctx, length):
+    return 0.5 * (ctx.get(('min', 'low', length)) + ctx.get(('max', 'high', length)))
+
+def _node_macd(ctx, fast, slow):
+    return ctx.get(('ema', 'close', fast)) - ctx.get(('ema', 'close', slow))
+
+def _node_stoch(ctx, k):
+    lowest = ctx.get(('min', 'low', k))
+    return 100 * (ctx.get('close') - lowest) / non_zero(ctx.get(('max', 'high', k)) - lowest)
+
+def _node_obv(ctx):
+    return on_balance_volume(ctx.get('close'), ctx.get('volume'))
+
+NODE_FUNCTIONS = {
+    'sma': _node_sma, 'ema': _node_ema, 'rma': _node_rma, 'extrema': _node_extrema, 'max': _node_max, 'min': _node_min,
+    'std': _node_std,
+    'diff': _node_diff, 'gain': _node_gain, 'loss': _node_loss, 'tr': _node_tr, 'hl2': _node_hl2,
+    'midprice': _node_midprice, 'macd': _node_macd, 'stoch': _node_stoch, 'obv': _node_obv,
+}
+
+class IndicatorContext:
+    """
+    한 프레임(또는 종목 열을 모은 패널)의 지표 계산 중간값 저장소.
+    get(키)은 노드를 처음 요청할 때만 계산하고 이후에는 저장된 배열을 돌려주므로
+    SMA 20(MA와 볼린저 밴드), 종가 EMA(EMA와 MACD), True Range(ATR과 Supertrend),
+    구간 고가/저가(스토캐스틱과 일목균형표) 같은 공유 중간값이 한 번만 계산됩니다.
+    computed에는 계산한 노드 키가 순서대로, reused에는 재사용 횟수가 기록됩니다.
+    """
+
+    def __init__(self, columns):
+        self.columns = {name: np.asarray(values, dtype=np.float64) for name, values in columns.items()}
+        self.nodes = {}
+        self.computed = []
+        self.reused = 0
+
+    def get(self, key):
+        if isinstance(key, str):
+            return self.columns[key]
+        if key in self.nodes:
+            self.reused += 1
+            return self.nodes[key]
+        value = NODE_FUNCTIONS[key[0]](self, *key[1:])
+        self.nodes[key] = value
+        self.computed.append(key)
+        return value
+
+# ---- 지표 선언 ----
+# 각 함수는 (컬럼 이름, 배열) 목록을 pandas_ta와 같은 이름/순서로 반환
+
+def _sma_columns(ctx, length):
+    return [(f"SMA_{length}", ctx.get(('sma', 'close', length)))]
+
+def _ema_columns(ctx, length):
+    return [(f"EMA_{length}", ctx.get(('ema', 'close', length)))]
+
+def _macd_columns(ctx, fast, slow, signal):
+    macd = ctx.get(('macd', fast, slow))
+    signal_line = ctx.get(('ema', ('macd', fast, slow), signal))
+    props = f"{fast}_{slow}_{signal}"
+    return [(f"MACD_{props}", macd), (f"MACDh_{props}", macd - signal_line), (f"MACDs_{props}", signal_line)]
+
+def _rsi_columns(ctx, length):
+    gain = ctx.get(('rma', ('gain', 'close'), length))
+    loss = ctx.get(('rma', ('loss', 'close'), length))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return [(f"RSI_{length}", 100 * gain / (gain + np.abs(loss)))]
+
+def _stoch_columns(ctx, k, d, smooth_k):
+    k_key = ('sma', ('stoch', k), smooth_k)
+    props = f"{k}_{d}_{smooth_k}"
+    return [(f"STOCHk_{props}", ctx.get(k_key)), (f"STOCHd_{props}", ctx.get(('sma', k_key, d)))]
+
+def _bbands_columns(ctx, length, std):
+    mid = ctx.get(('sma', 'close', length))
+    deviation = std * ctx.get(('std', 'close', length))
+    lower, upper = mid - deviation, mid + deviation
+    band_range = non_zero(upper - lower)
+    props = f"{length}_{float(std)}"
+    return [(f"BBL_{props}", lower), (f"BBM_{props}", mid), (f"BBU_{props}", upper),
+            (f"BBB_{props}", 100 * band_range / mid), (f"BBP_{props}", non_zero(ctx.get('close') - lower) / band_range)]
+
+def _atr_columns(ctx, length):
+    return [(f"ATRr_{length}", ctx.get(('rma', ('tr',), length)))]
+
+def _obv_columns(ctx):
+    return [("OBV", ctx.get(('obv',)))]
+
+def _obv_sma_columns(ctx, length):
+    return [(f"OBV__SMA_{length}", ctx.get(('sma', ('obv',), length)))]
+
+def _ichimoku_columns(ctx, tenkan, kijun, senkou):
+    tenkan_sen = ctx.get(('midprice', tenkan))
+    kijun_sen = ctx.get(('midprice', kijun))
+    return [(f"ISA_{tenkan}", shift(0.5 * (tenkan_sen + kijun_sen), kijun)),
+            (f"ISB_{kijun}", shift(ctx.get(('midprice', senkou)), kijun)),
+            (f"ITS_{tenkan}", tenkan_sen), (f"IKS_{kijun}", kijun_sen),
+            (f"ICS_{kijun}", shift(ctx.get('close'), -kijun))]
+
+def _supertrend_columns(ctx, length, multiplier):
+    hl2 = ctx.get(('hl2',))
+    band = multiplier * ctx.get(('rma', ('tr',), length))
+    trend, direction, long, short = supertrend_bands(ctx.get('close'), hl2 + band, hl2 - band)
+    props = f"{length}_{float(multiplier)}"
+    return [(f"SUPERT_{props}", trend), (f"SUPERTd_{props}", direction),
+            (f"SUPERTl_{props}", long), (f"SUPERTs_{props}", short)]
+
+def _rolling_fib_levels(ctx, window):
+    # 행마다 calculate_fib_levels(그 행까지의 최근 window개 캔들)과 같은 값. 캔들이 2개 미만이면 NaN
+    recent_high = _as_2d(ctx.get(('extrema', 'high', True, True)).window(window, min_periods=1))[0]
+    recent_low = _as_2d(ctx.get(('extrema', 'low', False, True)).window(window, min_periods=1))[0]
+    close = _as_2d(ctx.get('close'))[0]
+    n, width = close.shape
+    valid = ~np.isnan(close)
+    first_valid = np.where(valid.any(axis=0), valid.argmax(axis=0), n)
+    rows = np.arange(n)[:, None]
+    start = np.maximum(rows - window + 1, first_valid)
+    enough = valid & (rows - start >= 1)
+    first_close = close[np.minimum(start, n - 1), np.arange(width)]
+    rising = close > first_close
+    price_range = recent_high - recent_low
+    levels = []
+    for ratio in FIB_RATIOS:
+        level = np.where(rising, recent_high - price_range * ratio, recent_low + price_range * ratio)
+        level[~enough] = np.nan
+        levels.append((f"FIB_{ratio}", level))
+    return levels, valid
+
+def _fib_columns(ctx, window, mode='last'):
+    if mode not in FIB_MODES:
+        raise ValueError(f"알 수 없는 피보나치 방식입니다: {mode} (사용 가능: {', '.join(FIB_MODES)})")
+    squeeze = np.ndim(ctx.get('close')) == 1
+    levels, valid = _rolling_fib_levels(ctx, window)
+    if mode == 'rolling':
+        return [(key, _restore(values, squeeze)) for key, values in levels]
+    # 'last': 종목 열마다 마지막 유효 행의 수준을 모든 행에 채움
+    n, width = valid.shape
+    last_valid = n - 1 - valid[::-1].argmax(axis=0)
+    has_valid = valid.any(axis=0)
+    columns = []
+    for key, values in levels:
+        last = np.where(has_valid, values[last_valid, np.arange(width)], np.nan)
+        columns.append((key, _restore(np.broadcast_to(last, (n, width)), squeeze)))
+    return columns
+
+SPEC_KINDS = {
+    'sma': _sma_columns, 'ema': _ema_columns, 'macd': _macd_columns, 'rsi': _rsi_columns,
+    'stoch': _stoch_columns, 'bbands': _bbands_columns, 'atr': _atr_columns, 'obv': _obv_columns,
+    'obv_sma': _obv_sma_columns, 'ichimoku': _ichimoku_columns, 'supertrend': _supertrend_columns, 'fib': _fib_columns,
+}
+
+class IndicatorSpec:
+    """지표 하나의 선언: 그룹 이름, 종류(SPEC_KINDS 키), 파라미터."""
+
+    def __init__(self, group, kind, *params):
+        if kind not in SPEC_KINDS:
+            raise ValueError(f"알 수 없는 지표 종류입니다: {kind}")
+        self.group = group
+        self.kind = kind
+        self.params = params
+
+    def columns(self, ctx):
+        return SPEC_KINDS[self.kind](ctx, *self.params)
+
+    def __repr__(self):
+        return f"IndicatorSpec({self.group!r}, {self.kind!r}, {', '.join(map(repr, self.params))})"
+
+# 기존 calculate_all_indicators와 같은 컬럼 순서의 전체 지표 선언
+def default_indicator_specs():
+    specs = []
+    for p in MA_LENGTHS:
+        specs.append(IndicatorSpec('MA', 'sma', p))
+        specs.append(IndicatorSpec('EMA', 'ema', p))
+    specs += [IndicatorSpec('MACD', 'macd', fast, slow, sig) for fast, slow, sig in MACD_PARAMS]
+    specs += [IndicatorSpec('RSI', 'rsi', L) for L in RSI_LENGTHS]
+    specs += [IndicatorSpec('STOCH', 'stoch', k, d, STOCH_SMOOTH_K) for k, d in STOCH_PARAMS]
+    specs += [IndicatorSpec('BBANDS', 'bbands', L, BBANDS_STD) for L in BBANDS_LENGTHS]
+    specs += [IndicatorSpec('ATR', 'atr', L) for L in ATR_LENGTHS]
+    specs.append(IndicatorSpec('OBV', 'obv'))
+    specs += [IndicatorSpec('OBV', 'obv_sma', L) for L in OBV_SMA_LENGTHS]
+    specs.append(IndicatorSpec('ICHIMOKU', 'ichimoku', ICHIMOKU_TENKAN, ICHIMOKU_KIJUN, ICHIMOKU_SENKOU))
+    specs += [IndicatorSpec('SUPERTREND', 'supertrend', L, SUPERTREND_MULTIPLIER) for L in SUPERTREND_LENGTHS]
+    specs.append(IndicatorSpec('FIB', 'fib', FIB_WINDOW, FIB_MODE))
+    return specs
+
+# 그룹 이름 목록으로 지표 선언을 고름 (None이면 INDICATOR_GROUPS 환경 변수, 그것도 없으면 전체)
+def select_indicator_specs(groups=None):
+    groups = ENABLED_INDICATOR_GROUPS if groups is None else [g.upper() for g in groups]
+    unknown = [g for g in groups if g not in INDICATOR_GROUPS]
+    if unknown:
+        raise ValueError(f"알 수 없는 지표 그룹입니다: {', '.join(unknown)} (사용 가능: {', '.join(INDICATOR_GROUPS)})")
+    specs = default_indicator_specs()
+    return [spec for spec in specs if spec.group in groups] if groups else specs
+
+# open/high/low/close/volume 배열(dict)로 지표 컬럼을 계산해 {컬럼 이름: 배열}을 순서대로 반환
+def compute_indicator_columns(columns, specs=None):
+    specs = select_indicator_specs() if specs is None else specs
+    ctx = IndicatorContext(columns)
+    results = {}
+    for spec in specs:
+        results.update(spec.columns(ctx))
+    return results, ctx
+
+# DataFrame에 지표 컬럼을 붙여 반환 (같은 이름의 기존 컬럼은 새 값으로 바꿈)
+def append_indicator_columns(df, specs=None):
+    results, ctx = compute_indicator_columns({name: df[name].to_numpy() for name in ('open', 'high', 'low', 'close', 'volume')}, specs)
+    indicators = pd.DataFrame(results, index=df.index)
+    return pd.concat([df.drop(columns=[c for c in indicators.columns if c in df.columns]), indicators], axis=1)
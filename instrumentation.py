@@ -0,0 +1,206 @@
+import os
+import json
+import time
+import atexit
+import threading
+import multiprocessing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 메트릭 이름 접두어 (Prometheus)
+METRICS_PREFIX = 'llm_crypto'
+# JSON-lines 버퍼가 이 개수를 넘으면 파일에 씀
+METRICS_JSONL_BUFFER_SIZE = 1000
+# Prometheus 집계에서 제외할 레이블 (날짜처럼 값 종류가 계속 늘어나는 레이블은 JSON-lines에만 남김)
+HIGH_CARDINALITY_LABELS = ('date',)
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items() if key not in HIGH_CARDINALITY_LABELS))
+
+def _format_labels(label_key):
+    if not label_key:
+        return ''
+    escaped = (f'{key}="' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"' for key, value in label_key)
+    return '{' + ','.join(escaped) + '}'
+
+class _Span:
+    __slots__ = ('metrics', 'name', 'labels', 'started')
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.record_span(self.name, time.perf_counter() - self.started, self.labels, error=exc_type is not None)
+        return False
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class Metrics:
+    """
+    파이프라인 단계별 소요 시간(span)과 카운터(API 페이지 수, 캔들 수, LLM 토큰, Mongo 왕복 수 등)를 모으는 계측기.
+    span/카운터는 메모리에서 (이름, 레이블)별 합계로만 누적하고, jsonl_path가 있으면 span 하나당 한 줄을 버퍼에 모아 씁니다.
+    export_prometheus로 Prometheus 텍스트 형식 파일을 쓰거나 serve_prometheus로 /metrics HTTP 엔드포인트를 엽니다.
+    enabled=False이면 모든 호출이 아무 일도 하지 않습니다.
+    """
+
+    def __init__(self, enabled=True, jsonl_path=None, prometheus_path=None):
+        self.enabled = enabled
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._spans = {} # (name, label_key) -> [count, sum_seconds, max_seconds, errors]
+        self._buffer = []
+        self._server = None
+
+    def span(self, name, **labels):
+        """with metrics.span('fetch', symbol='BTCUSDT'): ... 형태로 구간 소요 시간을 기록합니다."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, labels)
+
+    def record_span(self, name, seconds, labels, error=False):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            stats = self._spans.get(key)
+            if stats is None:
+                stats = self._spans[key] = [0, 0.0, 0.0, 0]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+            stats[3] += error
+            if self.jsonl_path:
+                record = {"ts": time.time(), "span": name, "seconds": round(seconds, 6), **labels}
+                if error:
+                    record["error"] = True
+                self._buffer.append(record)
+                flush_now = len(self._buffer) >= METRICS_JSONL_BUFFER_SIZE
+            else:
+                flush_now = False
+        if flush_now:
+            self._flush_jsonl()
+
+    def count(self, name, value=1, **labels):
+        """카운터 name{labels}에 value를 더합니다."""
+        if not self.enabled or not value:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self):
+        """현재까지의 카운터와 span 합계를 dict로 반환합니다."""
+        with self._lock:
+            return {
+                "counters": [{"name": name, "labels": dict(label_key), "value": value}
+                             for (name, label_key), value in self._counters.items()],
+                "spans": [{"name": name, "labels": dict(label_key), "count": stats[0], "seconds": stats[1],
+                           "max_seconds": stats[2], "errors": stats[3]}
+                          for (name, label_key), stats in self._spans.items()],
+            }
+
+    def _flush_jsonl(self):
+        with self._lock:
+            records, self._buffer = self._buffer, []
+        if not records or not self.jsonl_path:
+            return
+        with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def prometheus_text(self):
+        """Prometheus 텍스트 노출 형식 문자열을 만듭니다."""
+        snapshot = self.snapshot()
+        lines = []
+        counter_names = sorted({counter["name"] for counter in snapshot["counters"]})
+        for name in counter_names:
+            metric = f"{METRICS_PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} counter")
+            for counter in snapshot["counters"]:
+                if counter["name"] == name:
+                    lines.append(f"{metric}{_format_labels(tuple(sorted(counter['labels'].items())))} {counter['value']}")
+        if snapshot["spans"]:
+            metric = f"{METRICS_PREFIX}_span_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for span in snapshot["spans"]:
+                label_key = tuple(sorted({"span": span["name"], **span["labels"]}.items()))
+                lines.append(f"{metric}_sum{_format_labels(label_key)} {span['seconds']:.6f}")
+                lines.append(f"{metric}_count{_format_labels(label_key)} {span['count']}")
+            lines.append(f"# TYPE {METRICS_PREFIX}_span_errors counter")
+            for span in snapshot["spans"]:
+                label_key = tuple(sorted({"span": span["name"], **span["labels"]}.items()))
+                lines.append(f"{METRICS_PREFIX}_span_errors{_format_labels(label_key)} {span['errors']}")
+        return '\n'.join(lines) + '\n'
+
+    def export_prometheus(self, path=None):
+        """Prometheus 텍스트 파일을 원자적으로 씁니다 (node_exporter textfile collector용)."""
+        path = path or self.prometheus_path
+        if not path:
+            return
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def serve_prometheus(self, port, host='0.0.0.0'):
+        """/metrics 경로로 Prometheus 텍스트를 제공하는 HTTP 서버를 데몬 스레드에서 시작합니다."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"Prometheus 메트릭 제공: http://{host}:{port}/metrics")
+        return self._server
+
+    def flush(self):
+        """버퍼의 span을 JSON-lines 파일에 쓰고, 카운터 요약 한 줄을 추가한 뒤 Prometheus 파일을 갱신합니다."""
+        if not self.enabled:
+            return
+        self._flush_jsonl()
+        if self.jsonl_path:
+            with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({"ts": time.time(), "snapshot": self.snapshot()}, ensure_ascii=False) + '\n')
+        self.export_prometheus()
+
+# 모듈 전체에서 함께 쓰는 계측기 (환경 변수로 설정)
+# METRICS_ENABLED=0 이면 끔, METRICS_JSONL_PATH / METRICS_PROM_PATH로 출력 파일 지정, METRICS_PORT로 HTTP 엔드포인트 열기
+metrics = Metrics(
+    enabled=os.getenv('METRICS_ENABLED', '1') != '0',
+    jsonl_path=os.getenv('METRICS_JSONL_PATH'),
+    prometheus_path=os.getenv('METRICS_PROM_PATH')
+)
+atexit.register(metrics.flush)
+
+# METRICS_PORT가 설정되어 있으면 HTTP 엔드포인트를 엶 (import 시에는 열지 않고 실행 스크립트의 시작 부분에서 호출)
+# 병렬 백필의 작업 프로세스는 모듈을 다시 import하므로 최상위 프로세스에서만 엶
+def serve_metrics_from_env():
+    if metrics.enabled and os.getenv('METRICS_PORT') and multiprocessing.parent_process() is None and metrics._server is None:
+        metrics.serve_prometheus(int(os.getenv('METRICS_PORT')))
@@ -0,0 +1,105 @@
+import os
+import json
+import threading
+import numpy as np
+
+# 로컬 캔들 저장소 기본 위치 (common.py에서 KLINE_CACHE_DIR 환경 변수로 변경 가능)
+KLINE_CACHE_DIR = '.kline_cache'
+
+# 캐시 파일 한 행의 구조 (open_time/close_time은 ms 단위 UTC)
+KLINE_DTYPE = np.dtype([
+    ('open_time', '<i8'), ('close_time', '<i8'),
+    ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'), ('volume', '<f8')
+])
+
+class KlineCache:
+    """
+    (symbol, interval)별 마감된 캔들을 디스크에 저장하는 로컬 캔들 저장소.
+    캔들은 open_time 기준으로 정렬된 구조화 NumPy 배열(.npy)로 저장되어 memory-map으로 읽고,
+    meta.json에는 API로 확인이 끝난 open_time 구간 [covered_from, covered_to)를 기록합니다.
+    상장 전이나 데이터가 없는 구간도 확인된 구간으로 기록되므로 다시 요청하지 않습니다.
+    """
+
+    def __init__(self, cache_dir=KLINE_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+
+    def _key_dir(self, symbol, interval):
+        # '1m'(분)과 '1M'(월)이 대소문자 구분 없는 파일 시스템에서 겹치지 않도록 구분
+        interval_key = interval.replace('M', 'mo')
+        return os.path.join(self.cache_dir, f"{symbol}_{interval_key}")
+
+    def load(self, symbol, interval):
+        """저장된 캔들 배열(memory-map)과 메타 정보를 반환합니다. 캐시가 없거나 손상되었으면 (빈 배열, None)."""
+        key_dir = self._key_dir(symbol, interval)
+        try:
+            with open(os.path.join(key_dir, 'meta.json'), encoding='utf-8') as f:
+                meta = json.load(f)
+            data = np.load(os.path.join(key_dir, 'klines.npy'), mmap_mode='r')
+        except (OSError, ValueError):
+            return np.empty(0, dtype=KLINE_DTYPE), None
+        if data.dtype != KLINE_DTYPE or len(data) != meta.get('rows'):
+            # 다른 프로세스가 쓰는 도중이거나 형식이 바뀐 캐시는 무시
+            return np.empty(0, dtype=KLINE_DTYPE), None
+        return data, meta
+
+    def missing_ranges(self, symbol, interval, start_ms, end_ms):
+        """요청 구간 [start_ms, end_ms) 중 API로 받아와야 하는 앞/뒤 구간 목록을 반환합니다."""
+        _, meta = self.load(symbol, interval)
+        if meta is None:
+            return [(start_ms, end_ms)]
+        covered_from, covered_to = meta['covered_from'], meta['covered_to']
+        ranges = []
+        if start_ms < covered_from:
+            # 확인된 구간과 이어지도록 covered_from까지 받아옴
+            ranges.append((start_ms, covered_from))
+        if end_ms > covered_to:
+            ranges.append((max(start_ms, covered_to), end_ms))
+        return ranges
+
+    def read(self, symbol, interval, start_ms, end_ms):
+        """open_time이 [start_ms, end_ms) 안에 있는 캐시 캔들을 반환합니다."""
+        data, meta = self.load(symbol, interval)
+        if meta is None:
+            return np.empty(0, dtype=KLINE_DTYPE)
+        lo = np.searchsorted(data['open_time'], start_ms, side='left')
+        hi = np.searchsorted(data['open_time'], end_ms, side='left')
+        return np.array(data[lo:hi])
+
+    def store(self, symbol, interval, rows, covered_from, covered_to):
+        """
+        마감된 캔들 rows를 병합 저장하고 확인된 구간을 [covered_from, covered_to)만큼 넓힙니다.
+        기존 확인 구간과 떨어진 구간은 연속성을 지킬 수 없으므로 저장하지 않습니다.
+        """
+        if covered_to <= covered_from:
+            return False
+        with self._lock:
+            data, meta = self.load(symbol, interval)
+            if meta is not None:
+                if covered_to < meta['covered_from'] or covered_from > meta['covered_to']:
+                    return False
+                covered_from = min(covered_from, meta['covered_from'])
+                covered_to = max(covered_to, meta['covered_to'])
+                merged = np.concatenate([np.asarray(data), rows])
+            else:
+                merged = np.asarray(rows, dtype=KLINE_DTYPE)
+            merged = merged[(merged['open_time'] >= covered_from) & (merged['open_time'] < covered_to)]
+            # open_time 기준 정렬 후 중복 제거 (새로 받은 행이 뒤에 있으므로 마지막 값 유지)
+            order = np.argsort(merged['open_time'], kind='stable')
+            merged = merged[order]
+            keep = np.ones(len(merged), dtype=bool)
+            keep[:-1] = merged['open_time'][1:] != merged['open_time'][:-1]
+            merged = merged[keep]
+
+            key_dir = self._key_dir(symbol, interval)
+            os.makedirs(key_dir, exist_ok=True)
+            data_path = os.path.join(key_dir, 'klines.npy')
+            meta_path = os.path.join(key_dir, 'meta.json')
+            tmp_suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(data_path + tmp_suffix, 'wb') as f:
+                np.save(f, merged)
+            os.replace(data_path + tmp_suffix, data_path)
+            with open(meta_path + tmp_suffix, 'w', encoding='utf-8') as f:
+                json.dump({'covered_from': int(covered_from), 'covered_to': int(covered_to), 'rows': int(len(merged))}, f)
+            os.replace(meta_path + tmp_suffix, meta_path)
+        return True
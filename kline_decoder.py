@@ -0,0 +1,57 @@
+import numpy as np
+from kline_cache import KLINE_DTYPE
+
+# Binance 원본 캔들 한 행에서 KLINE_DTYPE 필드로 쓰는 위치
+# [open_time, open, high, low, close, volume, close_time, ...]
+KLINE_ROW_FIELDS = (0, 6, 1, 2, 3, 4, 5)
+
+# API 응답 한 페이지(list of lists)를 KLINE_DTYPE 배열로 변환
+# out이 주어지면 새 배열을 만들지 않고 그 자리(out[:len(klines)])에 바로 씀
+def decode_klines_page(klines, out=None):
+    if out is None:
+        out = np.empty(len(klines), dtype=KLINE_DTYPE)
+    # 문자열 가격은 행 단위 float 변환이 NumPy 문자열 변환보다 빠름 (페이지가 1000행 이하라 임시 리스트도 작음)
+    out[:len(klines)] = [(k[0], k[6], float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5])) for k in klines]
+    return out[:len(klines)]
+
+class KlineBuffer:
+    """
+    페이지 단위로 받은 캔들을 미리 할당한 KLINE_DTYPE 배열 하나에 이어 붙이는 버퍼.
+    원본 페이지는 받는 즉시 이 배열로 변환되므로 수백만 개의 파이썬 문자열을 한꺼번에 들고 있지 않고,
+    공간이 모자라면 두 배로 늘립니다. array()는 복사 없이 채워진 부분의 view를 반환합니다.
+    """
+
+    def __init__(self, capacity=0):
+        self._data = np.empty(max(int(capacity), 0), dtype=KLINE_DTYPE)
+        self.size = 0
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        if needed > len(self._data):
+            grown = np.empty(max(needed, 2 * len(self._data)), dtype=KLINE_DTYPE)
+            grown[:self.size] = self._data[:self.size]
+            self._data = grown
+
+    def append_page(self, klines):
+        """API 원본 페이지를 변환해 뒤에 붙이고 추가된 행 수를 반환합니다."""
+        self._reserve(len(klines))
+        decode_klines_page(klines, self._data[self.size:])
+        self.size += len(klines)
+        return len(klines)
+
+    def extend(self, arr):
+        """이미 변환된 KLINE_DTYPE 배열을 뒤에 붙입니다."""
+        self._reserve(len(arr))
+        self._data[self.size:self.size + len(arr)] = arr
+        self.size += len(arr)
+        return len(arr)
+
+    @property
+    def last_open_time(self):
+        return int(self._data['open_time'][self.size - 1]) if self.size else None
+
+    def array(self):
+        return self._data[:self.size]
+
+    def __len__(self):
+        return self.size
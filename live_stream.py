@@ -0,0 +1,340 @@
+import os
+import json
+import time
+import argparse
+from collections import deque
+from datetime import datetime, timezone
+import pandas as pd
+from binance.client import Client
+import common
+from common import fetch_klines_array, interval_to_milliseconds, upsert_daily_market_document, prepare_market_data_documents_for_mongo, CHART_DATA_COLUMNS, MIN_INDICATOR_CANDLES
+from incremental_indicators import IncrementalIndicatorEngine
+from daily_market_pipeline import LOOKBACK_DAYS
+from db_indexes import ensure_market_indexes
+from market_series import bulk_upsert_market_series_documents, MARKET_STORAGE_LAYOUT, MARKET_STORAGE_LAYOUTS
+from instrumentation import metrics, serve_metrics_from_env
+
+# 실시간 모드: kline 스트림의 캔들 마감 이벤트마다 심볼별 증분 지표를 갱신하고 그 심볼의 market_data.<SYM>만 $set
+# 이벤트 소스는 events(symbols, interval)로 Binance combined stream 형식의 메시지(dict)를 내보내는 객체
+# ({"stream": "btcusdt@kline_1m", "data": {"e": "kline", "s": "BTCUSDT", "k": {"t", "T", "o", "h", "l", "c", "v", "i", "x"}}})
+# 연결이 끊기면 ConnectionError(OSError)를 내고, 메시지가 끝나면(파일 재생 등) 실시간 모드도 끝남
+
+LIVE_STREAM_URL = os.getenv('LIVE_STREAM_URL', 'wss://stream.binance.com:9443')
+LIVE_SYMBOLS = [s.strip() for s in os.getenv('LIVE_SYMBOLS', 'BTCUSDT,ETHUSDT').split(',') if s.strip()]
+# 일괄 파이프라인과 같은 일봉. 다른 주기는 market_series에만 저장 (daily_market의 market_data는 일봉 지표)
+LIVE_INTERVAL = os.getenv('LIVE_INTERVAL', Client.KLINE_INTERVAL_1DAY)
+# 시작/재연결 시 한 심볼에 대해 가져오는 최대 캔들 수 (일봉은 lookback 구간 전체가 이보다 적음)
+LIVE_WARM_UP_MAX_CANDLES = int(os.getenv('LIVE_WARM_UP_MAX_CANDLES', 1000))
+# 재연결 대기 시간 (실패할 때마다 두 배, 최대값까지)
+LIVE_RECONNECT_BASE_SECONDS = float(os.getenv('LIVE_RECONNECT_BASE_SECONDS', 1))
+LIVE_RECONNECT_MAX_SECONDS = float(os.getenv('LIVE_RECONNECT_MAX_SECONDS', 60))
+DAY_MS = 24 * 60 * 60 * 1000
+
+def _ms_to_date_str(ms):
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
+
+# 스트림 메시지에서 (symbol, interval, candle, 마감 여부)를 꺼냄. kline 이벤트가 아니면 None
+# candle의 open_time/close_time은 ms 정수
+def parse_kline_message(message):
+    data = message.get("data", message)
+    if data.get("e") != "kline":
+        return None
+    k = data["k"]
+    candle = {
+        'open_time': int(k['t']), 'close_time': int(k['T']),
+        'open': float(k['o']), 'high': float(k['h']), 'low': float(k['l']), 'close': float(k['c']), 'volume': float(k['v']),
+    }
+    return data.get("s", k.get("s")), k.get("i"), candle, bool(k.get("x"))
+
+# 캔들 배열(KLINE_DTYPE)을 parse_kline_message와 같은 candle dict 목록으로 변환
+def klines_array_to_candles(arr):
+    return [
+        {'open_time': int(row['open_time']), 'close_time': int(row['close_time']),
+         'open': float(row['open']), 'high': float(row['high']), 'low': float(row['low']),
+         'close': float(row['close']), 'volume': float(row['volume'])}
+        for row in arr
+    ]
+
+# 캔들 dict를 Binance kline 스트림 메시지로 변환 (재생 파일 작성용)
+def kline_message(symbol, interval, candle, closed=True):
+    return {
+        "stream": f"{symbol.lower()}@kline_{interval}",
+        "data": {"e": "kline", "E": candle['close_time'], "s": symbol, "k": {
+            "t": candle['open_time'], "T": candle['close_time'], "s": symbol, "i": interval,
+            "o": str(candle['open']), "h": str(candle['high']), "l": str(candle['low']),
+            "c": str(candle['close']), "v": str(candle['volume']), "x": closed,
+        }},
+    }
+
+class WebSocketKlineSource:
+    """
+    Binance combined stream(`{base_url}/stream?streams=btcusdt@kline_1m/...`)을 구독하는 이벤트 소스.
+    같은 형식으로 메시지를 보내는 로컬 재생 서버(serve_kline_replay)에도 연결할 수 있습니다.
+    """
+
+    def __init__(self, base_url=LIVE_STREAM_URL, open_timeout=10):
+        self.base_url = base_url.rstrip('/')
+        self.open_timeout = open_timeout
+
+    def events(self, symbols, interval):
+        try:
+            from websockets.sync.client import connect
+            from websockets.exceptions import ConnectionClosed, InvalidHandshake
+        except ImportError:
+            raise SystemExit("실시간 스트림에는 websockets가 필요합니다: pip install websockets")
+        streams = "/".join(f"{symbol.lower()}@kline_{interval}" for symbol in symbols)
+        try:
+            with connect(f"{self.base_url}/stream?streams={streams}", open_timeout=self.open_timeout) as ws:
+                print(f"kline 스트림 연결: {self.base_url} ({len(symbols)}개 심볼, {interval})")
+                for raw in ws:
+                    yield json.loads(raw)
+        except (ConnectionClosed, InvalidHandshake) as e:
+            raise ConnectionError(f"kline 스트림 연결 오류: {e}") from e
+        # 서버가 정상 종료해도 실시간 모드에서는 끊긴 것으로 보고 다시 연결
+        raise ConnectionError("kline 스트림 연결이 종료되었습니다.")
+
+class FileKlineSource:
+    """한 줄에 스트림 메시지(JSON) 하나씩 저장된 파일을 순서대로 재생하는 이벤트 소스 (테스트/재현용)."""
+
+    def __init__(self, path, delay_seconds=0):
+        self.path = path
+        self.delay_seconds = delay_seconds
+
+    def events(self, symbols, interval):
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                yield json.loads(line)
+                if self.delay_seconds:
+                    time.sleep(self.delay_seconds)
+
+# FileKlineSource와 같은 형식의 파일을 접속마다 처음부터 보내는 로컬 재생 서버 (WebSocketKlineSource로 연결)
+# 요청한 streams에 없는 메시지는 보내지 않고, 파일 끝에서 연결을 닫음
+def serve_kline_replay(path, host='localhost', port=8765, delay_seconds=0):
+    from urllib.parse import urlparse, parse_qs
+    from websockets.sync.server import serve
+
+    def handler(ws):
+        query = parse_qs(urlparse(ws.request.path).query)
+        streams = set("/".join(query.get("streams", [])).split("/")) - {""}
+        sent = 0
+        for message in FileKlineSource(path, delay_seconds).events(None, None):
+            if streams and message.get("stream") not in streams:
+                continue
+            ws.send(json.dumps(message))
+            sent += 1
+        print(f"재생 완료: {sent}개 메시지 전송")
+
+    with serve(handler, host, port) as server:
+        print(f"kline 재생 서버 시작: ws://{host}:{port} ({path})")
+        server.serve_forever()
+
+class LiveSymbolState:
+    """
+    심볼 하나의 증분 지표 엔진과, 날짜 문서의 OBV 기준점을 맞추기 위한 최근 lookback 구간 캔들 기록.
+    일괄 파이프라인(slice_daily_row)처럼 OBV는 그 날짜의 lookback 시작 캔들을 기준으로 다시 맞춥니다.
+    """
+
+    def __init__(self, symbol, lookback_days=LOOKBACK_DAYS):
+        self.symbol = symbol
+        self.lookback_ms = lookback_days * DAY_MS
+        self.engine = IncrementalIndicatorEngine()
+        self.window = deque() # (open_time ms, 누적 OBV, 거래량)
+        self.last_open_time = None
+
+    def apply(self, candle):
+        self.engine.update({**candle, 'open_time': pd.Timestamp(candle['open_time'], unit='ms'),
+                            'close_time': pd.Timestamp(candle['close_time'], unit='ms')})
+        self.window.append((candle['open_time'], self.engine.obv, candle['volume']))
+        self.last_open_time = candle['open_time']
+
+    # 마지막 캔들을 그 날짜의 문서로 변환. 반환값: (date_str, 문서)
+    def document(self, interval):
+        day_start = self.last_open_time - self.last_open_time % DAY_MS
+        while self.window[0][0] < day_start - self.lookback_ms:
+            self.window.popleft()
+        df = self.engine.latest_frame()
+        if len(self.window) < MIN_INDICATOR_CANDLES:
+            # 일괄 파이프라인에서도 지표 없이 캔들 데이터만 저장되는 구간
+            df = df[['close_time', *CHART_DATA_COLUMNS]]
+        elif 'OBV' in df.columns:
+            _, window_obv, window_volume = self.window[0]
+            obv_cols = [col for col in df.columns if col == 'OBV' or col.startswith('OBV_')]
+            df[obv_cols] = df[obv_cols] - (window_obv - window_volume)
+        return _ms_to_date_str(self.last_open_time), prepare_market_data_documents_for_mongo(df, self.symbol, interval)
+
+class LiveMarketStream:
+    """
+    심볼별 증분 지표 상태를 메모리에 두고, kline 마감 이벤트마다 해당 심볼의 market_data.<SYM>만 갱신하는 실시간 실행기.
+    시작 시 lookback 구간 캔들로 상태를 채우고, 재연결하거나 캔들 사이가 비면 누락 구간을 API로 가져와 먼저 반영합니다.
+    """
+
+    def __init__(self, binance_client, symbols, interval, source, lookback_days=LOOKBACK_DAYS, layout=None,
+                 warm_up_max_candles=LIVE_WARM_UP_MAX_CANDLES, clock=time.time, sleep=time.sleep):
+        self.binance_client = binance_client
+        self.symbols = list(dict.fromkeys(symbols))
+        self.interval = interval
+        self.interval_ms = interval_to_milliseconds(interval)
+        self.source = source
+        self.lookback_days = lookback_days
+        self.warm_up_max_candles = warm_up_max_candles
+        self.layout = layout or MARKET_STORAGE_LAYOUT
+        if self.layout not in MARKET_STORAGE_LAYOUTS:
+            raise ValueError(f"알 수 없는 저장 방식입니다: {self.layout} (사용 가능: {', '.join(MARKET_STORAGE_LAYOUTS)})")
+        if self.interval_ms != DAY_MS and self.layout != 'series':
+            print(f"{interval} 캔들 지표는 daily_market에 저장하지 않고 market_series에만 저장합니다.")
+            self.layout = 'series'
+        self.clock = clock
+        self.sleep = sleep
+        self.states = {}
+        self.stopped = False
+
+    def _now_ms(self):
+        return int(self.clock() * 1000)
+
+    # open_time_ms: 문서가 가리키는 캔들의 시작 시각. market_series는 캔들마다 문서 하나
+    def _write(self, date_str, symbol, document, open_time_ms):
+        if self.layout in ('daily', 'both'):
+            upsert_daily_market_document(date_str, market_data={symbol: document})
+        if self.layout in ('series', 'both'):
+            bulk_upsert_market_series_documents([{"date": date_str, "market_data": {symbol: document},
+                                                  "open_times": {symbol: open_time_ms}}], self.interval)
+
+    # 캔들을 순서대로 반영. every_date면 날짜가 바뀌기 전 마지막 캔들마다, 아니면 마지막 캔들만 저장
+    def _apply_candles(self, state, candles, every_date=True):
+        for i, candle in enumerate(candles):
+            state.apply(candle)
+            is_last = i == len(candles) - 1
+            if is_last or (every_date and candles[i + 1]['open_time'] // DAY_MS != candle['open_time'] // DAY_MS):
+                self._write_state(state)
+
+    def _write_state(self, state):
+        date_str, document = state.document(self.interval)
+        self._write(date_str, state.symbol, document, state.last_open_time)
+        return date_str
+
+    # [start_ms, end_ms] 구간에서 이미 마감된 캔들만 가져옴
+    def _fetch_closed_candles(self, symbol, start_ms, end_ms):
+        now_ms = self._now_ms()
+        arr = fetch_klines_array(self.binance_client, symbol, self.interval, start_ms, end_ms)
+        return [c for c in klines_array_to_candles(arr) if c['close_time'] < now_ms]
+
+    # end_ms 시점의 마지막 마감 캔들 날짜 기준 lookback 시작 시각 (slice_daily_row의 조회 구간 시작과 같음)
+    # 분봉처럼 lookback 구간 캔들이 warm_up_max_candles보다 많으면 최근 warm_up_max_candles개만 가져옴
+    def _lookback_start_ms(self, end_ms):
+        last_open_ms = end_ms - end_ms % self.interval_ms - self.interval_ms
+        lookback_start_ms = last_open_ms - last_open_ms % DAY_MS - self.lookback_days * DAY_MS
+        return max(lookback_start_ms, last_open_ms - (self.warm_up_max_candles - 1) * self.interval_ms)
+
+    # 과거 lookback 구간 캔들로 심볼별 상태를 채우고 마지막 마감 캔들을 저장
+    def warm_up(self):
+        now_ms = self._now_ms()
+        start_ms = self._lookback_start_ms(now_ms)
+        for symbol in self.symbols:
+            state = LiveSymbolState(symbol, self.lookback_days)
+            candles = self._fetch_closed_candles(symbol, start_ms, now_ms)
+            if candles:
+                with metrics.span("live_warm_up", symbol=symbol):
+                    self._apply_candles(state, candles, every_date=False)
+            self.states[symbol] = state
+            print(f"{symbol} 실시간 상태 준비: 캔들 {len(candles)}개")
+
+    # 마지막으로 반영한 캔들 다음부터 end_ms까지 누락된 캔들을 가져와 반영. 반환값: 반영한 캔들 수
+    def backfill(self, symbol, end_ms=None):
+        state = self.states[symbol]
+        end_ms = self._now_ms() if end_ms is None else end_ms
+        if state.last_open_time is None:
+            start_ms = self._lookback_start_ms(end_ms)
+        else:
+            start_ms = state.last_open_time + self.interval_ms
+        if start_ms > end_ms:
+            return 0
+        candles = [c for c in self._fetch_closed_candles(symbol, start_ms, end_ms)
+                   if state.last_open_time is None or c['open_time'] > state.last_open_time]
+        if candles:
+            with metrics.span("live_backfill", symbol=symbol):
+                self._apply_candles(state, candles, every_date=True)
+            metrics.count("live_backfill_candles_total", value=len(candles), symbol=symbol)
+            print(f"{symbol} 누락 캔들 {len(candles)}개 보충 ({_ms_to_date_str(candles[0]['open_time'])} ~ {_ms_to_date_str(candles[-1]['open_time'])})")
+        return len(candles)
+
+    def backfill_all(self):
+        return {symbol: self.backfill(symbol) for symbol in self.symbols}
+
+    # 스트림 메시지 하나를 처리. 마감 캔들을 반영해 저장했으면 날짜 문자열, 아니면 None
+    def handle_message(self, message):
+        parsed = parse_kline_message(message)
+        if parsed is None:
+            return None
+        symbol, interval, candle, closed = parsed
+        state = self.states.get(symbol)
+        if state is None or not closed or (interval is not None and interval != self.interval):
+            return None
+        if state.last_open_time is not None and candle['open_time'] <= state.last_open_time:
+            # 재연결 직후 다시 받은 캔들 등 이미 반영한 캔들
+            metrics.count("live_klines_total", result="duplicate")
+            return None
+        if state.last_open_time is None or candle['open_time'] > state.last_open_time + self.interval_ms:
+            self.backfill(symbol, candle['open_time'] - 1)
+
+        started = time.perf_counter()
+        with metrics.span("live_update", symbol=symbol):
+            state.apply(candle)
+            date_str = self._write_state(state)
+        metrics.count("live_klines_total", result="applied")
+        print(f"{symbol} {pd.Timestamp(candle['open_time'], unit='ms')} 캔들 마감 반영 → {date_str} ({(time.perf_counter() - started) * 1000:.1f}ms)")
+        return date_str
+
+    def stop(self):
+        self.stopped = True
+
+    # 이벤트 소스가 끝나거나 stop()이 호출될 때까지 실행
+    # 연결이 끊기면 대기 후 다시 연결하고, 다시 연결할 때마다 끊긴 동안의 캔들을 먼저 보충
+    # max_reconnects: 연속 재연결 실패 허용 횟수 (None이면 무제한)
+    def run(self, max_reconnects=None):
+        if not self.states:
+            self.warm_up()
+        failures = 0
+        reconnecting = False
+        while not self.stopped:
+            try:
+                if reconnecting:
+                    self.backfill_all()
+                for message in self.source.events(self.symbols, self.interval):
+                    failures = 0
+                    self.handle_message(message)
+                    if self.stopped:
+                        break
+                else:
+                    print("이벤트 소스가 끝났습니다. 실시간 모드를 종료합니다.")
+                return
+            except OSError as e:
+                failures += 1
+                if max_reconnects is not None and failures > max_reconnects:
+                    raise
+                delay = min(LIVE_RECONNECT_MAX_SECONDS, LIVE_RECONNECT_BASE_SECONDS * 2 ** (failures - 1))
+                metrics.count("live_reconnects_total")
+                print(f"스트림 연결 끊김: {e} → {delay:.0f}초 후 다시 연결 ({failures}회째)")
+                self.sleep(delay)
+                reconnecting = True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="kline 스트림 기반 실시간 시장 데이터 갱신")
+    parser.add_argument('--symbols', default=",".join(LIVE_SYMBOLS))
+    parser.add_argument('--interval', default=LIVE_INTERVAL)
+    parser.add_argument('--url', default=LIVE_STREAM_URL, help="Binance 또는 로컬 재생 서버 주소")
+    parser.add_argument('--file', help="스트림 대신 재생할 메시지 파일 (한 줄에 JSON 하나)")
+    parser.add_argument('--serve-replay', metavar='FILE', help="메시지 파일을 재생하는 로컬 서버만 실행")
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.serve_replay:
+        serve_kline_replay(args.serve_replay, port=args.port)
+    else:
+        source = FileKlineSource(args.file) if args.file else WebSocketKlineSource(args.url)
+        binance_client = Client(common.api_key, common.api_secret)
+        serve_metrics_from_env()
+        ensure_market_indexes()
+        LiveMarketStream(binance_client, args.symbols.split(","), args.interval, source).run()
@@ -0,0 +1,134 @@
+import asyncio
+import random
+import threading
+from instrumentation import metrics
+
+# 동시에 진행할 LLM 요청 수 기본값
+LLM_MAX_CONCURRENCY = 8
+# 프롬프트 토큰 수 추정용 (한글이 섞인 프롬프트 기준으로 보수적으로 글자 2개당 토큰 1개)
+CHARS_PER_TOKEN = 2
+
+def estimate_prompt_tokens(prompt):
+    return len(prompt) // CHARS_PER_TOKEN + 1
+
+class OpenAIBackend:
+    """
+    openai.AsyncOpenAI 클라이언트 하나로 모든 요청을 보내는 백엔드 (HTTP 연결 풀을 공유).
+    complete는 (응답 텍스트, 입력 토큰 수, 출력 토큰 수)를 반환합니다 (사용량을 모르면 토큰 수는 None).
+    """
+
+    def __init__(self, api_key):
+        import openai # import에 시간이 오래 걸려 OpenAI 백엔드를 만들 때만 불러옴
+        self.client = openai.AsyncOpenAI(api_key=api_key)
+
+    async def complete(self, prompt, model, temperature, max_tokens):
+        response = await self.client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        usage = getattr(response, 'usage', None)
+        return ((response.choices[0].message.content or "").strip(),
+                getattr(usage, 'prompt_tokens', None), getattr(usage, 'completion_tokens', None))
+
+    async def close(self):
+        await self.client.close()
+
+class StubLLMBackend:
+    """
+    API를 호출하지 않는 로컬 백엔드. latency_seconds(± jitter)만큼 기다린 뒤 고정된 형식의 답을 돌려주므로
+    네트워크 없이 동시 처리량과 제한기 동작을 확인할 때 사용합니다.
+    """
+
+    def __init__(self, latency_seconds=0.5, jitter_seconds=0.0, completion_tokens=200):
+        self.latency_seconds = latency_seconds
+        self.jitter_seconds = jitter_seconds
+        self.completion_tokens = completion_tokens
+        self.calls = 0
+
+    async def complete(self, prompt, model, temperature, max_tokens):
+        self.calls += 1
+        await asyncio.sleep(max(0.0, self.latency_seconds + random.uniform(-self.jitter_seconds, self.jitter_seconds)))
+        return f"[stub {model}] {prompt[:40]}", estimate_prompt_tokens(prompt), min(self.completion_tokens, max_tokens)
+
+    async def close(self):
+        pass
+
+class AsyncLLMClient:
+    """
+    여러 프롬프트를 동시에 보내는 공용 LLM 클라이언트.
+    전용 스레드의 이벤트 루프 하나에서 모든 요청을 처리하므로 백엔드의 연결 풀이 호출 사이에 유지되고,
+    동기 코드(파이프라인 단계 스레드 등)에서는 complete_many로 결과를 기다리면 됩니다.
+    동시 요청 수는 max_concurrency, 속도는 request_limiter(요청 수)와 token_limiter(분당 토큰)로 제한합니다.
+    둘 다 rate_limiter.TokenBucket이며 reserve로 기다릴 시간만 받아 asyncio.sleep 하므로 루프를 막지 않습니다.
+    """
+
+    def __init__(self, backend, max_concurrency=LLM_MAX_CONCURRENCY, request_limiter=None, token_limiter=None):
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.request_limiter = request_limiter
+        self.token_limiter = token_limiter
+        self._loop = None
+        self._thread = None
+        self._semaphore = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                self._thread = threading.Thread(target=self._loop.run_forever, name="llm-client-loop", daemon=True)
+                self._thread.start()
+        return self._loop
+
+    async def _wait(self, limiter, tokens):
+        if limiter is not None:
+            delay = limiter.reserve(tokens)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    async def complete(self, prompt, model, temperature, max_tokens):
+        """프롬프트 하나를 요청합니다. 실패하면 예외를 그대로 올립니다."""
+        # 응답 길이를 알 수 없으므로 max_tokens까지 쓴다고 보고 차감한 뒤, 실제 사용량을 알면 남은 만큼 돌려줌
+        reserved_tokens = estimate_prompt_tokens(prompt) + max_tokens
+        async with self._semaphore:
+            await self._wait(self.request_limiter, 1)
+            await self._wait(self.token_limiter, reserved_tokens)
+            try:
+                with metrics.span("llm_request", model=model):
+                    text, prompt_tokens, completion_tokens = await self.backend.complete(prompt, model, temperature, max_tokens)
+            except Exception:
+                metrics.count("llm_requests_total", model=model, status="error")
+                raise
+        metrics.count("llm_requests_total", model=model, status="ok")
+        metrics.count("llm_prompt_tokens_total", prompt_tokens or 0, model=model)
+        metrics.count("llm_completion_tokens_total", completion_tokens or 0, model=model)
+        if self.token_limiter is not None and prompt_tokens is not None and completion_tokens is not None:
+            used_tokens = prompt_tokens + completion_tokens
+            if used_tokens < reserved_tokens:
+                self.token_limiter.release(reserved_tokens - used_tokens)
+        return text
+
+    async def _complete_all(self, prompts, model, temperature, max_tokens):
+        return await asyncio.gather(
+            *(self.complete(prompt, model, temperature, max_tokens) for prompt in prompts),
+            return_exceptions=True
+        )
+
+    def complete_many(self, prompts, model, temperature, max_tokens):
+        """프롬프트들을 동시에 요청하고 입력 순서대로 결과를 반환합니다. 실패한 항목은 예외 객체가 들어갑니다."""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self._complete_all(list(prompts), model, temperature, max_tokens), loop)
+        return future.result()
+
+    def close(self):
+        with self._start_lock:
+            if self._loop is None:
+                return
+            asyncio.run_coroutine_threadsafe(self.backend.close(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
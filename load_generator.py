@@ -0,0 +1,365 @@
+import os
+import math
+import time
+import random
+import argparse
+import datetime
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+from db_indexes import ensure_agent_indexes
+from columnar_codec import encode_columnar
+from db_dummy import (
+    DEPARTMENTS, clear_database, create_strategy_cases_checklist, create_memory_guideline, create_market_snapshot,
+    create_portfolio_snapshot, create_decision, create_executions_data, create_trade_memory, create_episode_trades_data,
+    create_metrics, create_feedback, create_strategy_update_agent_config, create_memory_guideline_update_agent_config
+)
+
+# db_dummy 스키마로 central_memory/snapshots/episodes 컬렉션에 대량의 합성 문서를 넣는 부하 생성기
+LOAD_MONGO_URI = os.getenv('LOAD_MONGO_URI', os.getenv('MONGO_URI', 'mongodb://localhost:27017/'))
+LOAD_DB_NAME = os.getenv('LOAD_DB_NAME', 'crypto_agent_db')
+LOAD_BATCH_SIZE = int(os.getenv('LOAD_BATCH_SIZE', 1000)) # insert_many 한 번에 넣는 문서 수
+LOAD_WORKERS = int(os.getenv('LOAD_WORKERS', os.cpu_count() or 1))
+# 작업 프로세스마다 MongoClient를 새로 만들어야 하므로 fork 대신 spawn
+LOAD_START_METHOD = os.getenv('LOAD_START_METHOD', 'spawn')
+
+# 심볼별 (시작 가격, 일간 변동성, 일 거래량 중앙값)
+LOAD_MARKET_SYMBOLS = {
+    "BTCUSDT": (30000.0, 0.035, 35000.0),
+    "ETHUSDT": (2000.0, 0.045, 18000.0),
+}
+SNAPSHOT_TYPES_PER_EPISODE = 7 # market, portfolio, decision, trade_memory x3, executions
+EPISODE_TYPES_PER_EPISODE = 5 # metrics, feedback, 에이전트 설정 x2, trades_data
+CENTRAL_MEMORY_TYPES_PER_DAY = 2 # strategy_cases_checklist, memory_guideline (부서/종류마다 현재 문서 하나를 날짜마다 덮어씀)
+DUPLICATE_KEY_ERROR = 11000
+
+# 부서 수만큼 부서 이름을 만듦. 기본 5개 부서를 넘으면 'Trend_Analyst_1'처럼 번호를 붙임
+def department_names(count):
+    return [DEPARTMENTS[i] if i < len(DEPARTMENTS) else f"{DEPARTMENTS[i % len(DEPARTMENTS)]}_{i // len(DEPARTMENTS)}"
+            for i in range(count)]
+
+def estimate_document_count(departments, days, loops_per_day, episodes_per_loop):
+    per_episode = SNAPSHOT_TYPES_PER_EPISODE + EPISODE_TYPES_PER_EPISODE
+    return departments * days * (CENTRAL_MEMORY_TYPES_PER_DAY + loops_per_day * episodes_per_loop * per_episode)
+
+# 모든 부서가 같은 시장을 보도록 날짜별 종가를 로그 정규 랜덤 워크로 한 번만 만듦 {symbol: [가격]}
+def market_price_paths(days, seed=0):
+    rng = np.random.default_rng(seed)
+    paths = {}
+    for symbol, (start_price, daily_vol, _) in LOAD_MARKET_SYMBOLS.items():
+        returns = rng.normal(-0.5 * daily_vol ** 2, daily_vol, days)
+        paths[symbol] = (start_price * np.exp(np.cumsum(returns))).round(2).tolist()
+    return paths
+
+def _qty(rng, price, notional_usd):
+    # 주문 금액이 notional_usd 근처의 로그 정규 분포가 되도록 수량을 만듦
+    return round(rng.lognormvariate(math.log(notional_usd / price), 0.7), 4)
+
+# ---- 문서 생성 (db_dummy의 create_* 함수로 스키마를 만들고 값만 분포에 맞게 바꿈) ----
+
+def _market_snapshot(rng, date_str, prices):
+    doc = create_market_snapshot(date_str, rng)
+    doc["symbols"] = {
+        symbol: {
+            "p": round(price * (1 + rng.gauss(0, 0.002)), 2),
+            "v": round(rng.lognormvariate(math.log(LOAD_MARKET_SYMBOLS[symbol][2]), 0.5), 1),
+            "rsi14": round(min(100.0, max(0.0, rng.gauss(50, 12))), 1),
+            "macd": round(rng.gauss(0, price * 0.003), 2),
+        }
+        for symbol, price in prices.items()
+    }
+    return doc
+
+def _portfolio_snapshot(rng, prices):
+    doc = create_portfolio_snapshot()
+    doc["cash"] = round(rng.lognormvariate(math.log(20000), 0.6), 2)
+    doc["positions"] = {
+        symbol: {
+            "side": rng.choice(["long", "short"]),
+            "qty": _qty(rng, price, 7500),
+            "avg_entry": round(price * (1 + rng.gauss(0, 0.02)), 2),
+            "leverage": rng.choice([1, 2, 3, 5, 10]),
+        }
+        for symbol, price in prices.items() if rng.random() < 0.6
+    }
+    return doc
+
+def _decision(rng, dept, strategy_id, prices):
+    doc = create_decision(dept, strategy_id, rng)
+    symbol = rng.choice(list(prices))
+    position_side = rng.choice(["long", "short"])
+    doc.update({
+        "symbol": symbol,
+        "position_side": position_side,
+        "side": "buy" if position_side == "long" else "sell",
+        "qty": _qty(rng, prices[symbol], 3000),
+        "price": round(prices[symbol] * (1 + rng.gauss(0, 0.003)), 2),
+        "leverage": rng.choice([1, 2, 3, 5, 10]),
+        "risk_reward": round(rng.lognormvariate(math.log(2.0), 0.4), 2),
+        "checklist_pass_rate": round(rng.betavariate(5, 2), 2),
+        "expected_drawdown_pct": round(rng.expovariate(1 / 1.5), 2),
+    })
+    return doc
+
+def _executions(rng, date_str, prices):
+    template = create_executions_data()[0]
+    day_start = datetime.datetime.strptime(date_str, "%Y-%m-%d")
+    executions = []
+    for _ in range(rng.randint(0, 4)):
+        symbol = rng.choice(list(prices))
+        price = round(prices[symbol] * (1 + rng.gauss(0, 0.003)), 2)
+        qty = _qty(rng, price, 3000)
+        executions.append({
+            **template,
+            "ts": day_start + datetime.timedelta(seconds=rng.uniform(0, 86400)),
+            "order_id": f"o-{rng.getrandbits(32):08x}",
+            "exec_id": f"e-{rng.getrandbits(32):08x}",
+            "symbol": symbol,
+            "side": rng.choice(["buy", "sell"]),
+            "price": price,
+            "qty": qty,
+            "fee": round(price * qty * 0.0004, 4),
+            "realized_pnl": round(rng.gauss(0, 40), 2),
+        })
+    return executions
+
+def _episode_trades(rng, trade_template, date_str, loop, episode, prices, max_trades):
+    day_start = datetime.datetime.strptime(date_str, "%Y-%m-%d")
+    trades = []
+    cum_realized_pnl = 0.0
+    for _ in range(rng.randint(1, max_trades)):
+        symbol = rng.choice(list(prices))
+        price = round(prices[symbol] * (1 + rng.gauss(0, 0.003)), 2)
+        qty = _qty(rng, price, 3000)
+        realized_pnl = round(rng.gauss(0, 40), 2)
+        cum_realized_pnl += realized_pnl
+        ts = day_start + datetime.timedelta(seconds=rng.uniform(0, 86400))
+        trades.append({
+            **trade_template,
+            "ts": ts,
+            "symbol": symbol,
+            "side": rng.choice(["buy", "sell"]),
+            "price": price,
+            "qty": qty,
+            "notional_usd": round(price * qty, 2),
+            "fee": round(price * qty * 0.0004, 4),
+            "realized_pnl": realized_pnl,
+            "cum_realized_pnl": round(cum_realized_pnl, 2),
+            "slippage_pct": round(abs(rng.gauss(0, 0.02)), 4),
+            "decision_ts": ts - datetime.timedelta(seconds=rng.expovariate(1 / 30)),
+            "loop": loop,
+            "episode": episode,
+        })
+    return trades
+
+def _metrics(rng, loop, episode):
+    doc = create_metrics(loop, episode, rng)
+    doc.update({
+        "total_realized_pnl": round(rng.gauss(0, 150), 2),
+        "win_rate": round(rng.betavariate(12, 10), 2),
+        "sharpe_ratio": round(rng.gauss(0.8, 0.7), 2),
+    })
+    return doc
+
+# 부서 하나의 날짜 하나에 해당하는 {컬렉션: [문서]}를 만듦
+# columnar가 True이면 trades_data / executions_data를 컬럼형으로 인코딩
+def generate_department_day(rng, dept, date_str, day_index, loops_per_day, episodes_per_loop, prices, max_trades, trade_template,
+                            columnar=False):
+    encode = encode_columnar if columnar else (lambda records: records)
+    strategy_doc = create_strategy_cases_checklist(dept, date_str)
+    guideline_doc = create_memory_guideline(dept, date_str)
+    documents = {
+        "central_memory": [
+            {"dept": dept, "type": "strategy_cases_checklist", "date": date_str, **strategy_doc},
+            {"dept": dept, "type": "memory_guideline", "date": date_str, **guideline_doc},
+        ],
+        "snapshots": [],
+        "episodes": [],
+    }
+    strategy_id = strategy_doc["cases"][0]["id"]
+    for l in range(loops_per_day):
+        loop = day_index * loops_per_day + l + 1
+        for episode in range(1, episodes_per_loop + 1):
+            snapshot_meta = {"dept": dept, "date": date_str, "loop": loop, "episode": episode}
+            snapshot_docs = {
+                "market": _market_snapshot(rng, date_str, prices),
+                "portfolio": _portfolio_snapshot(rng, prices),
+                "decision": _decision(rng, dept, strategy_id, prices),
+                "trade_memory_short": create_trade_memory("short"),
+                "trade_memory_mid": create_trade_memory("mid"),
+                "trade_memory_long": create_trade_memory("long"),
+            }
+            for doc_type, doc_data in snapshot_docs.items():
+                documents["snapshots"].append({"type": doc_type, **doc_data, **snapshot_meta})
+            documents["snapshots"].append({**snapshot_meta, "type": "executions",
+                                           "executions_data": encode(_executions(rng, date_str, prices))})
+
+            episode_meta = {"dept": dept, "loop": loop, "episode": episode}
+            episode_docs = {
+                "metrics": _metrics(rng, loop, episode),
+                "feedback": create_feedback(loop, episode, rng),
+                "strategy_update_agent_config": create_strategy_update_agent_config(date_str),
+                "memory_guideline_update_agent_config": create_memory_guideline_update_agent_config(date_str),
+            }
+            for doc_type, doc_data in episode_docs.items():
+                documents["episodes"].append({"type": doc_type, **doc_data, **episode_meta})
+            documents["episodes"].append({**episode_meta, "type": "trades_data", "trades_data":
+                                          encode(_episode_trades(rng, trade_template, date_str, loop, episode, prices, max_trades))})
+    return documents
+
+# central_memory는 insert_central_memory처럼 (dept, type)마다 현재 문서 하나를 upsert로 덮어씀
+# 작업 프로세스가 날짜 순서와 무관하게 실행되므로 저장된 문서보다 날짜가 늦을 때만 덮어씀
+# (더 최근 문서가 있으면 upsert가 unique 인덱스에 걸려 건너뜀)
+def central_memory_upsert(doc):
+    return UpdateOne({"dept": doc["dept"], "type": doc["type"], "date": {"$not": {"$gte": doc["date"]}}},
+                     {"$set": doc}, upsert=True)
+
+# ---- 작업 프로세스 ----
+_worker_db = None
+_worker_batch_size = LOAD_BATCH_SIZE
+_worker_trade_template = None
+
+def _init_worker(mongo_uri, db_name, batch_size):
+    global _worker_db, _worker_batch_size, _worker_trade_template
+    _worker_db = MongoClient(mongo_uri)[db_name]
+    _worker_batch_size = batch_size
+    # 거래 문서 스키마는 DataFrame으로 한 번만 만들고 이후에는 값만 바꿔 복사
+    _worker_trade_template = create_episode_trades_data()[0]
+
+def _generate_unit(unit):
+    # unit: (부서, [(날짜 순번, 날짜)], loop 수, episode 수, {날짜 순번: {심볼: 가격}}, seed, 최대 거래 수, 컬럼형 여부)
+    # 반환값: ({컬렉션: 저장한 문서 수}, unique 인덱스에 걸려 건너뛴 문서 수, 소요 시간)
+    dept, days, loops_per_day, episodes_per_loop, day_prices, seed, max_trades, columnar = unit
+    started = time.perf_counter()
+    counts = {}
+    buffers = {}
+    duplicates = 0
+
+    def flush(collection_name):
+        nonlocal duplicates
+        docs = buffers.get(collection_name)
+        if docs:
+            try:
+                if collection_name == "central_memory":
+                    result = _worker_db[collection_name].bulk_write([central_memory_upsert(doc) for doc in docs], ordered=False)
+                    written = result.matched_count + result.upserted_count
+                else:
+                    _worker_db[collection_name].insert_many(docs, ordered=False)
+                    written = len(docs)
+            except BulkWriteError as e:
+                # 같은 seed로 다시 실행하면 unique 인덱스에 걸린 문서만 건너뛰고 나머지는 저장됨
+                if any(error.get("code") != DUPLICATE_KEY_ERROR for error in e.details.get("writeErrors", [])):
+                    raise
+                written = e.details["nInserted"] + e.details.get("nMatched", 0) + e.details.get("nUpserted", 0)
+                duplicates += len(docs) - written
+            counts[collection_name] = counts.get(collection_name, 0) + written
+            buffers[collection_name] = []
+
+    for day_index, date_str in days:
+        # 부서/날짜별 seed라 작업 프로세스 수나 작업 순서와 무관하게 같은 문서가 만들어짐
+        rng = random.Random(f"{seed}:{dept}:{date_str}")
+        documents = generate_department_day(rng, dept, date_str, day_index, loops_per_day, episodes_per_loop,
+                                            day_prices[day_index], max_trades, _worker_trade_template, columnar)
+        for collection_name, docs in documents.items():
+            buffers.setdefault(collection_name, []).extend(docs)
+            if len(buffers[collection_name]) >= _worker_batch_size:
+                flush(collection_name)
+    for collection_name in list(buffers):
+        flush(collection_name)
+    return counts, duplicates, time.perf_counter() - started
+
+# ---- 부모 프로세스 ----
+
+def _plan_units(departments, days, start_date, loops_per_day, episodes_per_loop, batch_size, seed, max_trades, columnar=False):
+    start = datetime.datetime.strptime(start_date, "%Y-%m-%d").date()
+    dates = [(i, (start + datetime.timedelta(days=i)).strftime("%Y-%m-%d")) for i in range(days)]
+    paths = market_price_paths(days, seed)
+    per_day = estimate_document_count(1, 1, loops_per_day, episodes_per_loop)
+    # 작업 하나가 insert_many 배치를 여러 번 채울 만큼의 날짜를 맡도록 묶음
+    days_per_unit = max(1, math.ceil(batch_size / per_day))
+    units = []
+    for dept in department_names(departments):
+        for i in range(0, len(dates), days_per_unit):
+            chunk = dates[i:i + days_per_unit]
+            day_prices = {day_index: {symbol: path[day_index] for symbol, path in paths.items()} for day_index, _ in chunk}
+            units.append((dept, chunk, loops_per_day, episodes_per_loop, day_prices, seed, max_trades, columnar))
+    return units
+
+# 부서 × 날짜 × loop × episode 합성 문서를 여러 프로세스에서 순서 없는 일괄 삽입으로 넣고 초당 문서 수를 보고
+# drop=True일 때만 기존 데이터를 지움. workers가 1 이하이면 현재 프로세스에서 실행
+def run_load_generation(departments=len(DEPARTMENTS), days=30, loops_per_day=4, episodes_per_loop=5, start_date="2025-01-01",
+                        workers=LOAD_WORKERS, batch_size=LOAD_BATCH_SIZE, seed=0, max_trades=8,
+                        mongo_uri=LOAD_MONGO_URI, db_name=LOAD_DB_NAME, drop=False, columnar=False):
+    db = MongoClient(mongo_uri)[db_name]
+    if drop:
+        clear_database(db)
+    ensure_agent_indexes(db)
+    units = _plan_units(departments, days, start_date, loops_per_day, episodes_per_loop, batch_size, seed, max_trades, columnar)
+    expected = estimate_document_count(departments, days, loops_per_day, episodes_per_loop)
+    print(f"부하 생성 시작: 부서 {departments}개 × {days}일 × loop {loops_per_day}개 × episode {episodes_per_loop}개 "
+          f"= 문서 약 {expected:,}개, 작업 {len(units)}개, 프로세스 {workers}개")
+
+    counts = {}
+    started = time.perf_counter()
+    done = 0
+    duplicates = 0
+
+    def collect(unit_counts, unit_duplicates):
+        nonlocal done, duplicates
+        duplicates += unit_duplicates
+        for collection_name, count in unit_counts.items():
+            counts[collection_name] = counts.get(collection_name, 0) + count
+        done += 1
+        if done % max(1, len(units) // 10) == 0 or done == len(units):
+            total = sum(counts.values())
+            elapsed = time.perf_counter() - started
+            print(f"  {done}/{len(units)} 작업 완료: 문서 {total:,}개, {total / max(elapsed, 1e-9):,.0f} docs/s")
+
+    if workers <= 1:
+        _init_worker(mongo_uri, db_name, batch_size)
+        for unit in units:
+            collect(*_generate_unit(unit)[:2])
+    else:
+        context = multiprocessing.get_context(LOAD_START_METHOD)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(mongo_uri, db_name, batch_size)) as executor:
+            futures = [executor.submit(_generate_unit, unit) for unit in units]
+            for future in as_completed(futures):
+                collect(*future.result()[:2])
+
+    seconds = time.perf_counter() - started
+    total = sum(counts.values())
+    report = {
+        "documents": total,
+        "seconds": round(seconds, 3),
+        "docs_per_second": round(total / seconds, 1) if seconds > 0 else None,
+        "collections": counts,
+        "duplicates": duplicates,
+    }
+    print(f"부하 생성 완료: 문서 {total:,}개, {seconds:.1f}초, {report['docs_per_second']:,} docs/s")
+    for collection_name, count in sorted(counts.items()):
+        print(f"  {collection_name}: {count:,}개")
+    if duplicates:
+        print(f"  이미 있어 건너뛴 문서: {duplicates:,}개 (--drop으로 새로 시작 가능)")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="db_dummy 스키마 기반 합성 부하 생성기 (central_memory, snapshots, episodes)")
+    parser.add_argument('--departments', type=int, default=len(DEPARTMENTS))
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--loops', type=int, default=4, help="날짜당 loop 수")
+    parser.add_argument('--episodes', type=int, default=5, help="loop당 episode 수")
+    parser.add_argument('--start-date', default="2025-01-01")
+    parser.add_argument('--workers', type=int, default=LOAD_WORKERS)
+    parser.add_argument('--batch-size', type=int, default=LOAD_BATCH_SIZE)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-trades', type=int, default=8, help="episode당 최대 거래 수")
+    parser.add_argument('--mongo-uri', default=LOAD_MONGO_URI)
+    parser.add_argument('--db', default=LOAD_DB_NAME)
+    parser.add_argument('--drop', action='store_true', help="시작 전에 데이터베이스의 모든 컬렉션을 삭제")
+    parser.add_argument('--columnar', action='store_true', help="trades_data / executions_data를 컬럼형으로 저장")
+    args = parser.parse_args()
+    run_load_generation(args.departments, args.days, args.loops, args.episodes, args.start_date, args.workers,
+                        args.batch_size, args.seed, args.max_trades, args.mongo_uri, args.db, args.drop, args.columnar)
@@ -0,0 +1,228 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from pymongo import ASCENDING
+import common
+from common import CHART_DATA_COLUMNS
+from indicator_registry import INDICATOR_GROUPS
+import market_series
+from market_series import MARKET_STORAGE_LAYOUT, MARKET_STORAGE_LAYOUTS
+from instrumentation import metrics
+
+# 커서가 한 번에 가져오는 문서 수
+MARKET_READ_BATCH_SIZE = int(os.getenv('MARKET_READ_BATCH_SIZE', 500))
+# 최근 읽은 구간을 보관하는 프로세스 내 LRU 캐시 크기 (0이면 캐시 사용 안 함)
+MARKET_READER_CACHE_SIZE = int(os.getenv('MARKET_READER_CACHE_SIZE', 32))
+# 캐시 항목 유효 시간 (파이프라인이 같은 날짜를 다시 저장할 수 있으므로 오래 두지 않음)
+MARKET_READER_CACHE_TTL_SECONDS = float(os.getenv('MARKET_READER_CACHE_TTL_SECONDS', 300))
+
+# technical_indicators 안의 경로 (그룹, 하위 그룹 또는 None, 키)를 컬럼 이름으로 변환
+# 예: ("MA", None, "MA-5") → "MA-5", ("STOCH", "14-3-3", "STOCHk") → "STOCHk-14-3-3"
+def indicator_column_name(group, sub, key):
+    return key if sub is None else f"{key}-{sub}"
+
+def _check_groups(groups):
+    if groups is None:
+        return None
+    groups = tuple(g.upper() for g in groups)
+    unknown = [g for g in groups if g not in INDICATOR_GROUPS]
+    if unknown:
+        raise ValueError(f"알 수 없는 지표 그룹입니다: {', '.join(unknown)} (사용 가능: {', '.join(INDICATOR_GROUPS)})")
+    return groups
+
+def _market_projection(prefix, groups, include_chart):
+    # groups가 None이면 technical_indicators 전체, 아니면 그룹별 하위 경로만 읽음
+    projection = {}
+    if include_chart:
+        projection[f"{prefix}chart_data"] = 1
+    if groups is None:
+        projection[f"{prefix}technical_indicators"] = 1
+    else:
+        for group in groups:
+            projection[f"{prefix}technical_indicators.{group}"] = 1
+    return projection
+
+class _ColumnBuilder:
+    """문서를 한 행씩 받아 컬럼별 리스트에 바로 쌓는 변환기. 새 컬럼은 앞 행을 NaN으로 채워 시작합니다."""
+
+    def __init__(self, include_chart):
+        self.dates = []
+        self.symbols = []
+        self.columns = OrderedDict((name, []) for name in CHART_DATA_COLUMNS) if include_chart else OrderedDict()
+        self.group_columns = {}
+
+    def _append(self, name, value, row):
+        column = self.columns.get(name)
+        if column is None:
+            column = self.columns[name] = [np.nan] * row
+        column.append(value)
+
+    def add(self, date_str, symbol, symbol_data):
+        row = len(self.dates)
+        self.dates.append(date_str)
+        self.symbols.append(symbol)
+        chart_data = symbol_data.get("chart_data")
+        if chart_data:
+            for name in CHART_DATA_COLUMNS:
+                if name in chart_data:
+                    self._append(name, chart_data[name], row)
+        for group, values in (symbol_data.get("technical_indicators") or {}).items():
+            group_columns = self.group_columns.setdefault(group, [])
+            for key, value in values.items():
+                if isinstance(value, dict):
+                    for sub_key, sub_value in value.items():
+                        name = indicator_column_name(group, key, sub_key)
+                        if name not in self.columns:
+                            group_columns.append(name)
+                        self._append(name, sub_value, row)
+                else:
+                    name = indicator_column_name(group, None, key)
+                    if name not in self.columns:
+                        group_columns.append(name)
+                    self._append(name, value, row)
+        # 이 행에 없는 컬럼은 NaN
+        for column in self.columns.values():
+            if len(column) <= row:
+                column.append(np.nan)
+
+    def frame(self):
+        index = pd.MultiIndex.from_arrays([pd.to_datetime(self.dates), self.symbols], names=["date", "symbol"])
+        data = {name: np.asarray(values, dtype=np.float64) for name, values in self.columns.items()}
+        return pd.DataFrame(data, index=index, columns=list(self.columns))
+
+def _read_daily_layout(builder, symbols, start_date, end_date, groups, include_chart):
+    projection = {"_id": 0, "date": 1}
+    for symbol in symbols:
+        projection.update(_market_projection(f"market_data.{symbol}.", groups, include_chart))
+    metrics.count("mongo_round_trips_total", op="find")
+    cursor = common.daily_market_collection.find(
+        {"date": {"$gte": start_date, "$lte": end_date}}, projection
+    ).sort("date", ASCENDING).batch_size(MARKET_READ_BATCH_SIZE)
+    for doc in cursor:
+        market_data = doc.get("market_data") or {}
+        for symbol in sorted(symbols):
+            symbol_data = market_data.get(symbol)
+            if symbol_data:
+                builder.add(doc["date"], symbol, symbol_data)
+
+def _read_series_layout(builder, symbols, start_date, end_date, interval, groups, include_chart):
+    projection = {"_id": 0, "date": 1, "symbol": 1, **_market_projection("", groups, include_chart)}
+    metrics.count("mongo_round_trips_total", op="find")
+    # (interval, date, symbol) 인덱스 순서로 읽으므로 결과가 날짜, 심볼 순으로 정렬됨
+    cursor = market_series.market_series_collection.find(
+        {"interval": interval, "date": {"$gte": start_date, "$lte": end_date}, "symbol": {"$in": list(symbols)}},
+        projection
+    ).sort([("date", ASCENDING), ("symbol", ASCENDING)]).batch_size(MARKET_READ_BATCH_SIZE)
+    for doc in cursor:
+        builder.add(doc["date"], doc["symbol"], doc)
+
+class MarketReaderCache:
+    """
+    최근 읽은 (심볼, 날짜 구간, 지표 그룹) 결과 DataFrame을 보관하는 프로세스 내 LRU 캐시.
+    요청이 캐시된 항목의 심볼/날짜/그룹 안에 들어가면 DB를 다시 읽지 않고 잘라서 반환합니다.
+    max_entries를 넘으면 가장 오래 사용하지 않은 항목부터, ttl_seconds가 지난 항목은 조회 시 지웁니다.
+    """
+
+    def __init__(self, max_entries=MARKET_READER_CACHE_SIZE, ttl_seconds=MARKET_READER_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _covers(entry, symbols, start_date, end_date, groups, include_chart):
+        return (entry["start_date"] <= start_date and end_date <= entry["end_date"]
+                and set(symbols) <= entry["symbols"]
+                and (entry["groups"] is None or (groups is not None and set(groups) <= set(entry["groups"])))
+                and (entry["include_chart"] or not include_chart))
+
+    @staticmethod
+    def _slice(entry, symbols, start_date, end_date, groups, include_chart):
+        df = entry["frame"]
+        dates = df.index.get_level_values("date")
+        rows = ((dates >= pd.Timestamp(start_date)) & (dates <= pd.Timestamp(end_date))
+                & df.index.get_level_values("symbol").isin(list(symbols)))
+        if groups is None:
+            columns = [c for c in df.columns if include_chart or c not in CHART_DATA_COLUMNS]
+        else:
+            wanted = set(c for group in groups for c in entry["group_columns"].get(group, []))
+            columns = [c for c in df.columns if c in wanted or (include_chart and c in CHART_DATA_COLUMNS)]
+        df = df.loc[rows, columns]
+        # 잘라낸 구간에 값이 하나도 없는 지표 컬럼은 DB에서 바로 읽은 결과처럼 제외
+        empty = [c for c in df.columns if c not in CHART_DATA_COLUMNS and df[c].isna().all()]
+        return df.drop(columns=empty)
+
+    def get(self, layout, interval, symbols, start_date, end_date, groups, include_chart):
+        now = time.time()
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if self.ttl_seconds is not None and now - entry["created_at"] > self.ttl_seconds:
+                    del self._entries[key]
+                    continue
+                if key[:2] == (layout, interval) and self._covers(entry, symbols, start_date, end_date, groups, include_chart):
+                    self._entries.move_to_end(key)
+                    return self._slice(entry, symbols, start_date, end_date, groups, include_chart)
+        return None
+
+    def put(self, layout, interval, symbols, start_date, end_date, groups, include_chart, frame, group_columns):
+        if self.max_entries <= 0:
+            return
+        key = (layout, interval, tuple(sorted(symbols)), start_date, end_date, groups, include_chart)
+        with self._lock:
+            self._entries[key] = {
+                "symbols": set(symbols), "start_date": start_date, "end_date": end_date, "groups": groups,
+                "include_chart": include_chart, "frame": frame.copy(), "group_columns": group_columns,
+                "created_at": time.time(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+market_reader_cache = MarketReaderCache()
+
+# 심볼 목록, 날짜 구간, 지표 그룹으로 시장 데이터를 읽어 DataFrame으로 반환
+# index: (date, symbol), 컬럼: open/high/low/close/volume + 지표 (예: MA-5, RSI-14, STOCHk-14-3-3)
+# groups: ['MA', 'RSI'] 등 INDICATOR_GROUPS 이름 (None이면 전체). 고른 그룹만 Mongo projection으로 읽음
+# layout: 'daily'/'both'는 daily_market, 'series'는 market_series(interval 필요)에서 읽음 (기본 MARKET_STORAGE_LAYOUT)
+def read_market_frame(symbols, start_date, end_date, groups=None, interval=None, include_chart=True, layout=None, use_cache=True):
+    layout = layout or MARKET_STORAGE_LAYOUT
+    if layout not in MARKET_STORAGE_LAYOUTS:
+        raise ValueError(f"알 수 없는 저장 방식입니다: {layout} (사용 가능: {', '.join(MARKET_STORAGE_LAYOUTS)})")
+    if layout == 'series' and interval is None:
+        raise ValueError("series 저장 방식에서는 interval이 필요합니다.")
+    symbols = list(dict.fromkeys(symbols))
+    groups = _check_groups(groups)
+    interval = interval if layout == 'series' else None # daily_market 문서에는 interval 구분이 없음
+
+    if use_cache:
+        cached = market_reader_cache.get(layout, interval, symbols, start_date, end_date, groups, include_chart)
+        if cached is not None:
+            metrics.count("market_reader_cache_total", result="hit")
+            return cached
+        metrics.count("market_reader_cache_total", result="miss")
+
+    builder = _ColumnBuilder(include_chart)
+    with metrics.span("market_read", layout=layout):
+        if layout == 'series':
+            _read_series_layout(builder, symbols, start_date, end_date, interval, groups, include_chart)
+        else:
+            _read_daily_layout(builder, symbols, start_date, end_date, groups, include_chart)
+        df = builder.frame()
+    if use_cache:
+        market_reader_cache.put(layout, interval, symbols, start_date, end_date, groups, include_chart, df, builder.group_columns)
+    return df
+
+# 심볼 하나의 구간을 날짜 index DataFrame으로 반환
+def read_symbol_frame(symbol, start_date, end_date, groups=None, interval=None, include_chart=True, layout=None, use_cache=True):
+    df = read_market_frame([symbol], start_date, end_date, groups, interval, include_chart, layout, use_cache)
+    return df.droplevel("symbol")
+
+def clear_market_reader_cache():
+    market_reader_cache.clear()
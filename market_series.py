@@ -0,0 +1,190 @@
+import os
+from datetime import datetime, timedelta
+from pymongo import UpdateOne, ASCENDING
+import common
+from common import interval_to_milliseconds, bulk_upsert_daily_market_documents
+from instrumentation import metrics
+
+# 시장 데이터 저장 방식
+# 'daily': 날짜 문서 하나에 모든 심볼 (daily_market, 기존 방식)
+# 'series': (symbol, interval, open_time)마다 문서 하나 (market_series). 요약은 계속 daily_market에 저장
+# 'both': 두 방식 모두 저장 (이전 중 비교용)
+MARKET_STORAGE_LAYOUTS = ('daily', 'series', 'both')
+MARKET_STORAGE_LAYOUT = os.getenv('MARKET_STORAGE_LAYOUT', 'daily')
+MARKET_SERIES_BULK_BATCH_SIZE = 1000
+DAY_MS = 24 * 60 * 60 * 1000
+
+# 심볼/interval/캔들별 시장 데이터 컬렉션
+# MongoDB 네이티브 time-series 컬렉션은 upsert를 지원하지 않아 재실행 시 같은 캔들이 중복되므로,
+# 일반 컬렉션에 (symbol, interval, open_time) unique 복합 인덱스를 두고 daily_market처럼 $set upsert로 저장
+# common.db처럼 처음 사용할 때 만들고, market_series.market_series_collection = ... 으로 바꿔 끼울 수 있음
+MARKET_SERIES_COLLECTION = os.getenv('MARKET_SERIES_COLLECTION', 'market_series')
+
+def get_market_series_collection():
+    collection = globals().get('market_series_collection')
+    if collection is None:
+        collection = globals()['market_series_collection'] = common.get_db()[MARKET_SERIES_COLLECTION]
+    return collection
+
+def __getattr__(name):
+    if name == 'market_series_collection':
+        return get_market_series_collection()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# (인덱스 키, 옵션) 목록
+# 심볼 하나의 구간 조회는 첫 번째 인덱스, 날짜별 문서 재구성/이어서 실행 확인은 두 번째 인덱스 사용
+MARKET_SERIES_INDEXES = [
+    ([("symbol", ASCENDING), ("interval", ASCENDING), ("open_time", ASCENDING)], {"unique": True, "name": "symbol_interval_open_time"}),
+    ([("interval", ASCENDING), ("date", ASCENDING), ("symbol", ASCENDING)], {"name": "interval_date_symbol"}),
+]
+_indexes_ready = False
+
+def ensure_market_series_indexes():
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    for keys, options in MARKET_SERIES_INDEXES:
+        get_market_series_collection().create_index(keys, **options)
+    _indexes_ready = True
+
+# 날짜 문서의 시장 데이터가 가리키는 캔들 시작 시각 (UTC)
+# 날짜마다 캔들이 하나뿐인 일봉만 날짜로 정할 수 있음. 다른 주기는 캔들마다 open_time을 넘겨야 함 (open_times)
+def series_open_time(date_str, interval):
+    if interval_to_milliseconds(interval) != DAY_MS:
+        raise ValueError(f"{interval} 캔들은 날짜만으로 open_time을 정할 수 없습니다. 문서에 심볼별 open_times를 넣어 주세요.")
+    return datetime.strptime(date_str, '%Y-%m-%d')
+
+# open_time 값(datetime 또는 epoch ms)을 market_series에 저장하는 UTC datetime으로 변환
+def _series_open_time_value(open_time):
+    if isinstance(open_time, datetime):
+        return open_time
+    return datetime(1970, 1, 1) + timedelta(milliseconds=int(open_time))
+
+# 날짜 문서 목록(bulk_upsert_daily_market_documents와 같은 형태)의 시장 데이터를 심볼/캔들 문서로 저장
+# 문서에 "open_times": {심볼: 캔들 open_time}이 있으면 그 캔들로, 없으면 날짜로 정함 (일봉만 가능)
+# 반환값: {"matched": n, "upserted": n, "modified": n}
+def bulk_upsert_market_series_documents(documents, interval, batch_size=MARKET_SERIES_BULK_BATCH_SIZE):
+    ensure_market_series_indexes()
+    stats = {"matched": 0, "upserted": 0, "modified": 0}
+    operations = []
+
+    def flush():
+        if not operations:
+            return
+        metrics.count("mongo_round_trips_total", op="bulk_write")
+        with metrics.span("mongo_bulk_write", collection="market_series"):
+            result = get_market_series_collection().bulk_write(operations, ordered=False)
+        stats["matched"] += result.matched_count
+        stats["upserted"] += result.upserted_count
+        stats["modified"] += result.modified_count
+        operations.clear()
+
+    for document in documents:
+        market_data = document.get("market_data")
+        if not market_data:
+            continue
+        open_times = document.get("open_times") or {}
+        for symbol, symbol_data in market_data.items():
+            open_time = open_times.get(symbol)
+            open_time = series_open_time(document["date"], interval) if open_time is None else _series_open_time_value(open_time)
+            operations.append(UpdateOne(
+                {"symbol": symbol, "interval": interval, "open_time": open_time},
+                {"$set": {"date": document["date"], **symbol_data}},
+                upsert=True
+            ))
+            if len(operations) >= batch_size:
+                flush()
+    flush()
+    print(f"market_series 일괄 저장 완료: matched {stats['matched']}, upserted {stats['upserted']}, modified {stats['modified']}")
+    return stats
+
+# 파이프라인 저장 단계에서 사용하는 저장 함수. MARKET_STORAGE_LAYOUT에 따라 daily_market/market_series에 나눠 저장
+def write_market_documents(documents, interval, layout=None):
+    layout = layout or MARKET_STORAGE_LAYOUT
+    if layout not in MARKET_STORAGE_LAYOUTS:
+        raise ValueError(f"알 수 없는 저장 방식입니다: {layout} (사용 가능: {', '.join(MARKET_STORAGE_LAYOUTS)})")
+    documents = list(documents)
+    if layout in ('series', 'both'):
+        bulk_upsert_market_series_documents(documents, interval)
+    if layout == 'series':
+        # 날짜 문서에는 요약만 남김
+        documents = [{key: value for key, value in document.items() if key not in ("market_data", "open_times")} for document in documents]
+    bulk_upsert_daily_market_documents(documents)
+
+# 이어서 실행용: market_series에 없는 (심볼, 날짜) 목록 {symbol: [date_str]}
+def find_missing_market_series(date_strs, symbols, interval):
+    date_strs = list(date_strs)
+    metrics.count("mongo_round_trips_total", op="find")
+    stored = {
+        (doc["symbol"], doc["date"])
+        for doc in get_market_series_collection().find(
+            {"interval": interval, "date": {"$in": date_strs}, "symbol": {"$in": list(symbols)}},
+            {"_id": 0, "symbol": 1, "date": 1}
+        )
+    }
+    return {symbol: [date_str for date_str in date_strs if (symbol, date_str) not in stored] for symbol in symbols}
+
+def _series_projection(fields):
+    # fields: None이면 chart_data와 technical_indicators 전체, 아니면 ["chart_data", "technical_indicators.RSI", ...]
+    projection = {"_id": 0, "symbol": 1, "date": 1, "open_time": 1}
+    for field in (fields or ("chart_data", "technical_indicators")):
+        projection[field] = 1
+    return projection
+
+# 심볼 하나의 [start_date, end_date] 구간 문서를 open_time 순서로 반환 (해당 심볼 문서만 읽음)
+def read_symbol_series(symbol, interval, start_date, end_date, fields=None):
+    # (symbol, interval, open_time) 인덱스 구간 조회가 되도록 날짜를 open_time 범위로 바꿈
+    open_time_range = {
+        "$gte": datetime.strptime(start_date, '%Y-%m-%d'),
+        "$lt": datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1),
+    }
+    metrics.count("mongo_round_trips_total", op="find")
+    cursor = get_market_series_collection().find(
+        {"symbol": symbol, "interval": interval, "open_time": open_time_range},
+        _series_projection(fields)
+    ).sort("open_time", ASCENDING)
+    return list(cursor)
+
+# 호환 reader: market_series와 daily_market의 요약을 합쳐 기존 daily_market 문서 형태로 재구성
+# 반환값: [{"date", "market_data": {symbol: {"chart_data", "technical_indicators"}}, "community_summary", "macro_summary"}] (날짜 순)
+def read_daily_market_documents(start_date, end_date, interval, symbols=None, fields=None):
+    query = {"interval": interval, "date": {"$gte": start_date, "$lte": end_date}}
+    if symbols is not None:
+        query["symbol"] = {"$in": list(symbols)}
+    documents = {}
+    metrics.count("mongo_round_trips_total", op="find")
+    for doc in get_market_series_collection().find(query, _series_projection(fields)):
+        daily = documents.setdefault(doc["date"], {"date": doc["date"], "market_data": {}})
+        daily["market_data"][doc["symbol"]] = {key: value for key, value in doc.items() if key not in ("symbol", "date", "open_time")}
+
+    metrics.count("mongo_round_trips_total", op="find")
+    for summary in common.daily_market_collection.find(
+        {"date": {"$gte": start_date, "$lte": end_date}},
+        {"_id": 0, "date": 1, "community_summary": 1, "macro_summary": 1}
+    ):
+        daily = documents.setdefault(summary["date"], {"date": summary["date"], "market_data": {}})
+        daily.update({key: value for key, value in summary.items() if key != "date"})
+    return [documents[date_str] for date_str in sorted(documents)]
+
+def read_daily_market_document(date_str, interval, symbols=None, fields=None):
+    documents = read_daily_market_documents(date_str, date_str, interval, symbols, fields)
+    return documents[0] if documents else None
+
+# 기존 daily_market의 시장 데이터를 market_series로 옮겨 씀 (daily_market 문서는 그대로 둠)
+def migrate_daily_market_to_series(interval, start_date=None, end_date=None, batch_size=100):
+    query = {}
+    if start_date or end_date:
+        query["date"] = {key: value for key, value in (("$gte", start_date), ("$lte", end_date)) if value}
+    batch = []
+    migrated = 0
+    for document in common.daily_market_collection.find(query, {"_id": 0, "date": 1, "market_data": 1}).batch_size(batch_size):
+        batch.append(document)
+        if len(batch) >= batch_size:
+            bulk_upsert_market_series_documents(batch, interval)
+            migrated += len(batch)
+            batch = []
+    if batch:
+        bulk_upsert_market_series_documents(batch, interval)
+        migrated += len(batch)
+    print(f"daily_market {migrated}일 문서를 market_series로 옮김 ({interval})")
+    return migrated
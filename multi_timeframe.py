@@ -0,0 +1,168 @@
+import time
+import numpy as np
+import common
+from kline_cache import KLINE_DTYPE
+from common import (
+    fetch_klines_array, klines_array_to_frame, calculate_all_indicators, interval_to_milliseconds,
+    _parse_kline_range
+)
+
+# Binance 주봉은 월요일 00:00 UTC에 시작 (1970-01-01은 목요일이므로 첫 월요일은 4일 뒤)
+WEEK_ORIGIN_MS = 4 * 24 * 60 * 60 * 1000
+DEFAULT_BASE_INTERVAL = '1h'
+DEFAULT_TIMEFRAMES = ('4h', '1d', '1w')
+
+def _fixed_interval_ms(interval):
+    # 분/시간 봉과 1d, 1w만 고정 길이 버킷 (3d 등은 Binance 기준 시각이 달라 지원하지 않음)
+    unit, count = interval[-1], interval[:-1]
+    if unit in ('m', 'h') or interval in ('1d', '1w'):
+        return interval_to_milliseconds(interval)
+    if interval == '1M':
+        return None
+    raise ValueError(f"지원하지 않는 timeframe입니다: {interval} (분/시간 봉, 1d, 1w, 1M만 지원)")
+
+# open_time(ms, UTC)이 속한 상위 봉의 시작 시각
+def bucket_open_times(open_times, interval):
+    open_times = np.asarray(open_times, dtype=np.int64)
+    interval_ms = _fixed_interval_ms(interval)
+    if interval_ms is None:
+        return open_times.astype('datetime64[ms]').astype('datetime64[M]').astype('datetime64[ms]').astype(np.int64)
+    origin = WEEK_ORIGIN_MS if interval == '1w' else 0
+    return (open_times - origin) // interval_ms * interval_ms + origin
+
+# 상위 봉 시작 시각들의 마감 시각 (다음 봉 시작 - 1ms, Binance close_time과 같은 규칙)
+def bucket_close_times(bucket_starts, interval):
+    bucket_starts = np.asarray(bucket_starts, dtype=np.int64)
+    interval_ms = _fixed_interval_ms(interval)
+    if interval_ms is None:
+        months = bucket_starts.astype('datetime64[ms]').astype('datetime64[M]')
+        return (months + 1).astype('datetime64[ms]').astype(np.int64) - 1
+    return bucket_starts + interval_ms - 1
+
+# 시작 시각 ms 이후(포함) 첫 상위 봉 시작 시각
+def bucket_ceil(ms, interval):
+    start = int(bucket_open_times([ms], interval)[0])
+    return start if start == ms else int(bucket_close_times([start], interval)[0]) + 1
+
+def check_derivable(base_interval, interval):
+    base_ms = interval_to_milliseconds(base_interval)
+    target_ms = _fixed_interval_ms(interval)
+    unit_ms = target_ms if target_ms is not None else 24 * 60 * 60 * 1000 # 월봉은 하루 단위로 나뉘면 됨
+    if base_interval.endswith('M') or not base_ms or unit_ms % base_ms != 0 or (target_ms is not None and target_ms < base_ms):
+        raise ValueError(f"{base_interval} 캔들로 {interval} 캔들을 만들 수 없습니다.")
+
+# 기본 interval 캔들 배열(open_time 정렬)을 상위 interval로 묶음
+# 반환값: (KLINE_DTYPE 배열, 봉마다 마감 여부)
+# 마감 여부: 봉의 마지막 기본 캔들까지 마감되어 있는지 (진행 중인 봉은 False)
+# base_interval을 주면 기본 캔들 수가 봉 길이 / 기본 interval에 못 미치는 봉(일부 페이지 요청 실패 등)도 False
+def resample_klines(arr, interval, now_ms=None, base_interval=None):
+    if len(arr) == 0:
+        return np.empty(0, dtype=KLINE_DTYPE), np.empty(0, dtype=bool)
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    keys = bucket_open_times(arr['open_time'], interval)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(arr)] - 1
+
+    out = np.empty(len(starts), dtype=KLINE_DTYPE)
+    out['open_time'] = keys[starts]
+    out['close_time'] = bucket_close_times(out['open_time'], interval)
+    out['open'] = arr['open'][starts]
+    out['high'] = np.maximum.reduceat(arr['high'], starts)
+    out['low'] = np.minimum.reduceat(arr['low'], starts)
+    out['close'] = arr['close'][ends]
+    out['volume'] = np.add.reduceat(arr['volume'], starts)
+
+    closed_base = arr['close_time'][arr['close_time'] < now_ms]
+    last_closed = int(closed_base.max()) if len(closed_base) else -1
+    closed = out['close_time'] <= last_closed
+    if base_interval is not None:
+        expected = (out['close_time'] - out['open_time'] + 1) // interval_to_milliseconds(base_interval)
+        closed &= (ends - starts + 1) == expected
+    return out, closed
+
+class MultiTimeframeKlines:
+    """
+    기본 interval(예: 1h) 캔들 하나만 Binance에서 받아 상위 timeframe(4h, 1d, 1w, 1M 등) 캔들을 만드는 계층.
+    기본 캔들은 fetch_klines_array로 가져오므로 로컬 캔들 캐시의 앞/뒤 구간 채우기를 그대로 사용하고,
+    만든 상위 봉 중 마감된 봉은 캐시에 '{timeframe}@{base}' interval로 저장해 다음 호출에서는 이후 봉만 새로 묶습니다.
+    진행 중인 마지막 봉과 기본 캔들이 모자란 봉은 캐시에 저장하지 않고 매번 새로 계산합니다.
+    cache: None이면 common의 로컬 캔들 캐시(사용할 때 조회), False이면 캐시를 사용하지 않음
+    """
+
+    def __init__(self, binance_client, base_interval=DEFAULT_BASE_INTERVAL, cache=None):
+        self.binance_client = binance_client
+        self.base_interval = base_interval
+        self._cache = cache
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            return common.kline_cache
+        return self._cache or None
+
+    def _derived_key(self, interval):
+        return f"{interval}@{self.base_interval}"
+
+    def _derive(self, symbol, interval, base, start_ms, end_ms, now_ms):
+        aligned_start = bucket_ceil(start_ms, interval) # 요청 시작 전부터 걸친 봉은 일부만 있으므로 제외
+        cache = self.cache
+        if cache is None:
+            out, closed = resample_klines(base[base['open_time'] >= aligned_start], interval, now_ms)
+            return out[out['open_time'] <= end_ms]
+
+        key = self._derived_key(interval)
+        open_rows = []
+        for range_start, range_end in cache.missing_ranges(symbol, key, aligned_start, end_ms + 1):
+            # 빠진 구간에 걸친 봉 전체를 만들 수 있도록 기본 캔들을 봉 경계까지 포함
+            range_end = bucket_ceil(range_end, interval)
+            rows = base[(base['open_time'] >= range_start) & (base['open_time'] < range_end)]
+            out, closed = resample_klines(rows, interval, now_ms, self.base_interval)
+            # 기본 캔들이 통째로 빠져 봉 자체가 없는 곳도 끊긴 것으로 봄
+            closed &= out['open_time'] == np.r_[range_start, out['close_time'][:-1] + 1]
+            if closed.any():
+                # 마감되고 기본 캔들이 모두 있는 봉이 끊김 없이 이어진 곳까지만 확인된 구간으로 기록
+                # (중간에 빠진 봉이 있으면 그 뒤 봉도 다음 호출에서 다시 계산)
+                first_open = int(np.flatnonzero(~closed)[0]) if not closed.all() else len(out)
+                covered_to = int(out['close_time'][first_open - 1]) + 1 if first_open else range_start
+                stored = out[:first_open]
+                if not first_open or not cache.store(symbol, key, stored, range_start, covered_to):
+                    open_rows.append(stored)
+                open_rows.append(out[first_open:])
+            else:
+                open_rows.append(out)
+
+        cached = cache.read(symbol, key, aligned_start, end_ms + 1)
+        merged = np.concatenate([cached] + open_rows)
+        merged = merged[(merged['open_time'] >= aligned_start) & (merged['open_time'] <= end_ms)]
+        merged = merged[np.argsort(merged['open_time'], kind='stable')]
+        keep = np.ones(len(merged), dtype=bool)
+        keep[:-1] = merged['open_time'][1:] != merged['open_time'][:-1]
+        return merged[keep]
+
+    def fetch_arrays(self, symbol, start_str, end_str=None, timeframes=DEFAULT_TIMEFRAMES):
+        """timeframe별 KLINE_DTYPE 캔들 배열 {timeframe: 배열}을 반환합니다. 기본 interval도 요청할 수 있습니다."""
+        for interval in timeframes:
+            if interval != self.base_interval:
+                check_derivable(self.base_interval, interval)
+        time_range = _parse_kline_range(start_str, end_str)
+        if time_range is None:
+            return {interval: np.empty(0, dtype=KLINE_DTYPE) for interval in timeframes}
+        start_ms, end_ms = time_range
+        # 시작 시각이 걸친 상위 봉은 제외되므로 기본 캔들은 요청 구간만 받으면 됨
+        base = fetch_klines_array(self.binance_client, symbol, self.base_interval, start_ms, end_ms)
+        now_ms = int(time.time() * 1000)
+        print(f"{symbol} {self.base_interval} 기본 캔들 {len(base)}개로 {', '.join(timeframes)} 캔들 생성")
+        return {
+            interval: base if interval == self.base_interval else self._derive(symbol, interval, base, start_ms, end_ms, now_ms)
+            for interval in timeframes
+        }
+
+    def fetch_frames(self, symbol, start_str, end_str=None, timeframes=DEFAULT_TIMEFRAMES):
+        """fetch_historical_klines와 같은 형태의 DataFrame을 timeframe별로 반환합니다."""
+        return {interval: klines_array_to_frame(arr) for interval, arr in
+                self.fetch_arrays(symbol, start_str, end_str, timeframes).items()}
+
+    def calculate_indicators(self, symbol, start_str, end_str=None, timeframes=DEFAULT_TIMEFRAMES):
+        """timeframe별로 calculate_all_indicators를 적용한 DataFrame을 반환합니다."""
+        return {interval: calculate_all_indicators(df) for interval, df in
+                self.fetch_frames(symbol, start_str, end_str, timeframes).items()}
@@ -0,0 +1,183 @@
+import os
+import shutil
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+import time
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from kline_cache import KLINE_DTYPE
+from common import (
+    fetch_klines_array, klines_array_to_frame, calculate_all_indicators,
+    summarize_dates, _parse_kline_range, KLINE_FETCH_WORKERS, CHART_DATA_COLUMNS
+)
+from daily_market_pipeline import build_symbol_documents_for_range, plan_backfill_work, LOOKBACK_DAYS, WRITE_BATCH_SIZE
+from market_series import write_market_documents
+from instrumentation import metrics
+
+# 문서 작업 하나가 맡는 날짜 수 (심볼 × 날짜 구간). 작업 프로세스 수와 무관하게 고정이므로 결과가 항상 같음
+SHARD_DAYS = int(os.getenv('BACKFILL_SHARD_DAYS', 180))
+# 작업 프로세스 수 (기본: CPU 코어 수)
+BACKFILL_WORKERS = int(os.getenv('BACKFILL_WORKERS', os.cpu_count() or 1))
+# 작업 프로세스 시작 방식. 부모 프로세스에 Mongo/LLM/메트릭 스레드가 있으므로 fork 대신 spawn
+BACKFILL_START_METHOD = os.getenv('BACKFILL_START_METHOD', 'spawn')
+
+# ---- 작업 프로세스 ----
+_worker_klines = None
+
+def _init_worker(klines_path):
+    # 모든 심볼의 캔들을 담은 파일을 메모리 매핑으로 열어 둠 (작업마다 DataFrame을 pickle로 넘기지 않음)
+    global _worker_klines
+    _worker_klines = np.load(klines_path, mmap_mode='r')
+    metrics.prometheus_path = None # Prometheus 파일은 부모 프로세스만 씀
+
+def _compute_symbol(unit):
+    # 1단계: 심볼의 지표를 첫 캔들부터 한 번만 계산해 .npy 파일로 저장
+    # unit: (심볼, 캔들 시작 행, 끝 행, 지표 파일 경로). 반환값: (심볼, 지표 컬럼 이름 목록, 소요 시간)
+    symbol, lo, hi, indicator_path = unit
+    started = time.perf_counter()
+    df = calculate_all_indicators(klines_array_to_frame(_worker_klines[lo:hi]))
+    columns = [col for col in df.columns if col not in ('close_time', *CHART_DATA_COLUMNS)]
+    np.save(indicator_path, df[columns].to_numpy(np.float64))
+    return symbol, columns, time.perf_counter() - started
+
+def _build_shard(unit, columns):
+    # 2단계: 저장된 지표에서 날짜 구간의 문서만 만듦
+    # unit: (심볼, 심볼의 첫 캔들 행, 조각 시작 행, 끝 행(심볼 기준), 지표 파일 경로, 날짜 목록, lookback 일수)
+    # 반환값: (심볼, [(date_str, 문서)], 소요 시간)
+    symbol, base, lo, hi, indicator_path, shard_dates, lookback_days = unit
+    started = time.perf_counter()
+    df = klines_array_to_frame(_worker_klines[base + lo:base + hi])
+    indicators = np.load(indicator_path, mmap_mode='r')[lo:hi]
+    df = pd.concat([df, pd.DataFrame(np.array(indicators), index=df.index, columns=columns)], axis=1)
+    documents = build_symbol_documents_for_range(symbol, df, shard_dates, lookback_days)
+    return symbol, documents, time.perf_counter() - started
+
+# ---- 부모 프로세스 ----
+
+def _fetch_symbol_klines(binance_client, symbols, interval, start_str, end_str, max_workers=KLINE_FETCH_WORKERS):
+    time_range = _parse_kline_range(start_str, end_str)
+    if time_range is None:
+        return {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {symbol: executor.submit(fetch_klines_array, binance_client, symbol, interval, *time_range) for symbol in symbols}
+        return {symbol: future.result() for symbol, future in futures.items()}
+
+# 심볼별 캔들 배열을 하나의 .npy 파일로 이어 쓰고 {심볼: (시작 행, 끝 행)}을 반환
+def _write_shared_klines(path, arrays):
+    offsets = {}
+    row = 0
+    for symbol, arr in arrays.items():
+        offsets[symbol] = (row, row + len(arr))
+        row += len(arr)
+    if row == 0:
+        return offsets
+    shared = np.lib.format.open_memmap(path, mode='w+', dtype=KLINE_DTYPE, shape=(row,))
+    for symbol, arr in arrays.items():
+        lo, hi = offsets[symbol]
+        shared[lo:hi] = arr
+    shared.flush()
+    del shared
+    return offsets
+
+# 심볼별 지표 작업과 문서 작업 목록: ([(심볼, 시작 행, 끝 행, 지표 파일 경로)], {심볼: [문서 작업]})
+# EMA/MACD 등은 시작 캔들에 따라 값이 달라지므로 지표는 심볼마다 첫 캔들부터 한 번만 계산하고(run_staged_backfill과 같음)
+# 날짜 목록은 SHARD_DAYS개씩 나눠 각 조각이 필요한 행 구간(첫 날짜 - lookback ~ 마지막 날짜 + 1일)의 문서만 만듦
+def _plan_units(symbol_dates, arrays, offsets, lookback_days, shard_days, work_dir):
+    symbol_units, shard_units = [], {}
+    for symbol, target_dates in symbol_dates:
+        arr = arrays.get(symbol)
+        if arr is None or len(arr) == 0:
+            continue
+        base = offsets[symbol][0]
+        indicator_path = os.path.join(work_dir, f'indicators-{len(symbol_units)}.npy')
+        shards = []
+        for i in range(0, len(target_dates), shard_days):
+            shard_dates = target_dates[i:i + shard_days]
+            first_date = (shard_dates[0] - timedelta(days=lookback_days)).strftime('%Y-%m-%d')
+            last_date = shard_dates[-1].strftime('%Y-%m-%d')
+            start_ms, _ = _parse_kline_range(first_date, first_date)
+            _, end_ms = _parse_kline_range(last_date, last_date)
+            lo = int(np.searchsorted(arr['open_time'], start_ms))
+            hi = int(np.searchsorted(arr['open_time'], end_ms, side='right'))
+            if hi > lo:
+                shards.append((symbol, base, lo, hi, indicator_path, shard_dates, lookback_days))
+        if shards:
+            symbol_units.append((symbol, base, base + max(shard[3] for shard in shards), indicator_path))
+            shard_units[symbol] = shards
+    return symbol_units, shard_units
+
+# 여러 프로세스에서 심볼별 지표를 한 번씩 계산한 뒤 (심볼, 날짜 구간) 조각별 문서를 만들고, 부모 프로세스 하나가 결과를 모아 daily_market에 일괄 저장
+# 캔들은 부모가 한 번만 가져와 메모리 매핑 파일로 공유. 조각 경계는 SHARD_DAYS로 고정되어 작업 프로세스 수와 무관하게 같은 문서가 저장됨
+# LLM 요약(I/O)은 부모 프로세스의 스레드에서 동시에 진행
+def run_parallel_backfill(binance_client, symbols, interval, start_date, end_date, lookback_days=LOOKBACK_DAYS,
+                          workers=BACKFILL_WORKERS, shard_days=SHARD_DAYS, with_summaries=True,
+                          write_batch_size=WRITE_BATCH_SIZE, resume=False):
+    symbol_dates, summary_dates = plan_backfill_work(symbols, start_date, end_date, resume, interval)
+    pending = {}
+
+    def flush():
+        if pending:
+            with metrics.span("write"):
+                write_market_documents([pending[date_str] for date_str in sorted(pending)], interval)
+            pending.clear()
+
+    def merge(date_str, market_data=None, **fields):
+        merged = pending.setdefault(date_str, {"date": date_str})
+        if market_data:
+            merged.setdefault("market_data", {}).update(market_data)
+        merged.update(fields)
+        if len(pending) >= write_batch_size:
+            flush()
+
+    summary_executor = ThreadPoolExecutor(max_workers=1)
+    summary_future = None
+    if with_summaries and summary_dates:
+        summary_future = summary_executor.submit(summarize_dates, [d.strftime('%Y-%m-%d') for d in summary_dates])
+
+    work_dir = tempfile.mkdtemp(prefix='parallel-backfill-')
+    try:
+        arrays = {}
+        if symbol_dates:
+            first_date = min(target_dates[0] for _, target_dates in symbol_dates)
+            last_date = max(target_dates[-1] for _, target_dates in symbol_dates)
+            with metrics.span("fetch", interval=interval):
+                arrays = _fetch_symbol_klines(binance_client, [symbol for symbol, _ in symbol_dates], interval,
+                                              (first_date - timedelta(days=lookback_days)).strftime('%Y-%m-%d'),
+                                              last_date.strftime('%Y-%m-%d'))
+        klines_path = os.path.join(work_dir, 'klines.npy')
+        offsets = _write_shared_klines(klines_path, arrays)
+        symbol_units, shard_units = _plan_units(symbol_dates, arrays, offsets, lookback_days, shard_days, work_dir)
+        del arrays
+        print(f"병렬 백필 시작: 심볼 {len(symbol_units)}개, 문서 작업 {sum(map(len, shard_units.values()))}개, 프로세스 {workers}개")
+
+        if symbol_units:
+            context = multiprocessing.get_context(BACKFILL_START_METHOD)
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                     initializer=_init_worker, initargs=(klines_path,)) as executor:
+                # 심볼의 지표 계산이 끝나는 대로 그 심볼의 문서 작업을 제출
+                running = {executor.submit(_compute_symbol, unit): "indicators" for unit in symbol_units}
+                while running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        stage = running.pop(future)
+                        if stage == "indicators":
+                            symbol, columns, seconds = future.result()
+                            metrics.record_span("indicators", seconds, {"symbol": symbol, "interval": interval})
+                            for unit in shard_units[symbol]:
+                                running[executor.submit(_build_shard, unit, columns)] = "shard"
+                        else:
+                            symbol, documents, seconds = future.result()
+                            metrics.record_span("shard", seconds, {"symbol": symbol, "interval": interval})
+                            for date_str, doc in documents:
+                                merge(date_str, market_data={symbol: doc})
+
+        if summary_future is not None:
+            for date_str, summaries in summary_future.result().items():
+                merge(date_str, **summaries)
+        flush()
+    finally:
+        summary_executor.shutdown(wait=True)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    print("병렬 백필 완료.")
@@ -0,0 +1,140 @@
+import time
+import queue
+import threading
+from instrumentation import metrics
+
+# 상위 단계가 모든 항목을 넘겼음을 알리는 표시
+_DONE = object()
+
+class Stage:
+    """
+    파이프라인의 한 단계. workers개의 스레드가 크기가 제한된 입력 큐에서 항목을 꺼내 func(item)을 실행하고,
+    func가 돌려준(yield한) 결과를 다음 단계 큐에 넣습니다. 다음 단계 큐가 가득 차면 기다리므로
+    빠른 단계가 느린 단계보다 너무 앞서 나가지 않습니다.
+    """
+
+    def __init__(self, name, func, workers=1, queue_size=64, downstream=None, on_finish=None):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.downstream = downstream
+        self.on_finish = on_finish
+        self.input = queue.Queue(maxsize=queue_size)
+        self.upstream_count = 0
+        self.processed = 0
+        self.emitted = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self._done_received = 0
+        self._alive_workers = 0
+        self._upstream_done = threading.Event()
+        self._lock = threading.Lock()
+
+    def _emit(self, item):
+        if self.downstream is not None:
+            self.downstream.input.put(item)
+        with self._lock:
+            self.emitted += 1
+
+    def _worker(self):
+        while True:
+            try:
+                item = self.input.get(timeout=0.05)
+            except queue.Empty:
+                if self._upstream_done.is_set():
+                    break
+                continue
+            if item is _DONE:
+                with self._lock:
+                    self._done_received += 1
+                    if self._done_received >= self.upstream_count:
+                        self._upstream_done.set()
+                continue
+            started = time.perf_counter()
+            failed = False
+            try:
+                outputs = self.func(item)
+                if outputs is not None:
+                    for output in outputs:
+                        self._emit(output)
+            except Exception as e:
+                print(f"[{self.name}] 처리 오류: {e}")
+                failed = True
+                with self._lock:
+                    self.errors += 1
+            elapsed = time.perf_counter() - started
+            metrics.record_span("pipeline_stage_item", elapsed, {"stage": self.name}, error=failed)
+            with self._lock:
+                self.processed += 1
+                self.busy_seconds += elapsed
+
+        with self._lock:
+            self._alive_workers -= 1
+            last_worker = self._alive_workers == 0
+        if last_worker:
+            if self.on_finish is not None:
+                try:
+                    self.on_finish()
+                except Exception as e:
+                    print(f"[{self.name}] 종료 처리 오류: {e}")
+                    with self._lock:
+                        self.errors += 1
+            if self.downstream is not None:
+                self.downstream.input.put(_DONE)
+
+    def start(self):
+        self._alive_workers = self.workers
+        if self.upstream_count == 0:
+            self._upstream_done.set()
+        threads = [threading.Thread(target=self._worker, name=f"{self.name}-{i}", daemon=True) for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+class StagedPipeline:
+    """
+    단계들을 큐로 연결해 동시에 실행하는 스케줄러.
+    add_stage로 단계를 등록하고(downstream으로 다음 단계 이름 지정), run({단계 이름: 입력 항목들})으로 실행합니다.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    def add_stage(self, name, func, workers=1, queue_size=64, downstream=None, on_finish=None):
+        self.stages[name] = Stage(name, func, workers, queue_size, downstream, on_finish)
+        return self.stages[name]
+
+    def run(self, sources):
+        # 다음 단계 이름을 Stage 객체로 연결하고 상위 단계 수를 셈
+        for stage in self.stages.values():
+            if isinstance(stage.downstream, str):
+                stage.downstream = self.stages[stage.downstream]
+            if stage.downstream is not None:
+                stage.downstream.upstream_count += 1
+        for name in sources:
+            self.stages[name].upstream_count += 1
+
+        started = time.perf_counter()
+        threads = []
+        for stage in self.stages.values():
+            threads.extend(stage.start())
+
+        def feed(stage, items):
+            for item in items:
+                stage.input.put(item)
+            stage.input.put(_DONE)
+
+        feeders = [threading.Thread(target=feed, args=(self.stages[name], items), daemon=True) for name, items in sources.items()]
+        for feeder in feeders:
+            feeder.start()
+        for thread in feeders + threads:
+            thread.join()
+
+        elapsed = time.perf_counter() - started
+        print(f"--- 단계별 처리 결과 (총 {elapsed:.1f}초) ---")
+        for stage in self.stages.values():
+            print(f"[{stage.name}] 처리 {stage.processed}건, 출력 {stage.emitted}건, 오류 {stage.errors}건, 작업 시간 {stage.busy_seconds:.1f}초 (workers {stage.workers})")
+        return {
+            stage.name: {'processed': stage.processed, 'emitted': stage.emitted, 'errors': stage.errors, 'busy_seconds': stage.busy_seconds}
+            for stage in self.stages.values()
+        }
@@ -0,0 +1,75 @@
+import time
+import threading
+
+class TokenBucket:
+    """
+    여러 스레드가 함께 쓰는 토큰 버킷 요청 제한기.
+    capacity만큼 토큰을 모아둘 수 있고 초당 refill_per_second개씩 다시 채워집니다.
+    Binance처럼 요청마다 weight가 다른 API는 acquire(weight)로 weight만큼 토큰을 소모합니다.
+    """
+
+    def __init__(self, capacity, refill_per_second):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.refill_per_second)
+            self._updated = now
+
+    def acquire(self, tokens=1):
+        """토큰이 모일 때까지 기다린 뒤 tokens개를 소모합니다. 기다린 시간(초)을 반환합니다."""
+        tokens = min(float(tokens), self.capacity)
+        waited = 0.0
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                if now < self._paused_until:
+                    delay = self._paused_until - now
+                else:
+                    delay = (tokens - self._tokens) / self.refill_per_second
+                self._cond.wait(delay)
+                waited += time.monotonic() - now
+
+    def reserve(self, tokens=1):
+        """기다리지 않고 tokens개를 미리 차감한 뒤, 토큰이 실제로 모일 때까지 기다려야 할 시간(초)을 반환합니다.
+        asyncio 코드처럼 스레드를 막으면 안 되는 곳에서 반환값만큼 asyncio.sleep 하면 됩니다."""
+        tokens = min(float(tokens), self.capacity)
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= tokens
+            delay = max(0.0, self._paused_until - now)
+            if self._tokens < 0:
+                delay = max(delay, -self._tokens / self.refill_per_second)
+            return delay
+
+    def release(self, tokens):
+        """미리 차감했지만 실제로 쓰지 않은 토큰을 돌려줍니다 (예: 추정 토큰 수 > 실제 사용량)."""
+        with self._cond:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + float(tokens))
+            self._cond.notify_all()
+
+    def observe_usage(self, used):
+        """서버가 알려준 사용량(예: X-MBX-USED-WEIGHT-1M)이 로컬 계산보다 많으면 남은 토큰을 줄입니다."""
+        with self._cond:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, self.capacity - float(used))
+
+    def pause(self, seconds):
+        """429/418 응답처럼 서버가 대기를 요구할 때 seconds 동안 모든 요청을 멈춥니다."""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+            self._updated = self._paused_until
+            self._cond.notify_all()
@@ -0,0 +1,81 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# 요약 캐시 기본 위치 (common.py에서 SUMMARY_CACHE_PATH 환경 변수로 변경 가능)
+SUMMARY_CACHE_PATH = '.summary_cache.sqlite3'
+
+class SummaryCache:
+    """
+    GPT 요약 결과를 SQLite 파일에 저장하는 영구 캐시.
+    키는 (model, prompt, temperature, max_tokens)의 SHA-256 해시이므로 프롬프트나 파라미터가 바뀌면 다시 호출합니다.
+    ttl_seconds가 지난 항목은 만료되고, max_entries를 넘으면 가장 오래 사용하지 않은 항목부터 지웁니다.
+    """
+
+    def __init__(self, path=SUMMARY_CACHE_PATH, ttl_seconds=None, max_entries=None):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # 파이프라인 단계의 여러 스레드가 함께 쓰므로 연결 하나를 lock으로 보호
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            " key TEXT PRIMARY KEY, model TEXT, value TEXT NOT NULL,"
+            " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS summaries_accessed_at ON summaries (accessed_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model, prompt, temperature, max_tokens):
+        """요청 파라미터로 캐시 키(SHA-256 hex)를 만듭니다."""
+        payload = json.dumps([model, prompt, temperature, max_tokens], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """저장된 요약을 반환합니다. 없거나 만료되었으면 None."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM summaries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM summaries WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE summaries SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return value
+
+    def put(self, key, value, model=None):
+        """요약을 저장하고 만료/초과 항목을 정리합니다."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, model, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, model, value, now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        if self.ttl_seconds is not None:
+            self._conn.execute("DELETE FROM summaries WHERE created_at < ?", (now - self.ttl_seconds,))
+        if self.max_entries is not None:
+            self._conn.execute(
+                "DELETE FROM summaries WHERE key IN ("
+                " SELECT key FROM summaries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (int(self.max_entries),)
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
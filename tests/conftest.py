@@ -0,0 +1,70 @@
+import os
+import sys
+
+# 저장소 루트의 모듈(common, indicator_registry 등)을 테스트에서 import할 수 있도록 경로 추가
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+# 테스트 중에는 로컬 캐시/외부 API를 쓰지 않음
+os.environ.setdefault('KLINE_CACHE_ENABLED', '0')
+os.environ.setdefault('SUMMARY_CACHE_ENABLED', '0')
+os.environ.setdefault('LLM_BACKEND', 'stub')
+os.environ.setdefault('METRICS_ENABLED', '0')
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+# 무작위 보행 OHLCV DataFrame (open_time 일봉 인덱스, close_time 컬럼 포함)
+def make_ohlcv_frame(n, start='2020-01-01', seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    high = close * (1 + rng.uniform(0, 0.02, n))
+    low = close * (1 - rng.uniform(0, 0.02, n))
+    open_ = np.r_[close[:1], close[:-1]]
+    volume = rng.uniform(10, 1000, n)
+    if n > 10:
+        volume[5] = 0          # 거래량 0
+        close[10] = close[9]   # 보합 (OBV/RSI 경계)
+    index = pd.date_range(start, periods=n, freq='D', name='open_time')
+    return pd.DataFrame({'close_time': index + pd.Timedelta(days=1) - pd.Timedelta(milliseconds=1),
+                         'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}, index=index)
+
+@pytest.fixture
+def ohlcv_frame():
+    return make_ohlcv_frame
+
+
+class FakeKlineClient:
+    """get_klines만 있는 가짜 Binance 클라이언트. 심볼마다 고정된 무작위 보행 캔들(API 원본 형식)을 돌려줌."""
+
+    def __init__(self, start_ms, interval_ms, n=2000):
+        self.start_ms = start_ms
+        self.interval_ms = interval_ms
+        self.n = n
+        self.rows = {}
+        self.calls = []
+
+    def symbol_rows(self, symbol):
+        if symbol not in self.rows:
+            df = make_ohlcv_frame(self.n, seed=sum(map(ord, symbol)))
+            open_times = self.start_ms + np.arange(self.n, dtype=np.int64) * self.interval_ms
+            self.rows[symbol] = [
+                [int(t), f"{o:.8f}", f"{h:.8f}", f"{l:.8f}", f"{c:.8f}", f"{v:.8f}", int(t + self.interval_ms - 1), "0", 10, "0", "0", "0"]
+                for t, o, h, l, c, v in zip(open_times, df['open'], df['high'], df['low'], df['close'], df['volume'])
+            ]
+        return self.rows[symbol]
+
+    def get_klines(self, symbol, interval, startTime, endTime=None, limit=500):
+        self.calls.append((symbol, startTime, endTime))
+        rows = self.symbol_rows(symbol)
+        open_times = [row[0] for row in rows]
+        lo = int(np.searchsorted(open_times, startTime))
+        hi = int(np.searchsorted(open_times, endTime, side='right')) if endTime is not None else len(rows)
+        return [list(row) for row in rows[lo:min(hi, lo + limit)]]
+
+@pytest.fixture
+def fake_kline_client():
+    return FakeKlineClient
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+bson = pytest.importorskip('bson')
+
+import columnar_codec
+from columnar_codec import decode_columnar, encode_columnar, is_columnar, trade_log_frame
+
+
+def _bson_round_trip(frame):
+    # 실제 저장 경로와 같이 BSON으로 인코딩했다가 다시 읽은 문서를 디코딩
+    document = bson.BSON.encode({"trades_data": encode_columnar(frame)})
+    return decode_columnar(bson.BSON(document).decode()["trades_data"])
+
+@pytest.fixture
+def trade_log():
+    n = 5000
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame({
+        'ts': pd.date_range('2025-01-01', periods=n, freq='s'),
+        'ts_kst': pd.date_range('2025-01-01', periods=n, freq='s', tz='Asia/Seoul'),
+        'symbol': rng.choice(['BTCUSDT', 'ETHUSDT', None], n).astype(object),
+        'price': rng.normal(100, 1, n),
+        'qty': rng.integers(0, 100, n),
+        'flag': rng.random(n) < 0.5,
+        'order_id': [f'o-{i}' for i in range(n)],
+        'loop': 12,
+    })
+    df.loc[3, 'price'] = np.nan
+    df.loc[5, 'ts'] = pd.NaT
+    return df
+
+def test_round_trip_through_bson(trade_log):
+    encoded = encode_columnar(trade_log)
+    kinds = {name: column['type'] for name, column in encoded['columns'].items()}
+    assert kinds == {'ts': 'datetime', 'ts_kst': 'datetime', 'symbol': 'dict', 'price': 'array',
+                     'qty': 'array', 'flag': 'array', 'order_id': 'str', 'loop': 'const'}
+    pd.testing.assert_frame_equal(_bson_round_trip(trade_log), trade_log)
+
+def test_round_trip_records_and_nested_values():
+    records = [{'a': {'x': 1}, 'b': [1, 2], 'side': 'BUY'}, {'a': {'y': 2}, 'b': [3], 'side': 'SELL'}]
+    assert _bson_round_trip(records).to_dict('records') == records
+
+def test_empty_frame_round_trip():
+    assert _bson_round_trip(pd.DataFrame({'a': []})).shape == (0, 1)
+
+def test_trade_log_frame_reads_both_layouts(trade_log):
+    rows = trade_log.drop(columns=['ts_kst']).iloc[:50]
+    encoded = encode_columnar(rows)
+    assert is_columnar(encoded) and encoded['format'] == columnar_codec.COLUMNAR_FORMAT
+    pd.testing.assert_frame_equal(trade_log_frame(encoded), rows)
+    pd.testing.assert_frame_equal(trade_log_frame(rows.to_dict('records')), rows)
+    assert trade_log_frame(None).empty
@@ -0,0 +1,46 @@
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+
+import db_dummy
+import db_indexes
+from db_indexes import AGENT_COLLECTION_INDEXES, ensure_agent_indexes
+
+
+def _unique_keys(collection_name):
+    return [{field for field, _ in keys} for keys, options in AGENT_COLLECTION_INDEXES[collection_name] if options.get("unique")]
+
+def test_agent_upsert_filters_match_unique_indexes():
+    # upsert 조건의 필드가 unique 인덱스 키와 같아야 조건 하나가 문서 하나를 가리킴
+    db = mongomock.MongoClient().agent
+    for name, collection, query, sort, upsert in db_indexes._agent_query_plan_checks(db):
+        if upsert:
+            assert set(query) in _unique_keys(collection.name), name
+
+def test_central_memory_keeps_one_current_document_per_type():
+    db = mongomock.MongoClient().agent
+    ensure_agent_indexes(db)
+    dept = "Trend_Analyst"
+    for date_str in ("2025-06-28", "2025-06-29", "2025-06-30"):
+        db_dummy.insert_central_memory(db, dept, db_dummy.create_strategy_cases_checklist(dept, date_str),
+                                       db_dummy.create_memory_guideline(dept, date_str))
+    assert db.central_memory.count_documents({"dept": dept}) == 2
+    # (dept, type) 조회는 항상 마지막으로 쓴 현재 문서
+    assert db.central_memory.find_one({"dept": dept, "type": "memory_guideline"})["version"] == "2025-06-30_1"
+    assert db.central_memory.find_one({"dept": dept, "type": "strategy_cases_checklist"})["version"] == "2025-06-30_1"
+
+def test_load_generator_overwrites_central_memory_with_latest_date():
+    import load_generator
+    db = mongomock.MongoClient().agent
+    ensure_agent_indexes(db)
+    dept = "Trend_Analyst"
+    # 작업 단위가 날짜 순서와 다르게 끝나도 가장 늦은 날짜 문서만 남아야 함
+    for date_str in ("2025-06-29", "2025-06-30", "2025-06-28"):
+        docs = [{"dept": dept, "type": "strategy_cases_checklist", "date": date_str, **db_dummy.create_strategy_cases_checklist(dept, date_str)},
+                {"dept": dept, "type": "memory_guideline", "date": date_str, **db_dummy.create_memory_guideline(dept, date_str)}]
+        try:
+            db.central_memory.bulk_write([load_generator.central_memory_upsert(doc) for doc in docs], ordered=False)
+        except load_generator.BulkWriteError as e:
+            assert {error["code"] for error in e.details["writeErrors"]} == {load_generator.DUPLICATE_KEY_ERROR}
+    assert db.central_memory.count_documents({"dept": dept}) == 2
+    assert {doc["date"] for doc in db.central_memory.find({"dept": dept})} == {"2025-06-30"}
@@ -0,0 +1,43 @@
+import json
+import os
+import subprocess
+import sys
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# benchmark_pipeline.check_import_budget과 같은 예산
+IMPORT_TIME_BUDGET_SECONDS = float(os.getenv('IMPORT_TIME_BUDGET_SECONDS', 1.0))
+
+PROBE = """
+import sys, json
+import common
+print(json.dumps({"modules": [name for name in ("pymongo", "openai", "dotenv") if name in sys.modules]}))
+"""
+
+def _cumulative_import_us(stderr, module):
+    # -X importtime 출력: "import time: self [us] | cumulative | imported package"
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and line.rsplit("|", 1)[-1].strip() == module:
+            return int(line.split("|")[1])
+    raise AssertionError(f"{module} import 시간을 찾지 못했습니다:\n{stderr[-2000:]}")
+
+def _run_probe(cwd):
+    env = {key: value for key, value in os.environ.items()
+           if key not in ('KLINE_CACHE_ENABLED', 'SUMMARY_CACHE_ENABLED', 'METRICS_ENABLED')}
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [REPO_DIR, os.environ.get('PYTHONPATH')]))
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE],
+                               capture_output=True, text=True, cwd=cwd, env=env)
+    assert completed.returncode == 0, completed.stderr
+    return completed
+
+def test_import_common_within_budget_without_io(tmp_path):
+    # 캐시 기본값(KLINE_CACHE_ENABLED/SUMMARY_CACHE_ENABLED 켜짐)으로 빈 작업 디렉터리에서 import
+    best = None
+    for _ in range(3):
+        completed = _run_probe(tmp_path)
+        seconds = _cumulative_import_us(completed.stderr, 'common') / 1e6
+        best = seconds if best is None else min(best, seconds)
+        loaded = json.loads(completed.stdout.strip().splitlines()[-1])["modules"]
+        assert loaded == [], f"import common이 {loaded}를 불러옴"
+        assert sorted(os.listdir(tmp_path)) == [], "import common이 작업 디렉터리에 파일을 만듦"
+    assert best <= IMPORT_TIME_BUDGET_SECONDS, f"import common {best:.3f}초 > 예산 {IMPORT_TIME_BUDGET_SECONDS}초"
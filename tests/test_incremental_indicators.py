@@ -0,0 +1,84 @@
+import contextlib
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import common
+from incremental_indicators import IncrementalIndicatorEngine
+
+
+def _candles(df):
+    for open_time, row in df.iterrows():
+        yield dict(row, open_time=open_time)
+
+@pytest.fixture
+def frame(ohlcv_frame):
+    return ohlcv_frame(600, seed=4)
+
+@pytest.fixture
+def reference(frame):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return common.calculate_all_indicators(frame.copy())
+
+def _run_with_round_trip(frame, round_trip_at):
+    engine = IncrementalIndicatorEngine()
+    rows = []
+    for i, candle in enumerate(_candles(frame)):
+        if i == round_trip_at:
+            # 상태를 JSON 문자열로 저장했다가 새 엔진으로 복원
+            engine = IncrementalIndicatorEngine.from_state(json.loads(json.dumps(engine.to_state())))
+        rows.append(engine.update(candle))
+    return engine, pd.DataFrame(rows, index=frame.index)
+
+def test_incremental_matches_batch_after_state_round_trip(frame, reference):
+    engine, incremental = _run_with_round_trip(frame, round_trip_at=300)
+    indicator_columns = [c for c in reference.columns if c not in frame.columns]
+    assert list(incremental.columns) == indicator_columns
+    for col in indicator_columns:
+        if col.startswith('ICS'):
+            # 후행 스팬은 미래 종가를 당겨 쓰므로 증분 계산 대상이 아님
+            continue
+        expected = reference[col].to_numpy(float)
+        actual = incremental[col].to_numpy(float)
+        if col.startswith('FIB'):
+            # 배치 계산은 마지막 행의 피보나치 수준을 전체 행에 채움
+            expected, actual = expected[-1:], actual[-1:]
+        else:
+            assert np.array_equal(np.isnan(expected), np.isnan(actual)), col
+            # EMA/RMA 초기값 차이가 충분히 줄어든 뒤의 구간 비교
+            expected, actual = expected[-300:], actual[-300:]
+        assert np.allclose(expected, actual, rtol=1e-9, atol=1e-9, equal_nan=True), col
+
+def test_state_round_trip_is_exact(frame):
+    _, direct = _run_with_round_trip(frame, round_trip_at=None)
+    _, restored = _run_with_round_trip(frame, round_trip_at=450)
+    assert np.array_equal(direct.to_numpy(float), restored.to_numpy(float), equal_nan=True)
+
+def test_latest_frame_after_seed(frame, reference):
+    engine = IncrementalIndicatorEngine().seed(frame)
+    latest = engine.latest_frame()
+    assert latest.index[0] == frame.index[-1]
+    assert list(latest.columns) == list(reference.columns)
+    assert latest['SMA_200'].iloc[0] == pytest.approx(reference['SMA_200'].iloc[-1], rel=1e-12)
+
+def test_not_ready_before_min_candles(frame):
+    engine = IncrementalIndicatorEngine().seed(frame.iloc[:common.MIN_INDICATOR_CANDLES - 1])
+    assert not engine.ready
+    assert list(engine.latest_frame().columns) == list(frame.columns)
+
+def test_engine_follows_enabled_indicator_groups(frame, monkeypatch):
+    import indicator_registry
+    monkeypatch.setattr(indicator_registry, 'ENABLED_INDICATOR_GROUPS', ['MA', 'RSI'])
+    with contextlib.redirect_stdout(io.StringIO()):
+        reference = common.calculate_all_indicators(frame.copy())
+    engine = IncrementalIndicatorEngine().seed(frame)
+    latest = engine.latest_frame()
+    assert list(latest.columns) == list(reference.columns)
+    assert latest['RSI_14'].iloc[0] == pytest.approx(reference['RSI_14'].iloc[-1], rel=1e-9)
+    # 저장한 상태는 환경 변수가 바뀌어도 같은 그룹으로 복원됨
+    monkeypatch.setattr(indicator_registry, 'ENABLED_INDICATOR_GROUPS', [])
+    restored = IncrementalIndicatorEngine.from_state(json.loads(json.dumps(engine.to_state())))
+    assert restored.groups == ['MA', 'RSI']
@@ -0,0 +1,59 @@
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import common
+import indicator_panel
+from indicator_panel import calculate_indicators_panel, stack_ohlcv_panel
+
+
+@pytest.fixture
+def staggered_frames(ohlcv_frame):
+    # 상장일/마지막 캔들이 서로 다른 심볼들 + 패널에서 제외되어야 하는 경우들
+    frames = {}
+    for i in range(12):
+        start = pd.Timestamp('2020-01-01') + pd.Timedelta(days=(i % 6) * 45)
+        frames[f"S{i}"] = ohlcv_frame(700 - (i % 4) * 60, start=start, seed=i)
+    frames['EARLYEND'] = ohlcv_frame(300, seed=100)
+    frames['SHORT'] = ohlcv_frame(100, start='2021-01-01', seed=101)
+    frames['EMPTY'] = ohlcv_frame(0)
+    gap = ohlcv_frame(400, start='2020-03-01', seed=102)
+    frames['GAP'] = gap.drop(gap.index[200])
+    return frames
+
+def _assert_matches_per_symbol(frames, panel):
+    assert list(panel) == list(frames)
+    for symbol, df in frames.items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = common.calculate_all_indicators(df.copy())
+        actual = panel[symbol]
+        assert list(actual.columns) == list(expected.columns), symbol
+        assert actual.index.equals(expected.index), symbol
+        for col in expected.columns.drop('close_time'):
+            assert np.allclose(expected[col].to_numpy(float), actual[col].to_numpy(float),
+                               rtol=1e-9, atol=1e-9, equal_nan=True), (symbol, col)
+
+def test_panel_matches_per_symbol_with_staggered_listing(staggered_frames):
+    with contextlib.redirect_stdout(io.StringIO()):
+        panel = calculate_indicators_panel(staggered_frames)
+    _assert_matches_per_symbol(staggered_frames, panel)
+
+def test_panel_chunks_match_per_symbol(staggered_frames, monkeypatch):
+    # 패널을 여러 심볼 묶음으로 나눠도 결과가 같아야 함
+    monkeypatch.setattr(indicator_panel, 'PANEL_MAX_CELLS', 3000)
+    assert len(indicator_panel._panel_chunks(staggered_frames)) > 1
+    with contextlib.redirect_stdout(io.StringIO()):
+        panel = calculate_indicators_panel(staggered_frames)
+    _assert_matches_per_symbol(staggered_frames, panel)
+
+def test_stack_excludes_short_and_gapped_symbols(staggered_frames):
+    index, symbols, columns, row_ranges = stack_ohlcv_panel(staggered_frames)
+    assert 'SHORT' not in symbols and 'EMPTY' not in symbols and 'GAP' not in symbols
+    assert 'EARLYEND' in symbols
+    for col, symbol in enumerate(symbols):
+        lo, hi = row_ranges[symbol]
+        assert np.isnan(columns['close'][:lo, col]).all() and np.isnan(columns['close'][hi:, col]).all()
+        assert np.array_equal(columns['close'][lo:hi, col], staggered_frames[symbol]['close'].to_numpy())
@@ -0,0 +1,66 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+import common
+from indicator_registry import compute_indicator_columns, select_indicator_specs
+
+ta = pytest.importorskip('pandas_ta')
+
+
+# 레지스트리 도입 전 common.calculate_all_indicators (pandas_ta 기준 출력)
+def reference_indicators(df):
+    for p in [5, 10, 20, 50, 60, 100, 200]:
+        df.ta.sma(close=df["close"], length=p, append=True)
+        df.ta.ema(close=df["close"], length=p, append=True)
+    for fast, slow, sig in [(12,26,9), (24,52,18), (19,39,9)]:
+        df.ta.macd(close=df["close"], fast=fast, slow=slow, signal=sig, append=True)
+    for L in [7,14,21]:
+        df.ta.rsi(close=df["close"], length=L, append=True)
+    for k, d in [(5,3),(9,3),(14,3)]:
+        df.ta.stoch(high=df["high"], low=df["low"], close=df["close"], k=k, d=d, append=True)
+    for L in [10,20,50]:
+        df.ta.bbands(close=df["close"], length=L, std=2, append=True)
+    for L in [7,14,28]:
+        df.ta.atr(high=df["high"], low=df["low"], close=df["close"], length=L, append=True)
+    df.ta.obv(close=df["close"], volume=df["volume"], append=True)
+    for L in [10,20,50]:
+        df.ta.sma(close=df["OBV"], length=L, append=True, prefix="OBV_")
+    df.ta.ichimoku(high=df["high"], low=df["low"], close=df["close"], tenkan=9, kijun=26, senkou_b=52, append=True)
+    for L in [10,14,21]:
+        df.ta.supertrend(high=df["high"], low=df["low"], close=df["close"], length=L, multiplier=3, append=True)
+    recent = df.tail(30)
+    recent_high, recent_low = recent['high'].max(), recent['low'].min()
+    rising = recent['close'].iloc[-1] > recent['close'].iloc[0]
+    for ratio in [0, 0.236, 0.382, 0.5, 0.618, 0.786, 1, 1.272, 1.618]:
+        price_range = recent_high - recent_low
+        df[f"FIB_{ratio}"] = recent_high - price_range * ratio if rising else recent_low + price_range * ratio
+    return df
+
+def _mismatched_columns(expected, actual):
+    return [c for c in expected.columns
+            if not np.allclose(expected[c].to_numpy(float), actual[c].to_numpy(float), rtol=1e-9, atol=1e-9, equal_nan=True)]
+
+@pytest.mark.parametrize('n', [250, 3000])
+def test_registry_matches_pandas_ta_reference(ohlcv_frame, n):
+    df = ohlcv_frame(n, seed=n).drop(columns='close_time')
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = reference_indicators(df.copy())
+        actual = common.calculate_all_indicators(df.copy())
+    assert list(actual.columns) == list(expected.columns)
+    assert _mismatched_columns(expected, actual) == []
+
+def test_selected_groups_share_intermediates(ohlcv_frame):
+    df = ohlcv_frame(300)
+    columns = {k: df[k].to_numpy() for k in ('open', 'high', 'low', 'close', 'volume')}
+    results, ctx = compute_indicator_columns(columns, select_indicator_specs(['MA', 'BBANDS']))
+    assert set(results) == {f"SMA_{p}" for p in [5, 10, 20, 50, 60, 100, 200]} | \
+        {f"BB{kind}_{L}_2.0" for kind in 'LMUBP' for L in [10, 20, 50]}
+    # BBANDS 중간선은 MA 그룹의 SMA_20/SMA_50을 다시 계산하지 않고 재사용
+    assert ctx.reused > 0
+
+def test_unknown_group_is_rejected():
+    with pytest.raises(ValueError):
+        select_indicator_specs(['NOPE'])
@@ -0,0 +1,127 @@
+import contextlib
+import io
+import json
+import math
+from datetime import date
+
+import pandas as pd
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+
+import common
+import live_stream
+import market_series
+from daily_market_pipeline import build_market_data_for_date
+from live_stream import FileKlineSource, LiveMarketStream, kline_message
+
+HOUR_MS = 60 * 60 * 1000
+DAY_MS = 24 * HOUR_MS
+START_MS = 1672531200000 # 2023-01-01 00:00 UTC
+# EMA/RMA 기반 그룹: 날짜별 방식은 날짜마다 lookback 시작 캔들로 초기값을 다시 잡으므로 실시간 값과 조금 다름
+EMA_SEEDED_GROUPS = ('EMA', 'MACD', 'RSI', 'ATR', 'SUPERTREND')
+
+
+@pytest.fixture
+def db(monkeypatch):
+    database = mongomock.MongoClient().crypto_data
+    monkeypatch.setattr(common, 'daily_market_collection', database.daily_market, raising=False)
+    monkeypatch.setattr(market_series, 'market_series_collection', database.market_series, raising=False)
+    monkeypatch.setattr(market_series, '_indexes_ready', False)
+    return database
+
+def _candle(row):
+    return {'open_time': row[0], 'close_time': row[6], 'open': float(row[1]), 'high': float(row[2]),
+            'low': float(row[3]), 'close': float(row[4]), 'volume': float(row[5])}
+
+def _write_messages(path, messages):
+    path.write_text("".join(json.dumps(message) + "\n" for message in messages), encoding='utf-8')
+    return str(path)
+
+class _DroppingSource:
+    """접속마다 파일을 하나씩 재생하고, 마지막 파일이 아니면 끝에서 연결이 끊김. 재생한 캔들 마감 시각으로 시계를 옮김."""
+
+    def __init__(self, paths, now, reconnect_at):
+        self.paths = list(paths)
+        self.now = now
+        self.reconnect_at = reconnect_at
+
+    def events(self, symbols, interval):
+        path = self.paths.pop(0)
+        for message in FileKlineSource(path).events(symbols, interval):
+            self.now[0] = max(self.now[0], (message['data']['k']['T'] + 1) / 1000)
+            yield message
+        if self.paths:
+            # 끊긴 동안 마감된 캔들은 재연결할 때 API로 보충해야 함
+            self.now[0] = self.reconnect_at
+            raise ConnectionError("test disconnect")
+
+def _assert_same_document(live, batch, path="", rel=1e-9):
+    if isinstance(batch, dict):
+        assert set(live) == set(batch), path
+        for key in batch:
+            _assert_same_document(live[key], batch[key], f"{path}.{key}", 1e-2 if key in EMA_SEEDED_GROUPS else rel)
+    elif isinstance(batch, float) and isinstance(live, float):
+        assert (math.isnan(live) and math.isnan(batch)) or live == pytest.approx(batch, rel=rel, abs=1e-9), path
+    else:
+        assert live == batch, path
+
+def test_daily_stream_matches_batch_documents(db, tmp_path, fake_kline_client):
+    client = fake_kline_client(START_MS, DAY_MS, n=600)
+    symbols = ['BTCUSDT', 'ETHUSDT']
+    rows = {symbol: client.symbol_rows(symbol) for symbol in symbols}
+    first = 400 # 스트림이 시작되는 캔들 (그 전 lookback 구간은 warm-up)
+
+    def messages(*offsets):
+        return [kline_message(symbol, '1d', _candle(rows[symbol][first + offset])) for offset in offsets for symbol in symbols]
+
+    # 1번 접속: 첫 캔들을 두 번 받고(중복), first + 1을 건너뜀(누락 → 보충), first + 3 뒤 끊김
+    # 2번 접속: 끊긴 동안 보충한 first + 5를 다시 받고(중복), first + 6
+    paths = [_write_messages(tmp_path / 'first.jsonl', messages(0, 0, 2, 3)),
+             _write_messages(tmp_path / 'second.jsonl', messages(5, 6))]
+    now = [rows['BTCUSDT'][first][0] / 1000]
+    sleeps = []
+    source = _DroppingSource(paths, now, reconnect_at=(rows['BTCUSDT'][first + 5][6] + 1) / 1000)
+    stream = LiveMarketStream(client, symbols, '1d', source, layout='daily', clock=lambda: now[0], sleep=sleeps.append)
+    with contextlib.redirect_stdout(io.StringIO()):
+        stream.run(max_reconnects=1)
+
+    assert sleeps == [live_stream.LIVE_RECONNECT_BASE_SECONDS]
+    # 누락 캔들 보충은 다음 캔들 직전까지 조회
+    assert ('BTCUSDT', rows['BTCUSDT'][first + 1][0], rows['BTCUSDT'][first + 2][0] - 1) in client.calls
+    assert all(stream.states[symbol].last_open_time == rows[symbol][first + 6][0] for symbol in symbols)
+
+    # warm-up 마지막 캔들부터 스트림 마지막 캔들까지 날짜마다 문서 하나, 심볼별 $set이라 두 심볼이 모두 남음
+    dates = [date.fromtimestamp(0) + pd.Timedelta(milliseconds=rows['BTCUSDT'][first + offset][0]) for offset in range(-1, 7)]
+    assert sorted(doc["date"] for doc in db.daily_market.find()) == [d.strftime('%Y-%m-%d') for d in dates]
+    for current_date in dates:
+        live = db.daily_market.find_one({"date": current_date.strftime('%Y-%m-%d')})["market_data"]
+        with contextlib.redirect_stdout(io.StringIO()):
+            batch = build_market_data_for_date(client, symbols, '1d', current_date)
+        assert set(live) == set(symbols)
+        for symbol in symbols:
+            # 날짜별 조회 구간은 다음 날 첫 캔들까지 포함해 피보나치 구간이 한 캔들 밀려 있으므로 비교에서 뺌
+            live[symbol]["technical_indicators"].pop("FIB")
+            batch[symbol]["technical_indicators"].pop("FIB")
+            _assert_same_document(live[symbol], batch[symbol], f"{current_date} {symbol}")
+
+def test_intraday_stream_stores_one_series_document_per_candle(db, tmp_path, fake_kline_client):
+    client = fake_kline_client(START_MS, HOUR_MS)
+    rows = client.symbol_rows('BTCUSDT')
+    first = 1000 # 스트림이 시작되는 캔들 (그 전까지는 warm-up)
+    messages = [kline_message('BTCUSDT', '1h', _candle(row)) for row in rows[first:first + 10]]
+    now = [rows[first][0] / 1000]
+    stream = LiveMarketStream(client, ['BTCUSDT'], '1h', FileKlineSource(_write_messages(tmp_path / 'klines.jsonl', messages)),
+                              layout='series', warm_up_max_candles=300, clock=lambda: now[0])
+    with contextlib.redirect_stdout(io.StringIO()):
+        stream.run()
+
+    docs = list(db.market_series.find({"symbol": "BTCUSDT", "interval": "1h"}).sort("open_time", 1))
+    # warm-up 마지막 캔들 + 스트림 캔들 10개가 각각 문서 하나
+    expected_rows = rows[first - 1:first + 10]
+    assert len(docs) == len(expected_rows)
+    for doc, row in zip(docs, expected_rows):
+        assert doc["open_time"] == pd.Timestamp(row[0], unit='ms').to_pydatetime()
+        assert doc["date"] == live_stream._ms_to_date_str(row[0])
+        assert doc["chart_data"]["close"] == float(row[4])
+    assert db.daily_market.count_documents({}) == 0
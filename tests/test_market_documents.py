@@ -0,0 +1,119 @@
+import contextlib
+import io
+import json
+
+import pandas as pd
+import pytest
+
+import common
+
+
+# 컬럼 스키마 캐시 도입 전 prepare_market_data_documents_for_mongo (행 하나 → 문서 하나의 기준 출력)
+def reference_document(df):
+    for idx, row in df.iterrows():
+        chart_data = {
+            "open": float(row['open']),
+            "high": float(row['high']),
+            "low": float(row['low']),
+            "close": float(row['close']),
+            "volume": float(row['volume'])
+        }
+        ti = {}
+        for col, val in row.items():
+            if pd.isna(val):
+                continue
+            if col in ['close_time', 'open', 'high', 'low', 'close', 'volume']:
+                continue
+            if col.startswith("EMA"):
+                period = col.split("_",1)[1]
+                ti.setdefault("EMA", {})[f"EMA-{period}"] = float(val)
+
+            elif col.startswith("SMA"):
+                period = col.split("_",1)[1]
+                ti.setdefault("MA", {})[f"MA-{period}"] = float(val)
+
+            elif col.startswith("MACD") or col.startswith("MACDh") or col.startswith("MACDs"):
+                kind, grp = col.split("_",1)
+                grp = grp.replace("_", "-")
+                key = f"{kind}-{grp}"
+                ti.setdefault("MACD", {})[key] = float(val)
+
+            elif col.startswith("RSI"):
+                period = col.split("_",1)[1]
+                ti.setdefault("RSI", {})[f"RSI-{period}"] = float(val)
+
+            elif col.startswith("STOCHk") or col.startswith("STOCHd"):
+                kind, grp = col.split("_",1)
+                grp = grp.replace("_", "-")
+                bucket = ti.setdefault("STOCH", {}).setdefault(grp, {})
+                if kind == "STOCHk":
+                    bucket["STOCHk"] = float(val)
+                else:
+                    bucket["STOCHd"] = float(val)
+
+            elif col.startswith(("BBL", "BBM", "BBU", "BBB", "BBP")):
+                prefix, grp = col.split("_",1)
+                grp = grp.replace("_", "-")
+                bb = ti.setdefault("BBANDS", {}).setdefault(grp, {})
+                bb[prefix] = float(val)
+
+            elif col.startswith("ATR"):
+                period = col.split("_",1)[1]
+                ti.setdefault("ATR", {})[f"ATR-{period}"] = float(val)
+
+            elif col == "OBV":
+                ti.setdefault("OBV", {})["OBV"] = float(val)
+            elif col.startswith("OBV_SMA_") or col.startswith("OBV_MA_") or col.startswith("OBV_"):
+                parts = col.split("_")[-1]
+                ti.setdefault("OBV", {})[f"OBV-MA-{parts}"] = float(val)
+
+            elif col.startswith("ISA"):
+                col = col.replace("_", "-")
+                ti.setdefault("ICHIMOKU", {})[col] = float(val)
+            elif col.startswith("ISB"):
+                col = col.replace("_", "-")
+                ti.setdefault("ICHIMOKU", {})[col] = float(val)
+            elif col.startswith("ITS"):
+                col = col.replace("_", "-")
+                ti.setdefault("ICHIMOKU", {})[col] = float(val)
+            elif col.startswith("IKS"):
+                col = col.replace("_", "-")
+                ti.setdefault("ICHIMOKU", {})[col] = float(val)
+            elif col.startswith("ICS"):
+                col = col.replace("_", "-")
+                ti.setdefault("ICHIMOKU", {})[col] = float(val)
+
+            elif col.startswith("SUPERT"):
+                kind = col.split("_")[0]
+                length = col.split("_")[1]
+                multiplier = col.split("_")[2]
+                bucket = ti.setdefault("SUPERTREND", {}).setdefault(f"{length}-{multiplier}", {})
+                bucket[kind] = float(val)
+            elif col.startswith("FIB"):
+                ratio = col.split("_",1)[1]
+                ti.setdefault("FIB", {})[f"FIB-level-{ratio}"] = float(val)
+    return {"chart_data": chart_data, "technical_indicators": ti}
+
+@pytest.fixture
+def indicator_frame(ohlcv_frame):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return common.calculate_all_indicators(ohlcv_frame(400, seed=5))
+
+def test_documents_match_baseline_shape(indicator_frame):
+    docs = common.build_market_data_documents(indicator_frame)
+    assert len(docs) == len(indicator_frame)
+    for i, doc in enumerate(docs):
+        # 키 순서까지 같아야 저장되는 BSON 문서가 같음
+        assert json.dumps(doc) == json.dumps(reference_document(indicator_frame.iloc[i:i + 1])), indicator_frame.index[i]
+
+def test_prepare_uses_last_row(indicator_frame):
+    doc = common.prepare_market_data_documents_for_mongo(indicator_frame, 'BTCUSDT', '1d')
+    assert json.dumps(doc) == json.dumps(reference_document(indicator_frame.iloc[-1:]))
+
+def test_documents_without_indicators(ohlcv_frame):
+    # 지표 계산에 필요한 캔들이 부족하면 chart_data만 채워짐
+    df = ohlcv_frame(10)
+    docs = common.build_market_data_documents(df)
+    assert [doc["technical_indicators"] for doc in docs] == [{}] * 10
+    assert docs[-1]["chart_data"]["close"] == float(df['close'].iloc[-1])
+    assert common.build_market_data_documents(df.iloc[:0]) == []
@@ -0,0 +1,38 @@
+from datetime import datetime
+
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+
+import market_series
+from market_series import bulk_upsert_market_series_documents, series_open_time
+
+
+@pytest.fixture
+def series_collection(monkeypatch):
+    collection = mongomock.MongoClient().crypto_data.market_series
+    monkeypatch.setattr(market_series, 'market_series_collection', collection, raising=False)
+    monkeypatch.setattr(market_series, '_indexes_ready', False)
+    return collection
+
+def _symbol_doc(close):
+    return {"chart_data": {"close": close}, "technical_indicators": {}}
+
+def test_daily_documents_keyed_by_date(series_collection):
+    bulk_upsert_market_series_documents([{"date": "2023-11-26", "market_data": {"BTCUSDT": _symbol_doc(1.0)}}], '1d')
+    bulk_upsert_market_series_documents([{"date": "2023-11-26", "market_data": {"BTCUSDT": _symbol_doc(2.0)}}], '1d')
+    docs = list(series_collection.find({}, {"_id": 0}))
+    assert [(doc["open_time"], doc["chart_data"]["close"]) for doc in docs] == [(datetime(2023, 11, 26), 2.0)]
+
+def test_intraday_documents_keyed_by_candle_open_time(series_collection):
+    documents = [{"date": "2023-11-26", "market_data": {"BTCUSDT": _symbol_doc(float(hour))},
+                  "open_times": {"BTCUSDT": datetime(2023, 11, 26, hour)}} for hour in range(10)]
+    bulk_upsert_market_series_documents(documents, '1h')
+    docs = list(series_collection.find({"symbol": "BTCUSDT", "interval": "1h"}).sort("open_time", 1))
+    assert [(doc["open_time"].hour, doc["chart_data"]["close"]) for doc in docs] == [(h, float(h)) for h in range(10)]
+
+def test_intraday_without_open_time_is_rejected(series_collection):
+    with pytest.raises(ValueError):
+        bulk_upsert_market_series_documents([{"date": "2023-11-26", "market_data": {"BTCUSDT": _symbol_doc(1.0)}}], '1h')
+    with pytest.raises(ValueError):
+        series_open_time("2023-11-26", '1m')
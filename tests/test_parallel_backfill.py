@@ -0,0 +1,63 @@
+import contextlib
+import io
+import json
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+import common
+import parallel_backfill
+from daily_market_pipeline import build_symbol_documents_for_range
+from kline_cache import KLINE_DTYPE
+
+
+@pytest.fixture
+def kline_array(ohlcv_frame):
+    df = ohlcv_frame(500, start='2020-01-01', seed=17)
+    arr = np.empty(len(df), dtype=KLINE_DTYPE)
+    arr['open_time'] = df.index.values.astype('datetime64[ms]').astype(np.int64)
+    arr['close_time'] = df['close_time'].values.astype('datetime64[ms]').astype(np.int64)
+    for col in common.CHART_DATA_COLUMNS:
+        arr[col] = df[col].to_numpy()
+    return arr
+
+def _sharded_documents(tmp_path, arrays, symbol_dates, shard_days, lookback_days=250):
+    work_dir = tmp_path / f'work-{shard_days}'
+    work_dir.mkdir()
+    path = str(work_dir / 'klines.npy')
+    offsets = parallel_backfill._write_shared_klines(path, arrays)
+    symbol_units, shard_units = parallel_backfill._plan_units(symbol_dates, arrays, offsets, lookback_days, shard_days, str(work_dir))
+    # 작업 프로세스 없이 같은 함수를 현재 프로세스에서 실행
+    parallel_backfill._init_worker(path)
+    documents = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for unit in symbol_units:
+            symbol, columns, _ = parallel_backfill._compute_symbol(unit)
+            for shard in shard_units[symbol]:
+                _, shard_documents, _ = parallel_backfill._build_shard(shard, columns)
+                for date_str, doc in shard_documents:
+                    documents[(symbol, date_str)] = json.dumps(doc)
+    return symbol_units, [shard for shards in shard_units.values() for shard in shards], documents
+
+def test_shard_output_does_not_depend_on_shard_days(tmp_path, kline_array):
+    arrays = {'AAA': kline_array, 'BBB': kline_array[40:]}
+    target_dates = [date(2021, 1, 1) + timedelta(days=i) for i in range(90)]
+    symbol_dates = [(symbol, target_dates) for symbol in arrays]
+    _, shards, whole = _sharded_documents(tmp_path, arrays, symbol_dates, shard_days=1000)
+    assert len(shards) == 2
+    for shard_days in (7, 30):
+        symbol_units, shards, sharded = _sharded_documents(tmp_path, arrays, symbol_dates, shard_days)
+        assert len(shards) > 2
+        # 지표는 심볼마다 첫 캔들부터 한 번만 계산하고, 문서 조각은 자기 lookback 구간의 행만 읽음
+        assert [(unit[0], unit[1]) for unit in symbol_units] == [('AAA', 0), ('BBB', len(kline_array))]
+        assert all(lo > 0 for _, _, lo, _, _, _, _ in shards[1:len(shards) // 2])
+        assert sharded == whole
+
+def test_shards_match_single_range_computation(tmp_path, kline_array):
+    target_dates = [date(2021, 2, 1) + timedelta(days=i) for i in range(60)]
+    _, _, sharded = _sharded_documents(tmp_path, {'AAA': kline_array}, [('AAA', target_dates)], shard_days=14)
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = common.calculate_all_indicators(common.klines_array_to_frame(kline_array))
+        expected = build_symbol_documents_for_range('AAA', df, target_dates)
+    assert sharded == {('AAA', date_str): json.dumps(doc) for date_str, doc in expected}
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicator_registry import RollingExtrema, rolling_max, rolling_min
+
+
+WINDOWS = [1, 2, 3, 7, 9, 26, 30, 52, 64, 65]
+
+@pytest.fixture
+def values():
+    rng = np.random.default_rng(11)
+    x = np.cumsum(rng.normal(size=(400, 3)), axis=0)
+    x[rng.random(x.shape) < 0.03] = np.nan
+    return x
+
+def _expected(x, length, is_max, min_periods):
+    rolling = pd.DataFrame(x).rolling(length, min_periods=min_periods)
+    return (rolling.max() if is_max else rolling.min()).to_numpy()
+
+@pytest.mark.parametrize('is_max', [True, False])
+def test_windows_match_pandas_rolling(values, is_max):
+    extrema = RollingExtrema(values, is_max)
+    for length in WINDOWS:
+        # 창 안에 NaN이 있으면 NaN (rolling(w)와 같음), 값은 비트 단위로 같아야 함
+        assert np.array_equal(extrema.window(length), _expected(values, length, is_max, length), equal_nan=True), length
+
+@pytest.mark.parametrize('is_max', [True, False])
+def test_skip_nan_with_min_periods_matches_pandas(values, is_max):
+    extrema = RollingExtrema(values, is_max, skip_nan=True)
+    for length in WINDOWS:
+        assert np.array_equal(extrema.window(length, min_periods=1), _expected(values, length, is_max, 1), equal_nan=True), length
+
+def test_single_column_and_short_input():
+    x = np.array([3.0, 1.0, 4.0, 1.0, 5.0, 9.0, 2.0, 6.0])
+    series = pd.Series(x)
+    for length in (1, 3, 8, 9):
+        assert np.array_equal(rolling_max(x, length), series.rolling(length).max().to_numpy(), equal_nan=True)
+        assert np.array_equal(rolling_min(x, length), series.rolling(length).min().to_numpy(), equal_nan=True)
+    assert rolling_max(x, 3).shape == x.shape